@@ -0,0 +1,78 @@
+import struct
+import socket
+import sys
+
+# ======================================================================================
+# Envio em Lote de Datagramas (UDP GSO com fallback)
+# ======================================================================================
+#
+# Com UDP GSO (Linux >= 4.18) vários datagramas de MESMO tamanho vão ao kernel
+# numa única chamada sendmsg: o buffer é a concatenação deles e o cmsg
+# UDP_SEGMENT diz onde cortar. Só o último do grupo pode ser menor. O receptor
+# continua vendo datagramas separados.
+#
+# Observação: sendmsg com vários buffers (scatter/gather) NÃO gera vários
+# datagramas - junta tudo em um só -, e o Python não expõe sendmmsg; por isso
+# sem GSO o caminho é um sendto por segmento.
+
+SOL_UDP     = getattr(socket, 'SOL_UDP', 17)
+UDP_SEGMENT = getattr(socket, 'UDP_SEGMENT', 103)   # <linux/udp.h>
+
+GSO_MAX_SEGMENTS = 64      # UDP_MAX_SEGMENTS do kernel
+GSO_MAX_BYTES    = 65000   # cabe num datagrama IP com folga para os cabeçalhos
+
+def gso_supported(sock):
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        sock.setsockopt(SOL_UDP, UDP_SEGMENT, 0)   # 0 = sem GSO por padrão no socket
+        return True
+    except OSError:
+        return False
+
+class BatchSender:
+    def __init__(self, sock, use_gso=True):
+        self.sock = sock
+        self.use_gso = use_gso and gso_supported(sock)
+        self.syscalls = 0
+        self.datagrams = 0
+
+    def send(self, datagrams, address):
+        # Envia a lista de datagramas (bytes) em ordem, agrupando os de mesmo
+        # tamanho quando há GSO.
+        self.datagrams += len(datagrams)
+
+        if not self.use_gso:
+            for data in datagrams:
+                self.sock.sendto(data, address)
+            self.syscalls += len(datagrams)
+            return
+
+        i, n = 0, len(datagrams)
+        while i < n:
+            size = len(datagrams[i])
+            j, total = i + 1, size
+            while (j < n and j - i < GSO_MAX_SEGMENTS and total + size <= GSO_MAX_BYTES
+                   and len(datagrams[j]) <= size):
+                total += len(datagrams[j])
+                j += 1
+                if len(datagrams[j - 1]) < size:
+                    break   # o menor fecha o grupo
+
+            if j - i == 1:
+                self.sock.sendto(datagrams[i], address)
+            else:
+                self._send_gso(datagrams[i:j], size, address)
+            self.syscalls += 1
+            i = j
+
+    def _send_gso(self, group, size, address):
+        try:
+            self.sock.sendmsg([b''.join(group)],
+                              [(SOL_UDP, UDP_SEGMENT, struct.pack('=H', size))], 0, address)
+        except OSError:
+            # Placa/rota sem suporte (EIO/EINVAL): desliga o GSO e manda um a um
+            self.use_gso = False
+            for data in group:
+                self.sock.sendto(data, address)
+            self.syscalls += len(group) - 1
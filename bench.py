@@ -0,0 +1,332 @@
+import argparse
+import contextlib
+import gc
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# ======================================================================================
+# Benchmark (varreduras de parâmetros e comparação com baseline)
+# ======================================================================================
+#
+# Cada execução sobe servidor e cliente em processos separados no loopback
+# (opcionalmente passando pelo netem.py), transfere N mensagens e mede:
+#
+#   goodput         bytes de payload úteis por segundo
+#   completion_s    do início do envio até o último ACK
+#   retrans_ratio   retransmissões / segmentos enviados
+#   ack_latency_ms  percentis p50/p90/p99 das amostras de RTT (regra de Karn)
+#   sender_gc_collections / receiver_gc_collections
+#                   coletas do GC do Python durante a transferência em cada
+#                   lado: os laços não criam objetos rastreados pelo GC que
+#                   sobrevivam ao pacote, então o esperado é perto de 0
+#
+# A varredura é o produto cartesiano de taxa de perda, tamanho de mensagem,
+# teto da janela (max_cwnd) e controle de congestionamento; cada combinação
+# roda --repeat vezes e guarda as medianas. O resultado vai para JSON, que
+# pode ser comparado com um baseline salvo:
+#
+#   python bench.py --loss 0 0.01 --cc reno cubic --out atual.json --baseline base.json
+#
+# Com --baseline o código de saída é 1 se alguma métrica piorar além de
+# --tolerance (e da folga absoluta dela, se houver), para uso em CI.
+
+base_port = 21000
+
+# Métricas comparadas com o baseline: (nome, maior é melhor)
+METRICS = (
+    ('goodput', True),
+    ('completion_s', False),
+    ('retrans_ratio', False),
+    ('ack_latency_p50_ms', False),
+    ('ack_latency_p99_ms', False),
+    ('sender_gc_collections', False),
+    ('receiver_gc_collections', False),
+)
+
+# Folga absoluta por métrica: variações até ela nunca contam como regressão.
+# As coletas do GC dependem da versão do Python e do que já estava alocado:
+# uma ou duas a mais não indicam um laço que passou a gerar lixo.
+ABSOLUTE_SLACK = {
+    'sender_gc_collections': 2,
+    'receiver_gc_collections': 2,
+}
+
+# ======================================================================================
+# Processos
+# ======================================================================================
+
+class GcCounter:
+    # Conta as coletas do GC enquanto o bloco with roda
+    def __init__(self):
+        self.collections = 0
+
+    def __enter__(self):
+        gc.callbacks.append(self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self.collections += 1
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    index = min(int(round(q / 100 * (len(samples) - 1))), len(samples) - 1)
+    return samples[index]
+
+def run_server(params, port, ready, results):
+    # Roda num diretório temporário: send_messages grava o CSV no diretório atual
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+            tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        import random
+        import server_final as s
+
+        random.seed(params['seed'])     # a perda simulada no servidor usa o random global
+
+        s.LOSS_RATE = 0 if params['netem'] else params['loss']
+        s.message_size = params['message_size']
+        s.max_cwnd = params['max_cwnd']
+        s.congestion_control = params['cc']
+        s.compression = params.get('compression', True)
+        s.log.set_level('off')
+
+        ready.set()
+        sock, addr, seq, _, mss, peer_wscale, _, compressor, syn_ack = s.initConnection(
+            s.localIP, port, s.buffer_size, s.ISN)
+        with GcCounter() as collections:
+            start = time.perf_counter()
+            final_seq, _, _, _, stats = s.send_messages(sock, addr, seq, params['msgs'], mss=mss,
+                                                        peer_wscale=peer_wscale, syn_ack=syn_ack,
+                                                        compressor=compressor)
+            completion = time.perf_counter() - start
+        s.finishConnection(sock, addr, final_seq)
+
+    latencies = [rtt * 1000 for rtt in stats['ack_latencies'].column('rtt')]
+    results.put({
+        'goodput': (final_seq - seq) / completion,
+        'completion_s': completion,
+        'retrans_ratio': stats['retransmissions'] / max(stats['total_sent'], 1),
+        'ack_latency_p50_ms': percentile(latencies, 50),
+        'ack_latency_p90_ms': percentile(latencies, 90),
+        'ack_latency_p99_ms': percentile(latencies, 99),
+        'sender_gc_collections': collections.collections,
+    })
+
+def run_client(port, ready_events, results):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import client_final as c
+
+        c.log.set_level('off')
+        c.token_cache = None    # cada execução tem um servidor novo: token nenhum valeria
+        for ready in ready_events:
+            ready.wait()
+        time.sleep(0.05)    # o servidor faz o bind logo depois de sinalizar
+        sock, now_ack, last_ack, peer_transform, wscale, streams, decompressor = c.initConnection(
+            ('127.0.0.1', port), c.buffer_size, c.ISN)
+        with GcCounter() as collections:
+            c.receive_and_ack(sock, ('127.0.0.1', port), now_ack, last_ack, peer_transform,
+                              wscale=wscale, streams=streams, decompressor=decompressor)
+
+    results.put({'receiver_gc_collections': collections.collections})
+
+def run_netem(profile, loss, seed, listen_port, server_port, ready):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import asyncio
+        import netem
+
+        downlink = netem.PROFILES[profile].replace(loss=loss)
+        if loss:
+            downlink.gilbert = None
+        ready.set()
+        asyncio.run(netem.run(('127.0.0.1', listen_port), ('127.0.0.1', server_port),
+                              netem.PROFILES[profile], downlink, seed))
+
+def run_once(params, port, run_timeout):
+    # Uma transferência; retorna as métricas ou None se falhar/estourar o tempo
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    server_ready, netem_ready = ctx.Event(), ctx.Event()
+
+    processes = [ctx.Process(target=run_server, args=(params, port, server_ready, results))]
+    client_port, ready_events = port, [server_ready]
+    if params['netem']:
+        client_port = port + 1
+        ready_events.append(netem_ready)
+        proxy = ctx.Process(target=run_netem, args=(
+            params['netem'], params['loss'], params['seed'], client_port, port, netem_ready))
+    processes.append(ctx.Process(target=run_client, args=(client_port, ready_events, results)))
+    if params['netem']:
+        processes.append(proxy)     # o proxy não termina sozinho: sempre é encerrado
+
+    for process in processes:
+        process.start()
+
+    try:
+        # Um dicionário de cada lado; o do cliente chega depois do FIN
+        metrics = results.get(timeout=run_timeout)
+        metrics.update(results.get(timeout=10))
+        return metrics
+    except Exception:
+        return None
+    finally:
+        # Servidor e cliente ainda trocam o FIN depois das métricas
+        for process in processes[:2]:
+            process.join(timeout=10)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+# ======================================================================================
+# Varredura
+# ======================================================================================
+
+def config_key(params):
+    return (f"cc={params['cc']} loss={params['loss']} size={params['message_size']} "
+            f"max_cwnd={params['max_cwnd']}" + (f" netem={params['netem']}" if params['netem'] else "")
+            + ("" if params.get('compression', True) else " compression=off"))
+
+def summarize(runs):
+    summary = {}
+    for name in runs[0]:
+        values = [run[name] for run in runs if run[name] is not None]
+        summary[name] = statistics.median(values) if values else None
+    return summary
+
+def sweep(args):
+    results = []
+    combos = list(itertools.product(args.cc, args.loss, args.message_size, args.max_cwnd))
+    port = base_port
+
+    for i, (cc, loss, message_size, max_cwnd) in enumerate(combos, 1):
+        params = {'cc': cc, 'loss': loss, 'message_size': message_size, 'max_cwnd': max_cwnd,
+                  'msgs': args.msgs, 'netem': args.netem, 'seed': args.seed,
+                  'compression': not args.no_compression}
+        runs, failed = [], 0
+        for _ in range(args.repeat):
+            port = base_port + (port - base_port + 2) % 1000
+            metrics = run_once(params, port, args.timeout)
+            if metrics is None:
+                failed += 1
+            else:
+                runs.append(metrics)
+
+        entry = {'key': config_key(params), 'params': params, 'runs': len(runs), 'failed': failed}
+        if runs:
+            entry.update(summarize(runs))
+        results.append(entry)
+
+        status = (f"goodput {entry['goodput']/1000:8.1f} kB/s  tempo {entry['completion_s']:6.2f} s  "
+                  f"retx {100*entry['retrans_ratio']:5.2f}%  p99 {entry['ack_latency_p99_ms'] or 0:7.2f} ms"
+                  if runs else "FALHOU")
+        print(f"[{i}/{len(combos)}] {entry['key']:<50} {status}"
+              + (f"  ({failed} falha(s))" if runs and failed else ""))
+
+    return results
+
+# ======================================================================================
+# Comparação com baseline
+# ======================================================================================
+
+def compare(results, baseline, tolerance):
+    # Imprime a variação de cada métrica e retorna quantas pioraram além da tolerância
+    previous = {entry['key']: entry for entry in baseline['results']}
+    regressions = 0
+
+    print(f"\n{'='*80}")
+    print(f"COMPARAÇÃO COM BASELINE (tolerância {100*tolerance:.0f}%)")
+    print(f"{'='*80}")
+
+    for entry in results:
+        old = previous.get(entry['key'])
+        if old is None or entry['runs'] == 0 or old['runs'] == 0:
+            print(f"  {entry['key']}: sem par no baseline" if old is None
+                  else f"  {entry['key']}: sem execuções válidas")
+            continue
+
+        changes = []
+        for name, higher_is_better in METRICS:
+            new_value, old_value = entry.get(name), old.get(name)
+            if new_value is None or old_value is None:
+                continue
+            slack = ABSOLUTE_SLACK.get(name, 0)
+            if old_value == 0:
+                worse = new_value > slack and not higher_is_better
+                delta = " =" if new_value == 0 else f" (+{new_value:g})"
+            else:
+                change = (new_value - old_value) / old_value
+                worse = -change > tolerance if higher_is_better else change > tolerance
+                worse = worse and abs(new_value - old_value) > slack
+                delta = f" {100*change:+.1f}%"
+            if worse:
+                regressions += 1
+            changes.append(f"{name}{delta}{' ✗' if worse else ''}")
+        print(f"  {entry['key']}: {', '.join(changes)}")
+
+    print(f"{'='*80}")
+    print(f"{regressions} regressão(ões)" if regressions else "Sem regressões")
+    return regressions
+
+# ======================================================================================
+# Main
+# ======================================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do protocolo com varredura de parâmetros")
+    parser.add_argument('--msgs', type=int, default=2000)
+    parser.add_argument('--loss', type=float, nargs='+', default=[0.0, 0.01])
+    parser.add_argument('--message-size', type=int, nargs='+', default=[None],
+                        help="bytes por mensagem (os segmentos vão cheios de qualquer forma)")
+    parser.add_argument('--max-cwnd', type=int, nargs='+', default=[1000])
+    parser.add_argument('--cc', nargs='+', default=['reno'])
+    parser.add_argument('--netem', help="perfil do netem.py (a perda passa a ser aplicada no proxy)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-compression', action='store_true', help="servidor não aceita OPT_COMPRESS")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=120.0, help="limite por execução em s")
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if any(size is not None and size < 1 for size in args.message_size):
+        parser.error("--message-size deve ser positivo")
+
+    started = time.time()
+    results = sweep(args)
+    report = {
+        'meta': {
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+            'duration_s': round(time.time() - started, 1),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'msgs': args.msgs,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados salvos em '{args.out}'")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,112 @@
+import os
 import sys
-import json
 import socket
+import time
+
+from packet import (pack_segment, unpack_segment, ReceiveBuffer, pack_options, unpack_options, pack_sack,
+                    window_scale_for, FLAG_SYN, FLAG_FIN, FLAG_SACK, FLAG_COMPRESSED, DEFAULT_RWND, HEADER_SIZE,
+                    OPT_TRANSFORM, OPT_MSS, OPT_WSCALE, OPT_STREAMS, OPT_TOKEN, OPT_COMPRESS, MSS_VALUE,
+                    STREAMS_VALUE, COMPRESS_VALUE, MAX_SACK_BLOCKS, MAX_RWND)
+from transforms import CaesarTransform, get_transform
+from eventlog import make_log, DATA_RECV, DATA_OOO, DATA_DUP, BUFFERED, ACK_SENT
+from intervals import IntervalSet
+from sinks import NullSink, FileSink, make_sink
+from streams import StreamDemux
+from resumption import load_token, save_token
+from compression import SegmentDecompressor, compression_dictionary, DEFAULT_DICTIONARY
+import metrics
+import packettrace
 
 # ======================================================================================
 # Seção de Configuração e Constantes
 # ======================================================================================
 
-server_address_port = ("127.0.0.1", 20001)
+server_address_port = ("127.0.0.1", 20001)     # porta do netem.py (20002) para passar pelo emulador
 buffer_size         = 1024
 ISN                 = 10000
 
-# ======================================================================================
-# Estrutura de Dados do Pacote
-# ======================================================================================
+# Handshake: o SYN é reenviado se o SYN-ACK não chega em syn_timeout, com a
+# espera dobrando a cada tentativa (até max_syn_timeout)
+syn_timeout         = 0.5       # s
+max_syn_timeout     = 8.0
+max_syn_retries     = 6
 
-pct_zero = {
-    'seq'       : 0,
-    'ack'       : 0,
-    'rwnd'      : 1024,
-    'SYN'       : False,
-    'FIN'       : False,
-    'payload'   : ""
-}
+# Retomada (ver resumption.py): o token que o servidor manda no SYN-ACK fica
+# guardado em token_cache e vai no próximo SYN; com ele os dados chegam sem
+# esperar a 3ª via. None = não guarda (nem pede) token.
+token_cache         = '.resumption_tokens.json'
 
-# ======================================================================================
-# Funções de Criptografia (Cifra de César)
-# ======================================================================================
+payload_transform   = CaesarTransform(shift=3)
+output_file         = None      # onde gravar os dados recebidos (None = só contar)
+receive_buffer      = 256 * 1024    # bytes aceitos e ainda não consumidos pelo destino (rwnd)
 
-def caesar_cipher(text, shift=3):
-    encrypted_text = ""
-    for char in text:
-        if 'a' <= char <= 'z':
-            encrypted_text += chr((ord(char) - ord('a') + shift) % 26 + ord('a'))
-        elif 'A' <= char <= 'Z':
-            encrypted_text += chr((ord(char) - ord('A') + shift) % 26 + ord('A'))
-        else:
-            encrypted_text += char
-    return encrypted_text
+# Compressão (ver compression.py): anuncia o dicionário padrão e aceita
+# segmentos que descomprimidos tenham até max_uncompressed_segment bytes
+compression         = True
+max_uncompressed_segment = 4 * (buffer_size - HEADER_SIZE)
 
-def caesar_decipher(text, shift=3):
-    return caesar_cipher(text, -shift)
+# Fluxos: com vários, cada um é entregue no seu próprio destino assim que
+# estiver em ordem, sem esperar buracos dos outros. output_file vira um
+# modelo: "{stream}" no nome é trocado pelo id; sem ele, o fluxo 0 vai para
+# output_file e os demais para output_file.<id>. Só é anunciado se
+# output_file é None ou um caminho.
+max_streams         = 256       # fluxos abertos ao mesmo tempo (0 = um fluxo só)
+
+# Política de ACK: em ordem, um ACK a cada ack_every segmentos ou quando o
+# temporizador de ACK atrasado vence; buracos, duplicados e o preenchimento
+# de um buraco são confirmados na hora. Numa tempestade de reordenação, cada
+# buraco recebe dup_ack_burst ACKs duplicados imediatos (o bastante para o
+# fast retransmit) e depois só um a cada dup_ack_every segmentos fora de
+# ordem; os demais ficam para o ACK atrasado, que já leva o SACK atualizado.
+ack_every           = 2         # segmentos em ordem por ACK (RFC 5681)
+delayed_ack         = 0.005     # s; espera máxima de um ACK atrasado
+dup_ack_burst       = 4
+dup_ack_every       = 2         # 1 = um ACK por segmento fora de ordem (sem limite)
+window_poll         = 0.1       # s; sem ACK pendente, checa se a janela reabriu
+
+# Log de eventos (ver eventlog.py): 'off', 'events' ou 'packets' (diagrama completo)
+log_level           = 'events'
+log_output          = 'diagram'
+log                 = make_log(log_level, log_output)
+
+# Métricas ao vivo (ver metrics.py): ('127.0.0.1', 9101) ou caminho de socket Unix
+metrics_address     = None
+
+# Trace binário de cada segmento recebido e ACK enviado (ver packettrace.py),
+# para reproduzir a remontagem offline com replay.py; None = desligado
+packet_trace        = None
 
 # ======================================================================================
 # Funções Auxiliares de Empacotamento/Desempacotamento
 # ======================================================================================
 
-def my_encode_and_send(socket, msg, adress_port):
-    msg_copy = msg.copy()
-    if 'payload' in msg_copy and msg_copy['payload']:
-        msg_copy['payload'] = caesar_cipher(msg_copy['payload'])
-    socket.sendto(json.dumps(msg_copy).encode('utf-8'), adress_port)
+# A cifra do payload fica a cargo da transformação negociada no handshake
+# (ver transforms.py); aqui só se empacota/desempacota o segmento.
+def my_encode_and_send(socket, adress_port, seq=0, ack=0, flags=0, payload=b'', rwnd=DEFAULT_RWND):
+    socket.sendto(pack_segment(seq, ack, flags, rwnd, payload), adress_port)
 
 def my_receive_and_decode(socket, buffer_size):
+    # Retorna ((seq, ack, rwnd, flags, payload), endereço); payload ainda codificado
     pct, address = socket.recvfrom(buffer_size)
-    msg = json.loads(pct.decode('utf-8'))
-    if 'payload' in msg and msg['payload']:
-        msg['payload'] = caesar_decipher(msg['payload'])
-    return msg, address
+    return unpack_segment(pct), address
 
 # ======================================================================================
 # Lógica do 3-Way-Handshake (Estabelecimento da Conexão)
 # ======================================================================================
 
-def initConnection(adress_port, buffer_size, pct, ISN):
+def streams_supported():
+    return max_streams > 0 and (output_file is None or isinstance(output_file, (str, os.PathLike)))
+
+def open_stream_sink(stream_id):
+    # Destino de um fluxo (ver max_streams)
+    if output_file is None:
+        return NullSink()
+    path = os.fspath(output_file)
+    if '{stream}' in path:
+        return FileSink(path.format(stream=stream_id))
+    return FileSink(path if stream_id == 0 else f"{path}.{stream_id}")
+
+def initConnection(adress_port, buffer_size, ISN):
     
     UDPClientSocket = socket.socket(family=socket.AF_INET, type=socket.SOCK_DGRAM)
 
@@ -70,180 +114,403 @@ def initConnection(adress_port, buffer_size, pct, ISN):
     print(f"   |{' '*46}|")
 
     ##### 1ª VIA (Cliente -> Servidor) ##### 
-    syn1_msg = pct.copy()
-    syn1_msg["SYN"] = True
-    syn1_msg["seq"] = ISN
-    
     info = f"SYN (seq={ISN})"
     print(f"   |─────── {info:<30} ────▶|")
     
-    my_encode_and_send(UDPClientSocket, syn1_msg, adress_port)
+    # Anuncia a transformação, o maior payload que cabe no buffer de recepção e
+    # a escala com que a janela (em bytes) vai no campo rwnd de 16 bits
+    wscale = window_scale_for(receive_buffer)
+    syn1 = {OPT_TRANSFORM: bytes([payload_transform.transform_id]),
+            OPT_MSS: MSS_VALUE.pack(buffer_size - HEADER_SIZE),
+            OPT_WSCALE: bytes([wscale])}
+    if streams_supported():
+        syn1[OPT_STREAMS] = STREAMS_VALUE.pack(max_streams)
+    if compression:
+        syn1[OPT_COMPRESS] = COMPRESS_VALUE.pack(DEFAULT_DICTIONARY, max_uncompressed_segment)
+    if token_cache is not None:
+        # Token da última conexão (vazio = só pede um)
+        token = load_token(token_cache, adress_port)
+        syn1[OPT_TOKEN] = token or b''
+        if token:
+            print(f"   |   (token de retomada: dados em 0-RTT){' '*8}|")
+    syn1_options = pack_options(syn1)
+    my_encode_and_send(UDPClientSocket, adress_port, seq=ISN, flags=FLAG_SYN, payload=syn1_options,
+                       rwnd=min(receive_buffer, MAX_RWND))
 
     ##### 2ª VIA (Servidor -> Cliente) #####
-    syn2_ack_msg, _ = my_receive_and_decode(UDPClientSocket, buffer_size)
+    # Sem timeout, um SYN ou SYN-ACK perdido travaria o recvfrom para sempre
+    wait = syn_timeout
+    deadline = time.monotonic() + wait
+    retries = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            retries += 1
+            if retries > max_syn_retries:
+                UDPClientSocket.close()
+                raise ConnectionError(f"sem SYN-ACK de {adress_port[0]}:{adress_port[1]} "
+                                      f"após {max_syn_retries} reenvios do SYN")
+            wait = min(wait * 2, max_syn_timeout)
+            deadline = time.monotonic() + wait
+            print(f"[!] Timeout! Reenviando SYN ({retries}/{max_syn_retries}, próxima espera {wait:.1f} s)")
+            my_encode_and_send(UDPClientSocket, adress_port, seq=ISN, flags=FLAG_SYN, payload=syn1_options,
+                               rwnd=min(receive_buffer, MAX_RWND))
+            continue
+        UDPClientSocket.settimeout(remaining)
+        try:
+            (seq_recebido, ack_recebido, _, flags, syn2_options), _ = my_receive_and_decode(
+                UDPClientSocket, buffer_size)
+        except socket.timeout:
+            continue
+        # Dados 0-RTT que passaram na frente do SYN-ACK são descartados: sem o
+        # seq inicial do servidor não há onde encaixá-los, e ele os retransmite
+        if flags & FLAG_SYN and ack_recebido == ISN + 1:
+            break
+
+    # Transformação que o servidor usa nos dados que envia (padrão: identidade)
+    options = unpack_options(syn2_options)
+    peer_transform = get_transform(options.get(OPT_TRANSFORM, b'\x00')[0])
+    if OPT_WSCALE not in options:
+        wscale = 0      # servidor antigo: a escala só vale se os dois lados a anunciam
+    # O servidor só responde OPT_STREAMS se vai mandar vários fluxos em quadros
+    streams = OPT_STREAMS in options and streams_supported()
+    # O servidor só responde OPT_COMPRESS se vai comprimir (com o dicionário pedido)
+    decompressor = None
+    if compression and OPT_COMPRESS in options:
+        dict_id, max_segment = COMPRESS_VALUE.unpack(options[OPT_COMPRESS])
+        decompressor = SegmentDecompressor(compression_dictionary(dict_id, peer_transform),
+                                           min(max_segment, max_uncompressed_segment))
+    if token_cache is not None and options.get(OPT_TOKEN):
+        try:
+            save_token(token_cache, adress_port, options[OPT_TOKEN])
+        except OSError as e:
+            print(f"Erro ao guardar token de retomada: {e}")
 
-    info = f"SYN-ACK (seq={syn2_ack_msg['seq']}, ack={syn2_ack_msg['ack']})"
+    info = f"SYN-ACK (seq={seq_recebido}, ack={ack_recebido})"
     print(f"   |◀────── {info:<30} ───────|")
 
     ##### 3ª VIA (Cliente -> Servidor) #####
-    seq_recebido = syn2_ack_msg["seq"]
-    ack_recebido = syn2_ack_msg["ack"]
+    now_ack = seq_recebido + 1
 
-    syn3_ack_msg = syn2_ack_msg.copy()
-    syn3_ack_msg["ack"] = seq_recebido + 1
-    syn3_ack_msg["seq"] = ack_recebido
-    syn3_ack_msg["SYN"] = False
-
-    info = f"ACK (seq={syn3_ack_msg['seq']}, ack={syn3_ack_msg['ack']})"
+    info = f"ACK (seq={ack_recebido}, ack={now_ack})"
     print(f"   |─────── {info:<30} ────▶|")
     
     print(f"   |{' '*46}|")
     print(f"   └──────────── CONEXÃO ESTABELECIDA ────────────┘")
 
-    my_encode_and_send(UDPClientSocket, syn3_ack_msg, adress_port)
-
-    now_ack = syn3_ack_msg["ack"]
+    # Já com a janela real: numa retomada 0-RTT o servidor lê este ACK como
+    # mais um ACK da transferência
+    my_encode_and_send(UDPClientSocket, adress_port, seq=ack_recebido, ack=now_ack,
+                       rwnd=min(receive_buffer >> wscale, MAX_RWND))
     
-    return UDPClientSocket, now_ack, ack_recebido
+    return UDPClientSocket, now_ack, ack_recebido, peer_transform, wscale, streams, decompressor
 
 # ======================================================================================
 # Lógica Principal de Recebimento de Dados - COM BUFFER
 # ======================================================================================
 
-def receive_and_ack(connection, address, pct_zero, initial_ack, last_ack):
+# Os dados vão para sink (ver sinks.py), com offset relativo ao primeiro byte.
+# O estado de remontagem é o conjunto de faixas recebidas acima de expected_seq;
+# se o destino aceita escrita por offset, os segmentos fora de ordem são
+# gravados na hora e nada fica em memória além das faixas.
+#
+# Controle de fluxo: cada ACK anuncia receive_buffer menos o que o destino
+# ainda não consumiu (sink.backlog()), em bytes, deslocado por wscale. Os
+# dados fora de ordem já estão dentro da janela anunciada e não a encolhem.
+#
+# Com streams (OPT_STREAMS negociado) a conexão só controla ACK e SACK: cada
+# segmento vai direto para o remontador do seu fluxo (ver streams.py), que
+# entrega no destino aberto por open_stream_sink, e sink não é usado.
+#
+# decompressor: o SegmentDecompressor negociado no handshake. Segmentos com
+# FLAG_COMPRESSED são descomprimidos antes de tudo: seq, janela e remontagem
+# contam os bytes originais.
+def new_trace(initial_ack, wscale, streams):
+    if not packet_trace:
+        return None
+    params = {'initial_ack': initial_ack, 'wscale': wscale, 'streams': streams,
+              'max_sack_blocks': MAX_SACK_BLOCKS}
+    try:
+        return packettrace.TraceWriter(packet_trace, 'receiver', params)
+    except OSError as e:
+        print(f"Erro ao abrir {packet_trace}: {e}")
+        return None
+
+def receive_and_ack(connection, address, initial_ack, last_ack, peer_transform, sink=None, wscale=0,
+                    streams=False, decompressor=None):
 
+    sink = sink or NullSink()
+    demux = StreamDemux(open_stream_sink, peer_transform) if streams else None
+    flow = demux or sink                        # quem diz quantos bytes estão presos
+    hold = demux is None and not sink.random_access
     expected_seq = initial_ack
     pcts_since_ack = 0
+    mss = buffer_size - HEADER_SIZE
+    last_window = None          # último rwnd anunciado (já deslocado)
     
-    out_of_order_buffer = {}  # {seq: (payload, payload_size)}
+    received = IntervalSet()    # faixas [seq, fim) já recebidas acima de expected_seq
+    held = {}                   # {seq: payload} - só para destinos sem escrita por offset
+    segment_buffer = ReceiveBuffer(buffer_size)  # reaproveitado: o payload só vale até o próximo
     
     received_count = 0
     discarded_count = 0
     ack_sent_count = 0
     buffered_count = 0
+    deferred_count = 0
+    compressed_count = 0
+    
+    ack_deadline = None         # prazo do ACK atrasado pendente (time.monotonic)
+    dup_seq, dup_run = None, 0  # buraco atual e quantos duplicados ele já provocou
+    trace = new_trace(initial_ack, wscale, streams)
     
-    connection.settimeout(0.1) 
+    log.start()
+    started_at = time.monotonic()
+    
+    def snapshot():
+        # Lido pela thread de métricas enquanto a transferência corre
+        return {
+            'packets_received_total': received_count,
+            'packets_buffered_total': buffered_count,
+            'acks_sent_total': ack_sent_count,
+            'bytes_delivered_total': expected_seq - initial_ack,
+            'rwnd_bytes': None if last_window is None else last_window << wscale,
+            'goodput_bytes_per_second': metrics.goodput(expected_seq - initial_ack, started_at),
+        }
+    metrics_handle = metrics.registry.register({'peer': f"{address[0]}:{address[1]}", 'role': 'receiver'},
+                                               snapshot)
+    
+    def advertised_window():
+        # Espaço livre em bytes; abaixo de um MSS (ou de meio buffer) anuncia
+        # zero, para o transmissor não encher a janela aos pedacinhos
+        free = receive_buffer - flow.backlog()
+        if free < min(mss, receive_buffer // 2):
+            free = 0
+        return min(free >> wscale, MAX_RWND)
     
     def send_ack(reason=""):
-        nonlocal ack_sent_count, pcts_since_ack
-        ack_pct = pct_zero.copy()
-        ack_pct["ack"] = expected_seq
-        ack_pct["seq"] = last_ack
-        
-        my_encode_and_send(connection, ack_pct, address)
+        nonlocal ack_sent_count, pcts_since_ack, last_window, ack_deadline
+        last_window = advertised_window()
+        if received:
+            blocks = [block for _, block in zip(range(MAX_SACK_BLOCKS), received)]
+            my_encode_and_send(connection, address, seq=last_ack, ack=expected_seq,
+                               flags=FLAG_SACK, payload=pack_sack(blocks), rwnd=last_window)
+        else:
+            my_encode_and_send(connection, address, seq=last_ack, ack=expected_seq, rwnd=last_window)
         ack_sent_count += 1
+        if trace is not None:
+            trace.record(time.monotonic_ns(), packettrace.ACK_SENT, last_ack, expected_seq,
+                         min(len(received), MAX_SACK_BLOCKS), last_window, FLAG_SACK if received else 0)
         
-        info = f"ACK (ack={expected_seq})"
-        print(f"   |─────── {info:<30} ────▶|  ({reason})")
+        if log.packets:
+            log.record(ACK_SENT, last_ack, expected_seq, 0, (reason, pcts_since_ack, last_window << wscale))
         
         pcts_since_ack = 0
+        ack_deadline = None
+    
+    def delay_ack():
+        # Arma o temporizador do ACK atrasado (se ainda não estiver armado)
+        nonlocal ack_deadline
+        if ack_deadline is None:
+            ack_deadline = time.monotonic() + delayed_ack
+    
+    def send_dup_ack(reason):
+        # ACK imediato de buraco/duplicado, rareado depois da rajada inicial
+        nonlocal dup_seq, dup_run, deferred_count
+        if dup_seq != expected_seq:
+            dup_seq, dup_run = expected_seq, 0
+        dup_run += 1
+        if dup_run > dup_ack_burst and (dup_run - dup_ack_burst) % dup_ack_every:
+            deferred_count += 1
+            delay_ack()
+            return
+        send_ack(reason)
+    
+    def deliver(seq, payload):
+        if demux is not None:
+            demux.receive(payload)
+        else:
+            sink.write(seq - initial_ack, payload)
     
     def process_buffered_packets():
-        nonlocal expected_seq, pcts_since_ack, received_count, buffered_count
+        # A faixa que começa em expected_seq (se houver) passa a estar em ordem;
+        # retorna True se um buraco foi preenchido
+        nonlocal expected_seq, pcts_since_ack
         
-        while expected_seq in out_of_order_buffer:
-            payload, payload_size = out_of_order_buffer[expected_seq]
-            del out_of_order_buffer[expected_seq]
-            
-            received_count += 1
-            print(f"   |  [BUFFER] Processando seq={expected_seq}")
-            
-            expected_seq += payload_size
+        end = received.pop_from(expected_seq)
+        if end is None:
+            return False
+        if log.packets:
+            log.record(BUFFERED, expected_seq, end)
+        
+        if hold:
+            while expected_seq < end:
+                payload = held.pop(expected_seq)
+                sink.write(expected_seq - initial_ack, payload)
+                expected_seq += len(payload)
+                pcts_since_ack += 1
+        else:
             pcts_since_ack += 1
+        expected_seq = end
+        return True
     
     while True:
+        now = time.monotonic()
+        if ack_deadline is not None and now >= ack_deadline:
+            if trace is not None:
+                trace.record(time.monotonic_ns(), packettrace.DELAYED_ACK, 0, expected_seq)
+            send_ack("ACK ATRASADO (recebeu {} pacote(s))")
+        connection.settimeout(max(ack_deadline - now, 0.0001) if ack_deadline is not None else window_poll)
+        
         try:
-            msg, _ = my_receive_and_decode(connection, buffer_size)
+            (seq, _, _, flags, payload), _ = segment_buffer.receive(connection)
+            if flags & FLAG_COMPRESSED:
+                try:
+                    if decompressor is None:
+                        raise ValueError("segmento comprimido sem compressão negociada")
+                    payload = decompressor.decode(payload)
+                except ValueError as e:
+                    # Descartado como uma perda: o transmissor retransmite
+                    discarded_count += 1
+                    print(f"Erro: {e}")
+                    continue
+                compressed_count += 1
+            if trace is not None:
+                trace.record(time.monotonic_ns(), packettrace.FIN if flags & FLAG_FIN else packettrace.RECV,
+                             seq, expected_seq, len(payload), flags=flags)
             
-            if msg["FIN"]:
-                if pcts_since_ack > 0:
+            if flags & FLAG_FIN:
+                if ack_deadline is not None:
                     send_ack("ACK final antes de FIN")
-                finishConnection(connection, address, pct_zero, msg["seq"], last_ack)
+                log.close()
+                finishConnection(connection, address, seq, last_ack)
                 break
             
-            seq = msg["seq"]
-            payload = msg["payload"]
-            payload_size = len(caesar_cipher(payload).encode('utf-8')) if payload else 0
-
-            info = f"DADOS (seq={seq})"
+            if not payload:
+                # Sonda de janela zero: responde na hora com a janela atual
+                send_ack("SONDA DE JANELA")
+                continue
+            
+            # Transformações preservam o tamanho: o que conta no seq é o tamanho no fio
+            payload_size = len(payload)
+            if demux is None:
+                payload = peer_transform.decode(payload)    # com fluxos, só os dados do quadro
             
             if seq == expected_seq:
                 # PACOTE EM ORDEM
                 received_count += 1
-                print(f"   |◀────── {info:<30} ───────|")
+                if log.packets:
+                    log.record(DATA_RECV, seq, expected_seq)
                 
+                deliver(seq, payload)
                 expected_seq += payload_size
                 pcts_since_ack += 1
                 
-                process_buffered_packets()
+                if process_buffered_packets():
+                    send_ack("BURACO PREENCHIDO ({} pacote(s))")
+                elif received:
+                    # Ainda há buracos: cada ACK parcial guia a recuperação
+                    send_ack("ACK PARCIAL")
+                elif pcts_since_ack >= ack_every:
+                    send_ack("A CADA {} PACOTES")
+                else:
+                    delay_ack()
             
             elif seq > expected_seq:
                 # PACOTE FORA DE ORDEM
-                if seq not in out_of_order_buffer:
-                    # Guarda no buffer
-                    out_of_order_buffer[seq] = (payload, payload_size)
+                if not received.contains(seq, seq + payload_size):
+                    # Grava na posição (ou segura até o buraco fechar)
+                    if hold:
+                        held[seq] = bytes(payload)
+                    else:
+                        deliver(seq, payload)
+                    received.add(seq, seq + payload_size)
+                    received_count += 1
                     buffered_count += 1
-                    print(f"   |◀────── {info:<30} ───────| [!] Fora de ordem (bufferizado)")
-                else:
-                    # Já está no buffer (duplicado)
-                    print(f"   |◀────── {info:<30} ───────| [!] Duplicado")
+                    if log.packets:
+                        log.record(DATA_OOO, seq, expected_seq)
+                elif log.packets:
+                    # Já recebido (duplicado)
+                    log.record(DATA_DUP, seq, expected_seq)
                 
                 # Envia ACK duplicado
-                send_ack("PERDA DETECTADA - ACK duplicado")
+                send_dup_ack("PERDA DETECTADA - ACK duplicado")
             
             else: # seq < expected_seq
                 # PACOTE DUPLICADO (já foi processado antes)
-                print(f"   |◀────── {info:<30} ───────| [!] Duplicado")
-                send_ack("DUPLICADO - reenviando ACK")
+                if log.packets:
+                    log.record(DATA_DUP, seq, expected_seq)
+                send_dup_ack("DUPLICADO - reenviando ACK")
         
         except socket.timeout:
-            if pcts_since_ack > 0:
-                send_ack(f"FIM DE ESPERA (recebeu {pcts_since_ack} pacote(s))")
+            # Com ACK pendente, o topo do laço envia; senão, olha a janela
+            if ack_deadline is None and last_window is not None \
+                    and last_window << wscale < mss <= advertised_window() << wscale:
+                # O destino consumiu dados: avisa que a janela reabriu
+                send_ack("ATUALIZAÇÃO DE JANELA")
         
         except Exception as e:
             print(f"Erro: {e}")
             break
     
+    metrics.registry.unregister(metrics_handle)
+    if trace is not None:
+        trace.close()
+    if demux is not None:
+        demux.close()
+    else:
+        sink.close(expected_seq - initial_ack)
+    
     # Estatísticas finais
+    log.close()
     print(f"\n{'='*80}")
     print(f"ESTATÍSTICAS FINAIS")
     print(f"{ '='*80}\n")
-    print(f"  Pacotes recebidos em ordem: {received_count}")
+    print(f"  Pacotes recebidos (sem duplicados): {received_count}")
     print(f"  Pacotes bufferizados (fora de ordem): {buffered_count}")
-    print(f"  Total de ACKs enviados: {ack_sent_count}")
+    print(f"  Bytes entregues em ordem: {expected_seq - initial_ack}")
+    print(f"  Total de ACKs enviados: {ack_sent_count} ({ack_sent_count/max(received_count, 1):.2f} por pacote)")
+    print(f"  ACKs duplicados adiados (limite de taxa): {deferred_count}")
+    if decompressor is not None:
+        print(f"  Segmentos comprimidos: {compressed_count}")
+    if discarded_count:
+        print(f"  Segmentos descartados (inválidos): {discarded_count}")
     print(f"  Último SEQ confirmado: {expected_seq}")
-    print(f"  Pacotes ainda no buffer: {len(out_of_order_buffer)}")
+    print(f"  Faixas ainda pendentes: {len(received)} ({received.size()} bytes)")
+    if demux is not None:
+        times = sorted(demux.completion_times())
+        print(f"  Fluxos completos: {len(times)} de {len(demux.streams)}")
+        if times:
+            print(f"  Conclusão dos fluxos: p50 {times[len(times)//2]*1000:.1f} ms, "
+                  f"p99 {times[min(int(len(times)*0.99), len(times)-1)]*1000:.1f} ms")
+    if trace is not None:
+        print(f"  Trace: {trace.count} eventos em '{trace.path}' (python replay.py {trace.path})")
     print(f"{ '='*80}\n")
 
 # ======================================================================================
 # Lógica da Finalização da Conexão
 # ======================================================================================
 
-def finishConnection(socket, address, pct_zero, now_seq, last_ack):
+def finishConnection(connection, address, now_seq, last_ack):
     
     print(f"   |{' '*46}|")
     
     info_fin = f"FIN (seq={now_seq})"
     print(f"   |◀────── {info_fin:<30} ───────|")
     
-    fin_pct = pct_zero.copy()
     now_ack = now_seq + 1
-    fin_pct["ack"] = now_ack
-    fin_pct["seq"] = last_ack
-    fin_pct["FIN"] = True
     
     info_ack = f"FIN-ACK (seq={last_ack}, ack={now_ack})"
     print(f"   |─────── {info_ack:<30} ────▶|")
     print(f"   └──────────── CONEXÃO ENCERRADA ────────────┘")
     
-    my_encode_and_send(socket, fin_pct, address)
+    my_encode_and_send(connection, address, seq=last_ack, ack=now_ack, flags=FLAG_FIN)
     
-    socket.settimeout(2.0)
+    connection.settimeout(2.0)
 
     try:
-        _, _ = my_receive_and_decode(socket, 1024)
+        _, _ = my_receive_and_decode(connection, 1024)
         print("[Info] Recebi retransmissão do servidor. Reenviando ACK de encerramento...")
-        my_encode_and_send(socket, fin_pct, address)
+        my_encode_and_send(connection, address, seq=last_ack, ack=now_ack, flags=FLAG_FIN)
     
     except socket.timeout:
         print("Timeout. Assumindo conexão encerrada com sucesso.")
@@ -251,7 +518,7 @@ def finishConnection(socket, address, pct_zero, now_seq, last_ack):
     except Exception as e:
         pass
 
-    socket.close()
+    connection.close()
     print("Cliente Offline.")
 
 # ======================================================================================
@@ -259,9 +526,15 @@ def finishConnection(socket, address, pct_zero, now_seq, last_ack):
 # ======================================================================================
 if __name__ == "__main__":
     UDPClientSocket = None
+    if metrics_address is not None:
+        metrics.serve_metrics(metrics_address)
     try:
-        UDPClientSocket, now_ack, last_ack = initConnection(server_address_port, buffer_size, pct_zero, ISN)
-        receive_and_ack(UDPClientSocket, server_address_port, pct_zero, now_ack, last_ack)
+        UDPClientSocket, now_ack, last_ack, peer_transform, wscale, streams, decompressor = initConnection(
+            server_address_port, buffer_size, ISN)
+        receive_and_ack(UDPClientSocket, server_address_port, now_ack, last_ack, peer_transform,
+                        None if streams else make_sink(output_file), wscale, streams, decompressor)
+    except ConnectionError as e:
+        print(f"Erro: {e}")
     finally:
         if UDPClientSocket:
             try:
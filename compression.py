@@ -0,0 +1,131 @@
+import zlib
+
+from packet import FLAG_COMPRESSED
+
+# ======================================================================================
+# Compressão de Payload (zlib, negociada no handshake)
+# ======================================================================================
+#
+# O cliente anuncia OPT_COMPRESS com o dicionário que conhece e o maior payload
+# descomprimido que aceita; o servidor que também quer comprimir responde com
+# a mesma opção. Cada segmento é um fluxo deflate cru e independente (sem
+# cabeçalho nem checksum: o UDP já confere o datagrama), comprimido a partir
+# de um dicionário fixo dos dois lados: um segmento perdido não atrapalha a
+# descompressão de nenhum outro, e mesmo um payload curto comprime bem. O
+# dicionário passa pela transformação de quem envia, para casar com os bytes
+# que de fato vão no segmento.
+#
+# seq, janelas, SACK e remontagem contam bytes DESCOMPRIMIDOS: a compressão é
+# só a forma como cada segmento viaja (FLAG_COMPRESSED no cabeçalho). Para
+# aproveitar o datagrama, o transmissor lê mais que um MSS da fonte (até o
+# máximo do receptor), na medida da razão de compressão observada, e se um
+# segmento ainda não couber no MSS o que não couber fica para o próximo.
+#
+# Com a razão média acima de max_ratio a compressão não compensa a CPU: os
+# segmentos vão crus e só um a cada probe_every é testado, para voltar a
+# comprimir se os dados mudarem.
+
+WINDOW_BITS = 12    # janela de 4 KiB: os segmentos são pequenos e o objeto zlib sai barato
+MEM_LEVEL   = 8
+
+# Dicionários conhecidos (o id vai no handshake). Os trechos mais comuns vão
+# no fim, mais perto dos dados.
+DICTIONARIES = {
+    # Mensagens sintéticas de make_message: "Mensagem numero N", completadas com '.'
+    1: b'.' * 258 + b''.join(b'Mensagem numero %d' % n for n in range(10)) + b'Mensagem numero ',
+}
+DEFAULT_DICTIONARY = 1
+
+def compression_dictionary(dict_id, transform):
+    # Dicionário como ele aparece no fio, depois da transformação de quem envia
+    try:
+        return bytes(transform.encode(DICTIONARIES[dict_id]))
+    except KeyError:
+        raise ValueError(f"Dicionário de compressão desconhecido: {dict_id}")
+
+class SegmentCompressor:
+    def __init__(self, dict_id, zdict, mss, max_segment, level=6, max_ratio=0.9, probe_every=64, fill=0.9):
+        self.dict_id = dict_id
+        self.zdict = zdict
+        self.mss = mss
+        self.max_segment = max(max_segment, mss)
+        self.level = level
+        self.max_ratio = max_ratio
+        self.probe_every = probe_every
+        self.fill = fill            # margem do MSS ao prever o tamanho comprimido
+        self.ratio = 0.5            # comprimido / original (média móvel)
+        self.active = True
+        self.segments = 0           # segmentos que passaram por encode
+        self.compressed = 0         # e foram comprimidos
+        self.raw_bytes = 0          # bytes originais dos comprimidos
+        self.wire_bytes = 0         # e o que eles ocuparam no fio
+
+    def read_size(self):
+        # Quantos bytes pedir à fonte para o segmento comprimido encher o MSS
+        if not self.active:
+            return self.mss
+        return max(self.mss, min(int(self.mss * self.fill / self.ratio), self.max_segment))
+
+    def _compress(self, payload):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -WINDOW_BITS, MEM_LEVEL,
+                                      zlib.Z_DEFAULT_STRATEGY, self.zdict)
+        return compressor.compress(payload) + compressor.flush()
+
+    def encode(self, payload):
+        # (bytes para o segmento, flags). Um payload maior que o MSS sempre é
+        # comprimido; se ainda assim não couber, volta cru e quem chamou divide.
+        self.segments += 1
+        size = len(payload)
+        if size <= self.mss and not self.active and self.segments % self.probe_every:
+            return payload, 0
+
+        wire = self._compress(payload)
+        if size:
+            self.ratio += (len(wire) / size - self.ratio) / 8
+            self.active = self.ratio <= self.max_ratio
+        if len(wire) >= size or len(wire) > self.mss:
+            return payload, 0
+        self.compressed += 1
+        self.raw_bytes += size
+        self.wire_bytes += len(wire)
+        return wire, FLAG_COMPRESSED
+
+def next_segment(mux, compressor, carry, mss, room=None):
+    # Próximo segmento de dados: (payload, bytes para o fio, flags, resto).
+    # carry é o resto devolvido na chamada anterior (None se não há) e room o
+    # espaço na janela do receptor (pelo menos mss; None = sem limite). Payload
+    # vazio: a fonte acabou.
+    if carry is not None:
+        pending = carry
+    else:
+        size = mss if compressor is None else compressor.read_size()
+        pending = mux.read(size if room is None else min(size, room))
+    payload, carry = pending, None
+    if room is not None and len(pending) > room:
+        payload, carry = mux.split(pending, room)
+    if not payload or compressor is None:
+        return payload, payload, 0, carry
+    wire, flags = compressor.encode(payload)
+    if len(wire) > mss:
+        # Comprimiu menos que o previsto: o que cabe no mss vai cru e todo o
+        # resto (inclusive o que não coube na janela) abre o próximo segmento
+        payload, carry = mux.split(pending, mss)
+        wire, flags = payload, 0
+    return payload, wire, flags, carry
+
+class SegmentDecompressor:
+    def __init__(self, zdict, max_segment):
+        self.zdict = zdict
+        self.max_segment = max_segment
+
+    def decode(self, data):
+        # Payload original de um segmento com FLAG_COMPRESSED; ValueError se
+        # não for um fluxo deflate completo ou passar de max_segment
+        decompressor = zlib.decompressobj(-WINDOW_BITS, self.zdict)
+        try:
+            payload = decompressor.decompress(data, self.max_segment)
+        except zlib.error as e:
+            raise ValueError(f"Segmento comprimido inválido: {e}")
+        if not decompressor.eof or decompressor.unconsumed_tail:
+            raise ValueError("Segmento comprimido truncado ou maior que o negociado")
+        return payload
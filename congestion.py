@@ -0,0 +1,366 @@
+import math
+from collections import deque
+
+# ======================================================================================
+# Controle de Congestionamento Plugável
+# ======================================================================================
+#
+# O laço de envio só conversa com o controlador por eventos:
+#
+#   on_ack(num_acked, now, in_flight)   ACK novo (cumulativo)
+#   on_duplicate_ack(now)               ACK duplicado; retorna True no fast retransmit
+#   on_timeout(now)                     estouro do RTO
+#   on_rtt_sample(rtt, now)             amostra válida de RTT (já filtrada por Karn)
+#
+# e lê cwnd/ssthresh (em pacotes) e phase (nome da fase atual, só para o log;
+# os controladores não imprimem nada). A contagem de ACKs duplicados e a
+# entrada em recuperação são comuns; cada algoritmo decide como a janela reage.
+#
+# pacing_rate(srtt) dá a taxa com que o transmissor espaça os segmentos (ver
+# pacing.py). Por padrão é uma janela por RTT com folga, como no Linux: o
+# dobro no slow start, para a janela poder crescer, e 25% a mais depois.
+
+PACING_SS_GAIN = 2.0
+PACING_CA_GAIN = 1.25
+
+class CongestionController:
+    name = None
+
+    def __init__(self, initial_cwnd=1.0, initial_ssthresh=64, max_cwnd=1000, duplicate_ack_threshold=3):
+        self.initial_cwnd = initial_cwnd
+        self.cwnd = initial_cwnd
+        self.ssthresh = initial_ssthresh
+        self.max_cwnd = max_cwnd
+        self.duplicate_ack_threshold = duplicate_ack_threshold
+        self.duplicate_acks = 0
+        self.in_fast_recovery = False
+        self.phase = None
+
+    def on_ack(self, num_acked, now, in_flight):
+        raise NotImplementedError
+
+    def on_duplicate_ack(self, now):
+        self.duplicate_acks += 1
+
+        if self.duplicate_acks == self.duplicate_ack_threshold and not self.in_fast_recovery:
+            self.in_fast_recovery = True
+            self.enter_recovery(now)
+            return True
+
+        if self.in_fast_recovery:
+            self.inflate()
+        return False
+
+    def enter_recovery(self, now):
+        raise NotImplementedError
+
+    def inflate(self):
+        pass
+
+    def on_timeout(self, now):
+        raise NotImplementedError
+
+    def on_rtt_sample(self, rtt, now):
+        pass
+
+    def pacing_rate(self, srtt):
+        # Taxa de envio em pacotes/s: por padrão, uma janela por RTT com ganho
+        gain = PACING_SS_GAIN if self.cwnd < self.ssthresh else PACING_CA_GAIN
+        return gain * self.cwnd / srtt
+
+# ======================================================================================
+# Reno (a lógica original do servidor)
+# ======================================================================================
+
+class Reno(CongestionController):
+    name = 'reno'
+
+    def on_ack(self, num_acked, now, in_flight):
+        cwnd, ssthresh = self.cwnd, self.ssthresh
+        self.duplicate_acks = 0
+
+        if self.in_fast_recovery:
+            # Sai do Fast Recovery para Congestion Avoidance
+            self.in_fast_recovery = False
+            self.cwnd = ssthresh
+            self.phase = 'FR→CA'
+
+        elif cwnd < ssthresh:
+            # SLOW START: cada pacote confirmado adiciona 1 ao CWND (dobra a cada RTT)
+            self.cwnd = min(cwnd + num_acked, self.max_cwnd)
+            self.phase = 'SLOW START'
+
+        else:
+            # CONGESTION AVOIDANCE: 1/cwnd por pacote confirmado (~1 MSS por RTT)
+            increment = num_acked / cwnd
+            self.cwnd = min(cwnd + increment, self.max_cwnd)
+            self.phase = 'CONG AVOID'
+
+    def enter_recovery(self, now):
+        self.cwnd = max(self.cwnd / 2, 2)
+
+    def inflate(self):
+        self.cwnd = min(self.cwnd + 1, self.max_cwnd)
+
+    def on_timeout(self, now):
+        self.cwnd, self.ssthresh = self.initial_cwnd, max(int(self.cwnd / 2), 2)
+        self.in_fast_recovery, self.duplicate_acks = False, 0
+
+# ======================================================================================
+# CUBIC (RFC 9438)
+# ======================================================================================
+#
+#   W_cubic(t) = C·(t - K)³ + W_max,   K = ∛(W_max·(1 - β) / C)
+#
+# t é o tempo desde o último evento de congestionamento. A janela cresce
+# rápido longe de W_max, quase para perto dele e volta a sondar depois. A
+# estimativa "amigável ao Reno" W_est garante que nunca fica abaixo do Reno.
+
+class Cubic(CongestionController):
+    name = 'cubic'
+
+    C    = 0.4
+    BETA = 0.7
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.w_max = 0.0
+        self.k = 0.0
+        self.epoch_start = None
+        self.w_est = 0.0
+        self.min_rtt = None
+
+    def on_rtt_sample(self, rtt, now):
+        if self.min_rtt is None or rtt < self.min_rtt:
+            self.min_rtt = rtt
+
+    def on_ack(self, num_acked, now, in_flight):
+        cwnd = self.cwnd
+        self.duplicate_acks = 0
+
+        if self.in_fast_recovery:
+            self.in_fast_recovery = False
+            self.phase = 'CUBIC FR→CA'
+            return
+
+        if cwnd < self.ssthresh:
+            self.cwnd = min(cwnd + num_acked, self.max_cwnd)
+            self.phase = 'CUBIC SLOW START'
+            return
+
+        if self.epoch_start is None:
+            self.epoch_start = now
+            self.k = math.cbrt(max(self.w_max - cwnd, 0) / self.C)
+            self.w_max = max(self.w_max, cwnd)
+            self.w_est = cwnd
+
+        rtt = self.min_rtt or 0.1
+        t = now - self.epoch_start + rtt
+        target = self.C * (t - self.k) ** 3 + self.w_max
+        target = min(max(target, cwnd), 1.5 * cwnd)
+
+        self.w_est += 3 * (1 - self.BETA) / (1 + self.BETA) * num_acked / cwnd
+
+        if target > cwnd:
+            new_cwnd = cwnd + (target - cwnd) / cwnd * num_acked
+        else:
+            new_cwnd = cwnd + num_acked / (100 * cwnd)
+        self.cwnd = min(max(new_cwnd, self.w_est), self.max_cwnd)
+        self.phase = 'CUBIC'
+
+    def _congestion_event(self):
+        self.epoch_start = None
+        # Convergência rápida: se a perda veio antes de alcançar o W_max anterior,
+        # libera banda para fluxos novos reduzindo o ponto de referência.
+        if self.cwnd < self.w_max:
+            self.w_max = self.cwnd * (1 + self.BETA) / 2
+        else:
+            self.w_max = self.cwnd
+        self.ssthresh = max(self.cwnd * self.BETA, 2)
+
+    def enter_recovery(self, now):
+        self._congestion_event()
+        self.cwnd = self.ssthresh
+
+    def on_timeout(self, now):
+        self._congestion_event()
+        self.cwnd = self.initial_cwnd
+        self.in_fast_recovery, self.duplicate_acks = False, 0
+
+# ======================================================================================
+# BBR (modelo de taxa de entrega / RTT mínimo)
+# ======================================================================================
+#
+# Em vez de reagir a perdas, estima a banda do gargalo (máximo da taxa de
+# entrega nas últimas rodadas) e o RTT mínimo, e mantém cwnd ≈ ganho × BDP.
+# Estados: STARTUP (dobra até a banda parar de crescer), DRAIN (esvazia a fila
+# criada no STARTUP), PROBE_BW (ciclo de ganhos 1.25/0.75/1...) e PROBE_RTT
+# (a cada 10 s sem RTT mínimo novo, reduz a janela para medi-lo de novo).
+# Uma "rodada" termina quando tudo o que estava em voo no seu início foi
+# confirmado. Como o receptor pode atrasar e agrupar ACKs, a janela ganha
+# também uma folga igual ao excesso de confirmações em rajada ("extra_acked"),
+# como no BBR do Linux.
+
+STARTUP, DRAIN, PROBE_BW, PROBE_RTT = 'STARTUP', 'DRAIN', 'PROBE_BW', 'PROBE_RTT'
+
+class Bbr(CongestionController):
+    name = 'bbr'
+
+    STARTUP_GAIN       = 2 / math.log(2)
+    PROBE_BW_GAINS     = (1.25, 0.75, 1, 1, 1, 1, 1, 1)
+    BW_WINDOW_ROUNDS   = 10
+    MIN_RTT_WINDOW     = 10.0
+    PROBE_RTT_DURATION = 0.2
+    MIN_CWND           = 4
+    EXTRA_ACKED_MAX    = 0.1    # folga de agregação limitada a 100 ms de banda
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = STARTUP
+        self.pacing_gain = self.cwnd_gain = self.STARTUP_GAIN
+
+        self.btl_bw = 0.0    # pacotes/s
+        self.bw_samples = deque(maxlen=self.BW_WINDOW_ROUNDS)
+        self.min_rtt = None
+        self.min_rtt_stamp = None
+
+        self.delivered = 0
+        self.round_start = None
+        self.round_delivered = 0
+        self.round_end_delivered = 0
+
+        self.extra_acked = deque(maxlen=self.BW_WINDOW_ROUNDS)
+        self.ack_epoch_start = None
+        self.ack_epoch_acked = 0
+
+        self.full_bw = 0.0
+        self.full_bw_count = 0
+        self.cycle_index = 0
+        self.probe_rtt_done = None
+
+    def bdp(self):
+        if not self.btl_bw or self.min_rtt is None:
+            return None
+        return self.btl_bw * self.min_rtt
+
+    def on_rtt_sample(self, rtt, now):
+        expired = self.min_rtt_stamp is not None and now - self.min_rtt_stamp > self.MIN_RTT_WINDOW
+        if self.min_rtt is None or rtt <= self.min_rtt or expired:
+            self.min_rtt = rtt
+            self.min_rtt_stamp = now
+
+    def on_ack(self, num_acked, now, in_flight):
+        self.duplicate_acks = 0
+        self.in_fast_recovery = False
+        self.delivered += num_acked
+
+        if self.round_start is None:
+            self._start_round(now, self.delivered - num_acked, in_flight + num_acked)
+
+        interval = now - self.round_start
+        if self.delivered >= self.round_end_delivered and interval > 0:
+            self.bw_samples.append((self.delivered - self.round_delivered) / interval)
+            self.btl_bw = max(self.bw_samples)
+            self._start_round(now, self.delivered, in_flight)
+            self.extra_acked.append(0)
+            self._on_round_end(now)
+
+        self._update_ack_aggregation(num_acked, now)
+
+        bdp = self.bdp()
+        if self.state == DRAIN and bdp is not None and in_flight <= bdp:
+            self._enter_probe_bw()
+        if self.state == PROBE_RTT and now >= self.probe_rtt_done:
+            self.min_rtt_stamp = now
+            self._enter_probe_bw()
+
+        self._update_cwnd(num_acked, bdp)
+        self.phase = f"BBR {self.state}"
+
+    def _start_round(self, now, delivered, in_flight):
+        self.round_start, self.round_delivered = now, delivered
+        self.round_end_delivered = delivered + max(in_flight, 1)
+
+    def _update_ack_aggregation(self, num_acked, now):
+        # Quanto foi confirmado além do que a banda estimada explicaria desde o
+        # início da rajada atual de ACKs
+        if not self.btl_bw or not self.extra_acked:
+            return
+        if self.ack_epoch_start is None:
+            self.ack_epoch_start, self.ack_epoch_acked = now, 0
+
+        expected = self.btl_bw * (now - self.ack_epoch_start)
+        if self.ack_epoch_acked <= expected:
+            self.ack_epoch_start, self.ack_epoch_acked = now, 0
+            expected = 0
+
+        self.ack_epoch_acked += num_acked
+        extra = min(self.ack_epoch_acked - expected, self.cwnd, self.btl_bw * self.EXTRA_ACKED_MAX)
+        if extra > self.extra_acked[-1]:
+            self.extra_acked[-1] = extra
+
+    def _on_round_end(self, now):
+        if self.state == STARTUP:
+            if self.btl_bw >= self.full_bw * 1.25:
+                self.full_bw, self.full_bw_count = self.btl_bw, 0
+            else:
+                self.full_bw_count += 1
+                if self.full_bw_count >= 3:
+                    self.state = DRAIN
+                    self.pacing_gain = 1 / self.STARTUP_GAIN
+
+        elif self.state == PROBE_BW:
+            self.cycle_index = (self.cycle_index + 1) % len(self.PROBE_BW_GAINS)
+            self.pacing_gain = self.PROBE_BW_GAINS[self.cycle_index]
+
+        if (self.state != PROBE_RTT and self.min_rtt_stamp is not None
+                and now - self.min_rtt_stamp > self.MIN_RTT_WINDOW):
+            self.state = PROBE_RTT
+            self.pacing_gain = 1
+            self.probe_rtt_done = now + self.PROBE_RTT_DURATION
+
+    def _enter_probe_bw(self):
+        self.state = PROBE_BW
+        self.cycle_index = 0
+        self.pacing_gain = self.PROBE_BW_GAINS[0]
+        self.cwnd_gain = 2
+
+    def _update_cwnd(self, num_acked, bdp):
+        if self.state == PROBE_RTT:
+            self.cwnd = self.MIN_CWND
+        elif bdp is None:
+            self.cwnd = self.cwnd + num_acked
+        else:
+            target = max(self.cwnd_gain * bdp + max(self.extra_acked, default=0), self.MIN_CWND)
+            self.cwnd = min(self.cwnd + num_acked, target) if self.cwnd < target else target
+        self.cwnd = min(self.cwnd, self.max_cwnd)
+
+    def enter_recovery(self, now):
+        # A perda não reduz o modelo, mas no STARTUP indica que o caminho já
+        # encheu (como no BBRv2): passa direto para o DRAIN.
+        if self.state == STARTUP:
+            self.state = DRAIN
+            self.pacing_gain = 1 / self.STARTUP_GAIN
+            self.full_bw = self.btl_bw
+
+    def on_timeout(self, now):
+        # O modelo (BtlBw, MinRTT) é mantido; só a janela recomeça
+        self.cwnd = self.initial_cwnd
+        self.in_fast_recovery, self.duplicate_acks = False, 0
+
+    def pacing_rate(self, srtt):
+        if self.btl_bw:
+            return self.pacing_gain * self.btl_bw
+        return super().pacing_rate(srtt)
+
+CONTROLLERS = {
+    Reno.name: Reno,
+    Cubic.name: Cubic,
+    Bbr.name: Bbr,
+}
+
+def make_controller(name, **kwargs):
+    try:
+        return CONTROLLERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Controle de congestionamento desconhecido: {name}")
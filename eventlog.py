@@ -0,0 +1,190 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+# ======================================================================================
+# Log de Eventos (nivelado, estruturado, com descarga assíncrona)
+# ======================================================================================
+#
+# Os laços de envio e recebimento não formatam nem escrevem nada: cada evento
+# vira uma tupla (instante, tipo, seq, ack, cwnd, extra) num buffer circular
+# em memória, e uma thread separada descarrega o buffer de tempos em tempos
+# num renderizador (o diagrama ASCII ou JSON por linha).
+#
+# O nível é testado no ponto de chamada, antes de montar os argumentos:
+#
+#   if log.packets:
+#       log.record(DATA_SENT, seq, 0, cwnd, msg_num)
+#
+# Desligado, o custo é a leitura de um atributo. Se o buffer encher antes de
+# ser descarregado, os eventos mais antigos são descartados.
+
+OFF     = 0
+EVENTS  = 1     # perdas, retransmissões, timeouts, fast retransmit
+PACKETS = 2     # todo segmento, ACK, rodada e mudança de CWND
+
+LEVELS = {'off': OFF, 'events': EVENTS, 'packets': PACKETS}
+
+# Tipos de evento
+(DATA_SENT, DATA_LOST, RETRANS, TIMEOUT, FAST_RETRANSMIT,
+ ACK_NEW, ACK_DUP, ACK_OLD, ROUND, BATCH, CWND,
+ DATA_RECV, DATA_OOO, DATA_DUP, BUFFERED, ACK_SENT,
+ ZERO_WINDOW, WINDOW_PROBE) = range(18)
+
+EVENT_NAMES = ('data_sent', 'data_lost', 'retrans', 'timeout', 'fast_retransmit',
+               'ack_new', 'ack_dup', 'ack_old', 'round', 'batch', 'cwnd',
+               'data_recv', 'data_ooo', 'data_dup', 'buffered', 'ack_sent',
+               'zero_window', 'window_probe')
+
+class EventLog:
+    def __init__(self, level=EVENTS, renderer=None, capacity=65536, flush_interval=0.25):
+        self.renderer = renderer
+        self.flush_interval = flush_interval
+        self._ring = deque(maxlen=capacity)
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.set_level(level)
+
+    def set_level(self, level):
+        if isinstance(level, str):
+            level = LEVELS[level]
+        self.level = level
+        self.events = level >= EVENTS
+        self.packets = level >= PACKETS
+
+    def record(self, kind, seq=0, ack=0, cwnd=0.0, extra=None):
+        self._ring.append((time.monotonic() - self._t0, kind, seq, ack, cwnd, extra))
+
+    def start(self):
+        # Sobe a thread de descarga (uma só, e só se houver o que mostrar)
+        if self._thread is not None or self.renderer is None or not self.level:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='eventlog', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        # Esvazia o buffer no renderizador; chamado pela thread e por quem
+        # precisa que tudo já esteja escrito antes de imprimir um resumo.
+        with self._lock:
+            ring, events = self._ring, []
+            while ring:
+                events.append(ring.popleft())
+            if events and self.renderer is not None:
+                self.renderer.render(events)
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def snapshot(self):
+        # Eventos ainda não descarregados (útil sem renderizador)
+        return list(self._ring)
+
+# ======================================================================================
+# Renderizadores
+# ======================================================================================
+
+def _pad(text, width=30):
+    return f"{text}{' '*(width-len(text))}"
+
+class DiagramRenderer:
+    # O diagrama de setas Cliente/Servidor que os scripts imprimiam direto
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def render(self, events):
+        lines = []
+        for t, kind, seq, ack, cwnd, extra in events:
+            lines.append(self.format(kind, seq, ack, cwnd, extra))
+        self.stream.write('\n'.join(lines) + '\n')
+        self.stream.flush()
+
+    def format(self, kind, seq, ack, cwnd, extra):
+        if kind == DATA_SENT:
+            return f"   |◀─────── {_pad(f'DADOS (seq={seq})')} ───────| (Msg {extra})"
+        if kind == DATA_LOST:
+            return f"   |<--X--- [PERDIDO] seq={seq} ---X-->|"
+        if kind == RETRANS:
+            return f"   |◀───────  {_pad(f'RETRANS (seq={seq})')} ───────|"
+        if kind == TIMEOUT:
+            name, old_cwnd, old_ssthresh, ssthresh, rto = extra
+            return (f"\n{'!'*60}\n"
+                    f"  TIMEOUT ({name}) - CWND: {old_cwnd:.1f} → {cwnd:.1f}, "
+                    f"SSThresh: {old_ssthresh:.1f} → {ssthresh:.1f}\n"
+                    f"{'!'*60}\n\n"
+                    f"   |◀───────  {_pad(f'TIMEOUT RE-TX (seq={seq})')} ───────| (RTO: {rto*1000:.0f} ms)")
+        if kind == FAST_RETRANSMIT:
+            name, ssthresh = extra
+            return (f"\n{'!'*40}\n"
+                    f"  FAST RETRANSMIT ({name}) - CWND: {cwnd:.1f}, SSThresh: {ssthresh:.1f}\n"
+                    f"{'!'*40}\n")
+        if kind == ACK_NEW:
+            return f"   |───── {_pad(f'ACK (ack={ack})')} ────▶| ✓ {extra} pct(s) confirmado(s)"
+        if kind == ACK_DUP:
+            return f"   |───── {_pad(f'ACK (ack={ack})')} ────▶| ⚠️ Duplicado #{extra}"
+        if kind == ACK_OLD:
+            return f"   |───── {_pad(f'ACK (ack={ack})')} ────▶| (Antigo)"
+        if kind == ROUND:
+            window, in_flight = extra
+            return (f"\n{'─'*70}\n"
+                    f" RODADA {seq}\n"
+                    f"   CWND: {cwnd:.1f} pacotes | Window: {window:.1f} | Em voo: {in_flight}\n"
+                    f"{'─'*70}")
+        if kind == BATCH:
+            return f"    Enviados {extra} pacote(s) nesta iteração"
+        if kind == CWND:
+            old_cwnd, ssthresh, phase = extra
+            return f"   [{phase}] CWND: {old_cwnd:.1f} → {cwnd:.1f} (SSThresh: {ssthresh:.1f})"
+        if kind == DATA_RECV:
+            return f"   |◀────── {_pad(f'DADOS (seq={seq})')} ───────|"
+        if kind == DATA_OOO:
+            return f"   |◀────── {_pad(f'DADOS (seq={seq})')} ───────| [!] Fora de ordem (bufferizado)"
+        if kind == DATA_DUP:
+            return f"   |◀────── {_pad(f'DADOS (seq={seq})')} ───────| [!] Duplicado"
+        if kind == BUFFERED:
+            return f"   |  [BUFFER] Processando seq={seq}"
+        if kind == ACK_SENT:
+            reason, count, rwnd = extra
+            return f"   |─────── {_pad(f'ACK (ack={ack})')} ────▶|  ({reason.format(count)}) rwnd={rwnd}"
+        if kind == ZERO_WINDOW:
+            return f"   [JANELA ZERO] receptor sem espaço (ack={ack}), aguardando atualização"
+        if kind == WINDOW_PROBE:
+            return f"   |◀───────  {_pad(f'SONDA (seq={seq})')} ───────| (próxima em {extra*1000:.0f} ms)"
+        return f"   [{EVENT_NAMES[kind]}] seq={seq} ack={ack} cwnd={cwnd}"
+
+class JsonLinesRenderer:
+    # Um objeto JSON por evento, para análise posterior
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def render(self, events):
+        dumps = json.dumps
+        self.stream.write(''.join(
+            dumps({'t': round(t, 6), 'type': EVENT_NAMES[kind], 'seq': seq, 'ack': ack,
+                   'cwnd': cwnd, 'extra': extra}) + '\n'
+            for t, kind, seq, ack, cwnd, extra in events))
+        self.stream.flush()
+
+def make_log(level='events', output='diagram', path=None):
+    # output: 'diagram' (terminal) ou 'jsonl' (arquivo em path, ou stdout)
+    if output == 'diagram':
+        renderer = DiagramRenderer()
+    elif output == 'jsonl':
+        renderer = JsonLinesRenderer(open(path, 'w') if path else sys.stdout)
+    else:
+        raise ValueError(f"Renderizador de log desconhecido: {output}")
+    return EventLog(level, renderer)
@@ -0,0 +1,52 @@
+from bisect import bisect_left, bisect_right
+
+# ======================================================================================
+# Conjunto de Intervalos
+# ======================================================================================
+#
+# Faixas [início, fim) disjuntas e ordenadas, guardadas em duas listas
+# paralelas; faixas que se tocam ou se sobrepõem são fundidas na inserção.
+# Serve para o estado de remontagem do receptor: o que chegou acima do
+# próximo byte esperado ocupa uma entrada por buraco, não uma por segmento.
+
+class IntervalSet:
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts, self._ends)
+
+    def add(self, start, end):
+        starts, ends = self._starts, self._ends
+        i = bisect_left(ends, start)       # primeira faixa que termina em start ou depois
+        j = bisect_right(starts, end)      # faixas que começam até end se fundem
+        if i < j:
+            start = min(start, starts[i])
+            end = max(end, ends[j - 1])
+        starts[i:j] = [start]
+        ends[i:j] = [end]
+
+    def contains(self, start, end=None):
+        # True se [start, end) (ou o ponto start) já está inteiramente no conjunto
+        i = bisect_right(self._starts, start) - 1
+        if i < 0:
+            return False
+        return (end or start + 1) <= self._ends[i]
+
+    def pop_from(self, start):
+        # Remove a primeira faixa se ela começa em start (ou antes) e retorna
+        # o seu fim; senão retorna None.
+        if self._starts and self._starts[0] <= start:
+            del self._starts[0]
+            return self._ends.pop(0)
+        return None
+
+    def size(self):
+        return sum(end - start for start, end in self)
@@ -0,0 +1,166 @@
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ======================================================================================
+# Métricas ao Vivo (texto do Prometheus, por HTTP ou socket Unix)
+# ======================================================================================
+#
+# Os laços não mantêm nenhum contador a mais: cada conexão registra uma
+# função que lê o estado que ela já guarda (as variáveis de send_messages e
+# receive_and_ack por closure, os atributos de Connection no servidor
+# assíncrono) e devolve um dicionário {métrica: valor}. Só quando alguém pede
+# as métricas essas funções são chamadas, na thread do servidor de métricas;
+# sob o GIL cada leitura vê um valor inteiro, no máximo de um pacote atrás.
+#
+# Ao fim de uma conexão os contadores dela somam-se aos totais do processo.
+#
+#   serve_metrics(('127.0.0.1', 9100))      curl http://127.0.0.1:9100/metrics
+#   serve_metrics('/tmp/transporte.sock')   socat - UNIX-CONNECT:/tmp/transporte.sock
+
+PREFIX = 'transport_'
+
+# (nome, tipo, ajuda) na ordem de exibição; uma conexão só mostra as que
+# o seu dicionário traz
+CONNECTION_METRICS = (
+    ('cwnd_packets',             'gauge',   "Janela de congestionamento (pacotes)"),
+    ('ssthresh_packets',         'gauge',   "Limiar do slow start (pacotes)"),
+    ('srtt_seconds',             'gauge',   "RTT suavizado"),
+    ('rto_seconds',              'gauge',   "Temporizador de retransmissão atual"),
+    ('bytes_in_flight',          'gauge',   "Bytes enviados e ainda não confirmados"),
+    ('peer_rwnd_bytes',          'gauge',   "Última janela anunciada pelo receptor"),
+    ('bytes_acked_total',        'counter', "Bytes confirmados pelo receptor"),
+    ('retransmissions_total',    'counter', "Segmentos retransmitidos"),
+    ('dup_acks_total',           'counter', "ACKs duplicados recebidos"),
+    ('window_probes_total',      'counter', "Sondas de janela zero enviadas"),
+    ('packets_received_total',   'counter', "Segmentos de dados recebidos (sem duplicados)"),
+    ('packets_buffered_total',   'counter', "Segmentos recebidos fora de ordem"),
+    ('acks_sent_total',          'counter', "ACKs enviados"),
+    ('bytes_delivered_total',    'counter', "Bytes entregues em ordem"),
+    ('rwnd_bytes',               'gauge',   "Janela anunciada ao transmissor"),
+    ('goodput_bytes_per_second', 'gauge',   "Bytes confirmados (ou entregues) por segundo desde o início"),
+)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}      # {handle: (labels, snapshot)}
+        self._finished = {}         # {contador: soma das conexões encerradas}
+        self._next_handle = 0
+        self.connections_total = 0
+
+    def register(self, labels, snapshot):
+        # labels: {nome: valor}; snapshot() -> {métrica: valor}
+        with self._lock:
+            handle = self._next_handle
+            self._next_handle += 1
+            self._connections[handle] = (labels, snapshot)
+            self.connections_total += 1
+        return handle
+
+    def unregister(self, handle):
+        with self._lock:
+            entry = self._connections.pop(handle, None)
+        if entry is None:
+            return
+        values = _read(entry[1])
+        with self._lock:
+            for name, value in values.items():
+                if name.endswith('_total'):
+                    self._finished[name] = self._finished.get(name, 0) + value
+
+    def render(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            totals = dict(self._finished)
+            connections_total = self.connections_total
+        samples = [(labels, _read(snapshot)) for labels, snapshot in connections]
+
+        lines = []
+        for name, kind, help_text in CONNECTION_METRICS:
+            rows = [(labels, values[name]) for labels, values in samples if name in values]
+            if not rows:
+                continue
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for labels, value in rows:
+                lines.append(f"{PREFIX}{name}{{{_labels(labels)}}} {_number(value)}")
+
+        # Totais do processo: conexões encerradas + as ativas
+        for _, values in samples:
+            for name, value in values.items():
+                if name.endswith('_total'):
+                    totals[name] = totals.get(name, 0) + value
+        lines.append(f"# TYPE {PREFIX}connections_active gauge")
+        lines.append(f"{PREFIX}connections_active {len(connections)}")
+        lines.append(f"# TYPE {PREFIX}connections_total counter")
+        lines.append(f"{PREFIX}connections_total {connections_total}")
+        for name, _, _ in CONNECTION_METRICS:
+            if name in totals:
+                lines.append(f"# TYPE {PREFIX}process_{name} counter")
+                lines.append(f"{PREFIX}process_{name} {_number(totals[name])}")
+        return '\n'.join(lines) + '\n'
+
+def _read(snapshot):
+    # Uma conexão que falhe ao ler (ex.: acabou de fechar) não derruba as outras
+    try:
+        return snapshot()
+    except Exception:
+        return {}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def goodput(nbytes, started_at):
+    # Bytes por segundo desde started_at (time.monotonic)
+    elapsed = time.monotonic() - started_at
+    return nbytes / elapsed if elapsed > 0 else 0.0
+
+registry = MetricsRegistry()    # um por processo
+
+# ======================================================================================
+# Servidores
+# ======================================================================================
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(self.server.registry.render().encode())
+
+def serve_metrics(address, registry=registry):
+    # address: (ip, porta) para HTTP, ou caminho de um socket Unix. Roda numa
+    # thread daemon; retorna o servidor (shutdown() para parar).
+    if isinstance(address, (str, os.PathLike)):
+        if os.path.exists(address):
+            os.unlink(address)
+        server = socketserver.ThreadingUnixStreamServer(os.fspath(address), _UnixHandler)
+    else:
+        server = ThreadingHTTPServer(tuple(address), _HttpHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
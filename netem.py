@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import random
+import time
+
+# ======================================================================================
+# Emulador de Rede (proxy UDP com perdas, atraso, reordenação e banda)
+# ======================================================================================
+#
+# Fica entre o cliente e o servidor no loopback e degrada o tráfego nos dois
+# sentidos - dados, ACKs, handshake e FIN -, como o netem do Linux:
+#
+#   cliente ──▶ [porta do proxy] ──(uplink)──▶ servidor
+#   cliente ◀── [porta do proxy] ◀─(downlink)── servidor
+#
+# Cada cliente ganha um socket próprio para falar com o servidor, então o
+# servidor multi-cliente continua vendo endereços distintos. Em cada sentido
+# o datagrama passa, nesta ordem, por: perda (Bernoulli ou Gilbert-Elliott),
+# duplicação, limite de banda (token bucket; o excesso espera na fila e é
+# descartado se a espera passar de queue_delay), atraso com jitter e
+# reordenação. O jitter não inverte a ordem (um pacote nunca sai antes do
+# anterior, como numa fila FIFO); só reorder faz isso: com essa
+# probabilidade o pacote sai sem o atraso e ultrapassa os anteriores.
+#
+# As decisões aleatórias vêm de um gerador com semente por sentido: com a
+# mesma semente e a mesma sequência de pacotes, as mesmas perdas se repetem.
+#
+# Uso (desligue a perda simulada do servidor com LOSS_RATE = 0 e aponte o
+# cliente para a porta do proxy):
+#
+#   python netem.py --listen 20002 --server 127.0.0.1:20001 --profile bursty --seed 7
+
+class Profile:
+    def __init__(self, loss=0.0, gilbert=None, delay=0.0, jitter=0.0, reorder=0.0,
+                 duplicate=0.0, rate=None, burst=16384, queue_delay=0.1):
+        self.loss = loss            # probabilidade de perda (Bernoulli)
+        self.gilbert = gilbert      # (p, r, perda_bom, perda_ruim) - substitui loss
+        self.delay = delay          # atraso de ida em s
+        self.jitter = jitter        # desvio padrão do atraso em s
+        self.reorder = reorder      # probabilidade de sair sem atraso
+        self.duplicate = duplicate  # probabilidade de duplicar
+        self.rate = rate            # bytes/s (None = sem limite)
+        self.burst = burst          # tamanho do balde em bytes
+        self.queue_delay = queue_delay
+
+    def replace(self, **changes):
+        profile = Profile(**vars(self))
+        for name, value in changes.items():
+            if value is not None:
+                setattr(profile, name, value)
+        return profile
+
+PROFILES = {
+    'clean':  Profile(),
+    'lossy':  Profile(loss=0.01),
+    # Perdas em rajada: ~1% do tempo no estado ruim, que dura ~3 pacotes e perde metade
+    'bursty': Profile(gilbert=(0.01, 0.3, 0.0, 0.5)),
+    'wan':    Profile(loss=0.001, delay=0.02, jitter=0.002, rate=1_250_000),     # 10 Mbit/s
+    'mobile': Profile(gilbert=(0.02, 0.2, 0.001, 0.3), delay=0.04, jitter=0.015,
+                      reorder=0.01, duplicate=0.005, rate=250_000),              # 2 Mbit/s
+}
+
+class Impairment:
+    # Um sentido do enlace: decide o destino de cada datagrama e agenda a entrega
+
+    def __init__(self, profile, rng):
+        self.profile = profile
+        self.rng = rng
+        self.bad_state = False
+        self.tokens = profile.burst
+        self.last_refill = 0.0
+        self.last_departure = 0.0
+        self.stats = {'received': 0, 'lost': 0, 'queue_drops': 0, 'duplicated': 0,
+                      'reordered': 0, 'delivered': 0}
+
+    def _lost(self):
+        profile, rng = self.profile, self.rng
+        if profile.gilbert is None:
+            return rng.random() < profile.loss
+
+        p, r, loss_good, loss_bad = profile.gilbert
+        if self.bad_state:
+            self.bad_state = rng.random() >= r
+        else:
+            self.bad_state = rng.random() < p
+        return rng.random() < (loss_bad if self.bad_state else loss_good)
+
+    def _queue_wait(self, size, now):
+        # Token bucket com saldo negativo: o quanto faltar vira espera na fila.
+        # Retorna None se a espera passar do limite (descarte na cauda).
+        profile = self.profile
+        if profile.rate is None:
+            return 0.0
+        self.tokens = min(profile.burst, self.tokens + (now - self.last_refill) * profile.rate)
+        self.last_refill = now
+        wait = max(size - self.tokens, 0) / profile.rate
+        if wait > profile.queue_delay:
+            return None
+        self.tokens -= size
+        return wait
+
+    def _departure(self, now, wait):
+        profile, rng = self.profile, self.rng
+        if profile.reorder and rng.random() < profile.reorder:
+            self.stats['reordered'] += 1
+            return now + wait
+        delay = profile.delay
+        if profile.jitter:
+            delay = max(rng.gauss(delay, profile.jitter), 0.0)
+        # +1 µs: o heap de timers do loop não preserva a ordem entre prazos iguais
+        self.last_departure = max(now + wait + delay, self.last_departure + 1e-6)
+        return self.last_departure
+
+    def submit(self, data, deliver):
+        # Aplica o perfil e chama deliver(data) na hora certa (ou nunca)
+        stats = self.stats
+        stats['received'] += 1
+        if self._lost():
+            stats['lost'] += 1
+            return
+
+        copies = 1
+        if self.profile.duplicate and self.rng.random() < self.profile.duplicate:
+            copies = 2
+            stats['duplicated'] += 1
+
+        # Prazos absolutos no relógio do loop: com call_later cada pacote
+        # ganharia a deriva do instante em que foi agendado
+        loop = asyncio.get_running_loop()
+        for _ in range(copies):
+            now = loop.time()
+            wait = self._queue_wait(len(data), now)
+            if wait is None:
+                stats['queue_drops'] += 1
+                continue
+            departure = self._departure(now, wait)
+            stats['delivered'] += 1
+            if departure > now:
+                loop.call_at(departure, deliver, data)
+            else:
+                deliver(data)
+
+# ======================================================================================
+# Proxy
+# ======================================================================================
+
+class Upstream(asyncio.DatagramProtocol):
+    # Socket de um cliente em direção ao servidor
+
+    def __init__(self, proxy, client_address):
+        self.proxy = proxy
+        self.client_address = client_address
+        self.transport = None
+        self.pending = []       # datagramas que chegaram antes do socket abrir
+        self.last_activity = time.monotonic()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        for data in self.pending:
+            transport.sendto(data)
+        self.pending = []
+
+    def datagram_received(self, data, address):
+        self.last_activity = time.monotonic()
+        self.proxy.downlink.submit(data, self.to_client)
+
+    def to_server(self, data):
+        if self.transport is None:
+            self.pending.append(data)
+        elif not self.transport.is_closing():
+            self.transport.sendto(data)
+
+    def to_client(self, data):
+        self.proxy.transport.sendto(data, self.client_address)
+
+class NetemProxy(asyncio.DatagramProtocol):
+    def __init__(self, server_address, uplink, downlink, seed=0, idle_timeout=30.0):
+        self.server_address = server_address
+        # Um gerador por sentido, para que o tráfego de um não mude as perdas do outro
+        self.uplink = Impairment(uplink, random.Random(2 * seed))
+        self.downlink = Impairment(downlink, random.Random(2 * seed + 1))
+        self.idle_timeout = idle_timeout
+        self.transport = None
+        self.links = {}     # {endereço do cliente: Upstream}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        link = self.links.get(address)
+        if link is None:
+            link = self.links[address] = Upstream(self, address)
+            loop = asyncio.get_running_loop()
+            loop.create_task(loop.create_datagram_endpoint(
+                lambda: link, remote_addr=self.server_address))
+            print(f"[netem] Novo cliente {address[0]}:{address[1]} - enlaces: {len(self.links)}")
+        link.last_activity = time.monotonic()
+        self.uplink.submit(data, link.to_server)
+
+    def expire_idle(self):
+        now = time.monotonic()
+        for address, link in list(self.links.items()):
+            if now - link.last_activity > self.idle_timeout:
+                if link.transport:
+                    link.transport.close()
+                del self.links[address]
+
+    def report(self):
+        for name, direction in (('uplink  ', self.uplink), ('downlink', self.downlink)):
+            s = direction.stats
+            print(f"[netem] {name}: {s['received']} recebidos, {s['lost']} perdidos, "
+                  f"{s['queue_drops']} descartados na fila, {s['duplicated']} duplicados, "
+                  f"{s['reordered']} reordenados, {s['delivered']} entregues")
+
+# ======================================================================================
+# Main
+# ======================================================================================
+
+async def run(listen_address, server_address, uplink, downlink, seed):
+    loop = asyncio.get_running_loop()
+    transport, proxy = await loop.create_datagram_endpoint(
+        lambda: NetemProxy(server_address, uplink, downlink, seed), local_addr=listen_address)
+    print(f"[netem] {listen_address[0]}:{listen_address[1]} → {server_address[0]}:{server_address[1]} "
+          f"(semente {seed})")
+
+    try:
+        while True:
+            await asyncio.sleep(5)
+            proxy.expire_idle()
+    finally:
+        proxy.report()
+        transport.close()
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+def main():
+    parser = argparse.ArgumentParser(description="Proxy UDP que emula perdas, atraso e banda")
+    parser.add_argument('--listen', type=parse_address, default=('127.0.0.1', 20002))
+    parser.add_argument('--server', type=parse_address, default=('127.0.0.1', 20001))
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='clean')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--loss', type=float)
+    parser.add_argument('--gilbert', type=float, nargs=4, metavar=('P', 'R', 'PERDA_BOM', 'PERDA_RUIM'))
+    parser.add_argument('--delay', type=float, help="atraso de ida em s")
+    parser.add_argument('--jitter', type=float)
+    parser.add_argument('--reorder', type=float)
+    parser.add_argument('--duplicate', type=float)
+    parser.add_argument('--rate', type=float, help="bytes/s")
+    parser.add_argument('--burst', type=int)
+    parser.add_argument('--queue-delay', type=float)
+    parser.add_argument('--downlink-only', action='store_true',
+                        help="não degrada o sentido cliente → servidor (ACKs)")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile].replace(
+        loss=args.loss, gilbert=tuple(args.gilbert) if args.gilbert else None,
+        delay=args.delay, jitter=args.jitter, reorder=args.reorder, duplicate=args.duplicate,
+        rate=args.rate, burst=args.burst, queue_delay=args.queue_delay)
+    if args.loss is not None and not args.gilbert:
+        profile.gilbert = None      # --loss pede perda Bernoulli
+    uplink = PROFILES['clean'] if args.downlink_only else profile
+
+    try:
+        asyncio.run(run(args.listen, args.server, uplink, profile, args.seed))
+    except KeyboardInterrupt:
+        print("[netem] Encerrado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# ======================================================================================
+# Pacing do Transmissor (balde de fichas em pacotes)
+# ======================================================================================
+#
+# Sem pacing, cada ACK que abre a janela faz o laço despejar tudo o que cabe
+# de uma vez, na velocidade da interface, e a rajada estoura os buffers do
+# caminho. Aqui os segmentos novos saem a uma taxa (pacotes/s) dada pelo
+# controlador de congestionamento (pacing_rate: cwnd/SRTT com ganho, ou a
+# banda estimada do BBR): as fichas enchem a essa taxa e cada segmento gasta
+# uma.
+#
+# O balde guarda no máximo uma rajada: quantum pacotes, ou o que a taxa
+# libera em granularity segundos se for mais. Abaixo de ~1 ms os
+# temporizadores do Python/kernel não acordam com precisão, então em taxas
+# altas é melhor mandar um grupo pequeno por vez do que perder o prazo. Depois
+# de um período ocioso o balde também só tem uma rajada: a janela inteira não
+# sai de uma vez.
+#
+# Sem amostra de RTT ainda (rate None) não há pacing, e o que sai nesse
+# período não conta contra o balde.
+
+class Pacer:
+    def __init__(self, quantum=4, granularity=0.001):
+        self.quantum = quantum
+        self.granularity = granularity
+        self.rate = None        # pacotes/s
+        self.tokens = quantum
+        self._last = None
+
+    def burst(self):
+        return max(self.quantum, self.rate * self.granularity)
+
+    def _refill(self, now):
+        if self.rate is not None and self._last is not None:
+            self.tokens = min(self.burst(), self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate, now):
+        self._refill(now)
+        self.rate = rate
+
+    def allowance(self, now):
+        # Quantos segmentos podem sair agora (None = sem limite)
+        if self.rate is None:
+            return None
+        self._refill(now)
+        return int(self.tokens)
+
+    def consume(self, count):
+        # Segmentos enviados sem pacing (rate None) não gastam fichas: a rajada
+        # inicial não pode deixar o balde negativo e atrasar o primeiro intervalo
+        if self.rate is not None:
+            self.tokens = max(self.tokens - count, 0)
+
+    def next_release(self, now):
+        # Instante (mesmo relógio de now) em que a próxima ficha fica pronta
+        if self.rate is None or self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / self.rate
@@ -0,0 +1,172 @@
+import struct
+
+# ======================================================================================
+# Formato do Segmento (cabeçalho binário compartilhado por cliente e servidor)
+# ======================================================================================
+#
+#   0        1        2                 4                         8                        12
+#   +--------+--------+-----------------+-------------------------+-------------------------+
+#   | versão | flags  |      rwnd       |           seq           |           ack           |
+#   +--------+--------+-----------------+-------------------------+-------------------------+
+#   |                                payload (bytes crus) ...
+#
+# Todos os inteiros em ordem de rede (big-endian). O payload vem logo após o
+# cabeçalho, sem nenhum delimitador: o tamanho é o que sobra do datagrama.
+#
+# rwnd é o espaço livre do receptor em BYTES, deslocado à direita pelo fator
+# de escala que ele anunciou no handshake (OPT_WSCALE). No SYN não há escala.
+# Quem não anuncia OPT_WSCALE manda DEFAULT_RWND, que não significa nada.
+
+VERSION = 1
+
+HEADER      = struct.Struct('!BBHII')
+HEADER_SIZE = HEADER.size
+
+DEFAULT_RWND = 1024
+
+# Flags (1 bit cada)
+FLAG_SYN  = 0x01
+FLAG_FIN  = 0x02
+FLAG_SACK = 0x04    # o payload do ACK traz blocos SACK (ver pack_sack)
+FLAG_COMPRESSED = 0x08  # payload de dados comprimido sozinho (ver compression.py)
+
+# ======================================================================================
+# Empacotamento/Desempacotamento
+# ======================================================================================
+
+def pack_segment(seq, ack, flags=0, rwnd=DEFAULT_RWND, payload=b''):
+    return HEADER.pack(VERSION, flags, rwnd, seq, ack) + payload
+
+def unpack_segment(data):
+    # Retorna (seq, ack, rwnd, flags, payload); o payload é uma fatia memoryview
+    # do próprio datagrama, sem cópia.
+    view = memoryview(data)
+    if len(view) < HEADER_SIZE:
+        raise ValueError(f"Segmento truncado ({len(view)} bytes)")
+
+    version, flags, rwnd, seq, ack = HEADER.unpack_from(view)
+    if version != VERSION:
+        raise ValueError(f"Versão de cabeçalho desconhecida: {version}")
+
+    return seq, ack, rwnd, flags, view[HEADER_SIZE:]
+
+class ReceiveBuffer:
+    # Um bytearray reaproveitado por todos os recebimentos de um laço
+    # (recvfrom_into): nenhum objeto novo por datagrama além da fatia
+    # memoryview. O payload devolvido só vale até o próximo receive; quem
+    # precisa dele depois (ex.: segmento fora de ordem segurado) copia.
+    def __init__(self, size):
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+
+    def receive(self, sock):
+        # Retorna ((seq, ack, rwnd, flags, payload), endereço), como unpack_segment
+        size, address = sock.recvfrom_into(self._buffer)
+        return unpack_segment(self._view[:size]), address
+
+# ======================================================================================
+# Opções do Handshake (payload do SYN / SYN-ACK)
+# ======================================================================================
+#
+# Sequência de TLVs: tipo (1 byte), tamanho (1 byte), valor (tamanho bytes).
+# Tipos desconhecidos são ignorados, então cada lado pode anunciar opções novas
+# sem quebrar um par mais antigo.
+
+OPTION          = struct.Struct('!BB')
+OPT_TRANSFORM   = 1    # id da transformação de payload usada por quem envia (1 byte)
+OPT_MSS         = 2    # maior payload que quem anuncia aceita receber (2 bytes)
+OPT_WSCALE      = 3    # deslocamento aplicado ao rwnd de quem anuncia (1 byte, RFC 7323)
+OPT_STREAMS     = 4    # cliente: fluxos simultâneos que aceita; servidor: fluxos que vai abrir (2 bytes)
+OPT_TOKEN       = 5    # token de retomada: cliente apresenta (vazio = pede um), servidor emite (ver resumption.py)
+OPT_COMPRESS    = 6    # dicionário e maior payload descomprimido: cliente aceita, servidor usa (ver compression.py)
+
+MSS_VALUE     = struct.Struct('!H')
+STREAMS_VALUE = struct.Struct('!H')
+COMPRESS_VALUE = struct.Struct('!BH')
+DEFAULT_MSS = 1024 - HEADER_SIZE    # par que não anuncia: o buffer de 1024 bytes de sempre
+
+MAX_RWND   = 0xFFFF
+MAX_WSCALE = 14
+
+def pack_options(options):
+    # options: {tipo: bytes}
+    out = bytearray()
+    for kind, value in options.items():
+        out += OPTION.pack(kind, len(value))
+        out += value
+    return bytes(out)
+
+def unpack_options(data):
+    view = memoryview(data)
+    options, offset = {}, 0
+    while offset + OPTION.size <= len(view):
+        kind, length = OPTION.unpack_from(view, offset)
+        offset += OPTION.size
+        options[kind] = view[offset:offset + length].tobytes()
+        offset += length
+    return options
+
+def window_scale_for(buffer_bytes):
+    # Menor deslocamento que faz o buffer caber nos 16 bits do rwnd
+    shift = 0
+    while buffer_bytes >> shift > MAX_RWND and shift < MAX_WSCALE:
+        shift += 1
+    return shift
+
+def negotiate_mss(options, local_mss):
+    # MSS efetivo: o menor entre o nosso e o anunciado pelo par
+    peer_mss = MSS_VALUE.unpack(options[OPT_MSS])[0] if OPT_MSS in options else DEFAULT_MSS
+    return min(local_mss, peer_mss)
+
+# ======================================================================================
+# Blocos SACK (payload de um ACK com FLAG_SACK)
+# ======================================================================================
+#
+# 1 byte com a quantidade de blocos, seguido de pares (left, right) de 32 bits:
+# cada bloco é um intervalo [left, right) recebido fora de ordem, acima do ACK
+# cumulativo.
+
+SACK_COUNT      = struct.Struct('!B')
+SACK_BLOCK      = struct.Struct('!II')
+MAX_SACK_BLOCKS = 8
+
+def pack_sack(blocks):
+    blocks = blocks[:MAX_SACK_BLOCKS]
+    out = bytearray(SACK_COUNT.pack(len(blocks)))
+    for left, right in blocks:
+        out += SACK_BLOCK.pack(left, right)
+    return bytes(out)
+
+def unpack_sack(data):
+    view = memoryview(data)
+    if not view:
+        return []
+    count = view[0]
+    return [SACK_BLOCK.unpack_from(view, SACK_COUNT.size + i * SACK_BLOCK.size) for i in range(count)]
+
+# ======================================================================================
+# Quadros de Fluxo (payload de dados quando OPT_STREAMS foi negociado)
+# ======================================================================================
+#
+# Cada segmento de dados leva um pedaço de um único fluxo, precedido de:
+#
+#   id do fluxo (2 bytes) | flags (1 byte) | offset no fluxo (4 bytes)
+#
+# O seq do segmento continua contando os bytes da conexão (quadro incluído);
+# o offset diz onde os dados caem dentro do fluxo. STREAM_FIN marca o último
+# pedaço (que pode vir vazio). O cabeçalho do quadro não passa pela
+# transformação de payload, só os dados.
+
+STREAM_FRAME = struct.Struct('!HBI')
+STREAM_FIN   = 0x01
+
+def pack_frame(stream_id, offset, data, fin=False):
+    return STREAM_FRAME.pack(stream_id, STREAM_FIN if fin else 0, offset) + data
+
+def unpack_frame(payload):
+    # Retorna (id do fluxo, offset, fin, dados)
+    view = memoryview(payload)
+    if len(view) < STREAM_FRAME.size:
+        raise ValueError(f"Quadro de fluxo truncado ({len(view)} bytes)")
+    stream_id, flags, offset = STREAM_FRAME.unpack_from(view)
+    return stream_id, offset, bool(flags & STREAM_FIN), view[STREAM_FRAME.size:]
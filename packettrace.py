@@ -0,0 +1,89 @@
+import json
+import struct
+import sys
+
+# ======================================================================================
+# Trace Binário de Pacotes (para reprodução offline, ver replay.py)
+# ======================================================================================
+#
+# Com packet_trace configurado, send_messages e receive_and_ack gravam cada
+# envio, recebimento, perda simulada, ACK e disparo de temporizador como um
+# registro de tamanho fixo, com o instante em nanossegundos do relógio
+# monotônico. O transmissor toma esse mesmo instante (monotonic_ns / 1e9) como
+# o "agora" que passa ao controle de congestionamento, à fila e ao estimador
+# de RTT: refeitas a partir do trace, as mesmas chamadas recebem exatamente os
+# mesmos números.
+#
+#   "PTR1" | tamanho do cabeçalho (uint32) | cabeçalho JSON (papel e parâmetros)
+#   registros de 32 bytes little-endian, até o fim do arquivo:
+#
+#   t_ns (Q) | tipo (B) | flags (B) | rwnd (H) | seq (I) | ack (I) | length (I) | value (d)
+#
+# value é a CWND depois do evento no transmissor. Os registros ficam num
+# bytearray e vão ao arquivo em blocos de flush_every; `python packettrace.py
+# arquivo.ptr` imprime um evento por linha.
+
+MAGIC = b'PTR1'
+HEADER_LENGTH = struct.Struct('<I')
+RECORD = struct.Struct('<QBBHIIId')
+
+NS_PER_S = 1e9
+
+# Tipos de registro
+(SEND, DROP, RETRANS, SACK, ACK, TIMEOUT, PROBE,      # transmissor
+ RECV, ACK_SENT, DELAYED_ACK, FIN) = range(11)         # receptor
+
+KIND_NAMES = ('send', 'drop', 'retrans', 'sack', 'ack', 'timeout', 'probe',
+              'recv', 'ack_sent', 'delayed_ack', 'fin')
+
+class TraceWriter:
+    # role: 'sender' ou 'receiver'; params: o que replay.py precisa para
+    # montar o mesmo estado inicial (ver send_messages e receive_and_ack)
+    def __init__(self, path, role, params, flush_every=4096):
+        self.path = path
+        self.count = 0
+        self._pending = bytearray()
+        self._flush_bytes = flush_every * RECORD.size
+        header = json.dumps(dict(params, role=role)).encode()
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+
+    def record(self, t_ns, kind, seq=0, ack=0, length=0, rwnd=0, flags=0, value=0.0):
+        self._pending += RECORD.pack(t_ns, kind, flags, rwnd, seq, ack, length, value)
+        self.count += 1
+        if len(self._pending) >= self._flush_bytes:
+            self.flush()
+
+    def flush(self):
+        if self._file is not None and self._pending:
+            self._file.write(self._pending)
+            self._file.flush()
+            self._pending.clear()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+def load(path):
+    # (cabeçalho, [registros]) com cada registro na ordem de RECORD; um
+    # registro incompleto no fim (processo interrompido) é ignorado
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path}: não é um trace de pacotes")
+    size, = HEADER_LENGTH.unpack_from(data, 4)
+    offset = 4 + HEADER_LENGTH.size + size
+    header = json.loads(data[4 + HEADER_LENGTH.size:offset])
+    body = memoryview(data)[offset:]
+    records = list(RECORD.iter_unpack(body[:len(body) - len(body) % RECORD.size]))
+    return header, records
+
+if __name__ == "__main__":
+    header, records = load(sys.argv[1])
+    print(json.dumps(header))
+    t0 = records[0][0] if records else 0
+    for t_ns, kind, flags, rwnd, seq, ack, length, value in records:
+        print(f"{(t_ns - t0) / 1e6:12.3f} ms  {KIND_NAMES[kind]:<11} seq={seq} ack={ack} "
+              f"len={length} rwnd={rwnd} flags={flags:#04x} value={value:g}")
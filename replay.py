@@ -0,0 +1,232 @@
+import argparse
+import sys
+import time
+from collections import deque
+
+import packettrace
+from packettrace import SEND, DROP, RETRANS, SACK, ACK, TIMEOUT, PROBE, RECV, ACK_SENT, DELAYED_ACK, FIN
+from packet import FLAG_SACK
+from congestion import make_controller, CONTROLLERS
+from sendqueue import SendQueue
+from rto import RttEstimator
+from intervals import IntervalSet
+from telemetry import Recorder
+
+# ======================================================================================
+# Reprodução Offline de um Trace de Pacotes (sem sockets)
+# ======================================================================================
+#
+# Lê um trace gravado com packet_trace (ver packettrace.py) e refaz, evento a
+# evento e com os instantes gravados, as chamadas que o laço fez:
+#
+#   transmissor   SendQueue, RttEstimator e o controle de congestionamento,
+#                 como em send_messages; a CWND depois de cada ACK e timeout e
+#                 os buracos escolhidos para retransmissão são comparados com
+#                 os gravados
+#   receptor      a remontagem por IntervalSet de receive_and_ack; o ACK
+#                 cumulativo e o número de blocos SACK de cada ACK enviado são
+#                 comparados com os gravados
+#
+# Não há espera: RTOs de segundos são reproduzidos em microssegundos, o que
+# serve para perfilar e para testes de regressão da recuperação (sai com
+# código 1 se o estado divergir). Com --cc outro controlador recebe a mesma
+# sequência de ACKs: só uma estimativa, já que com outra CWND o transmissor
+# teria enviado outra coisa, e nada é comparado.
+#
+#   python replay.py trace.ptr
+#   python replay.py trace.ptr --cc cubic --cwnd cubic.tlm
+
+MAX_REPORTED = 10   # divergências mostradas (todas são contadas)
+
+def replay_sender(header, records, controller=None, cwnd_data=None):
+    # Retorna (controlador, estimador de RTT, {contador: valor}, divergências)
+    check = controller is None
+    cc = make_controller(controller or header['controller'],
+                         initial_cwnd=header['initial_cwnd'],
+                         initial_ssthresh=header['initial_ssthresh'],
+                         max_cwnd=header['max_cwnd'],
+                         duplicate_ack_threshold=header['duplicate_ack_threshold'])
+    rtt = RttEstimator(header['initial_rto'], header['min_rto'], header['max_rto'])
+    in_flight = SendQueue()
+    base_seq = current_seq = header['start_seq']
+    peer_wscale, peer_rwnd = header['peer_wscale'], None
+    holes = deque()     # seqs que o transmissor deve retransmitir em seguida
+    counts = dict.fromkeys(('sent', 'dropped', 'retransmissions', 'timeouts', 'fast_retransmits',
+                            'dup_acks', 'window_probes', 'unexpected_retransmissions'), 0)
+    divergences = []     # [(t_ns, mensagem)]
+    t0 = records[0][0] if records else 0
+    last_cwnd = None
+
+    def expect_holes(t_ns, new_holes):
+        if check and holes:
+            divergences.append((t_ns, f"buracos não retransmitidos: {list(holes)}"))
+        holes.clear()
+        holes.extend(seq for seq, _ in new_holes)
+
+    for t_ns, kind, flags, rwnd, seq, ack, length, value in records:
+        now = t_ns / 1e9
+
+        if kind == SEND or kind == DROP:
+            in_flight.push(seq, 0, b'', now)
+            current_seq = seq + length
+            counts['sent' if kind == SEND else 'dropped'] += 1
+
+        elif kind == RETRANS:
+            in_flight.mark_retransmitted(seq, now)
+            counts['retransmissions'] += 1
+            if holes:
+                expected = holes.popleft()
+                if check and expected != seq:
+                    divergences.append((t_ns, f"retransmitiu {seq}, o replay esperava {expected}"))
+            else:
+                # Fora de um episódio (ex.: o mais antigo de novo com o SYN repetido)
+                counts['unexpected_retransmissions'] += 1
+
+        elif kind == SACK:
+            in_flight.sack(seq, ack)
+
+        elif kind == TIMEOUT:
+            cc.on_timeout(now)
+            rtt.on_timeout()
+            counts['timeouts'] += 1
+            expect_holes(t_ns, in_flight.start_recovery(current_seq, restart=True))
+
+        elif kind == PROBE:
+            counts['window_probes'] += 1
+
+        elif kind == ACK:
+            window_update = False
+            if ack >= base_seq:
+                new_rwnd = None if peer_wscale is None else rwnd << peer_wscale
+                window_update = new_rwnd != peer_rwnd
+                peer_rwnd = new_rwnd
+
+            if ack > base_seq:
+                num_confirmed, sample_sent_at = in_flight.ack(ack)
+                if sample_sent_at is not None:
+                    rtt.sample(now - sample_sent_at)
+                    cc.on_rtt_sample(now - sample_sent_at, now)
+                cc.on_ack(num_confirmed, now, len(in_flight))
+                expect_holes(t_ns, in_flight.next_holes())
+                base_seq = ack
+            elif ack == base_seq and in_flight and (flags & FLAG_SACK or not window_update):
+                counts['dup_acks'] += 1
+                if cc.on_duplicate_ack(now):
+                    counts['fast_retransmits'] += 1
+                    expect_holes(t_ns, in_flight.start_recovery(current_seq))
+                else:
+                    expect_holes(t_ns, in_flight.next_holes())
+
+        else:
+            raise ValueError(f"Registro de receptor num trace de transmissor: {kind}")
+
+        if kind in (ACK, TIMEOUT):
+            if check and cc.cwnd != value:
+                divergences.append((t_ns, f"{packettrace.KIND_NAMES[kind]} {ack}: "
+                                          f"CWND {cc.cwnd!r}, gravada {value!r}"))
+            if cwnd_data is not None and cc.cwnd != last_cwnd:
+                cwnd_data.append((t_ns - t0) / 1e9, cc.cwnd, cc.ssthresh)
+                last_cwnd = cc.cwnd
+
+    return cc, rtt, counts, divergences
+
+def replay_receiver(header, records):
+    # Retorna ({contador: valor}, divergências)
+    expected_seq = header['initial_ack']
+    max_blocks = header['max_sack_blocks']
+    received = IntervalSet()
+    counts = dict.fromkeys(('in_order', 'out_of_order', 'duplicates', 'window_probes',
+                            'acks_sent', 'delayed_acks', 'fin'), 0)
+    divergences = []     # [(t_ns, mensagem)]
+
+    for t_ns, kind, flags, rwnd, seq, ack, length, value in records:
+        if kind == RECV:
+            if ack != expected_seq:
+                divergences.append((t_ns, f"recv {seq}: esperava {ack}, o replay está em {expected_seq}"))
+            if not length:
+                counts['window_probes'] += 1
+            elif seq == expected_seq:
+                counts['in_order'] += 1
+                expected_seq += length
+                end = received.pop_from(expected_seq)
+                if end is not None:
+                    expected_seq = end
+            elif seq > expected_seq and not received.contains(seq, seq + length):
+                counts['out_of_order'] += 1
+                received.add(seq, seq + length)
+            else:
+                counts['duplicates'] += 1
+
+        elif kind == ACK_SENT:
+            counts['acks_sent'] += 1
+            blocks = min(len(received), max_blocks)
+            if ack != expected_seq or length != blocks:
+                divergences.append((t_ns, f"ack_sent {ack} com {length} bloco(s) SACK, "
+                                          f"o replay tem {expected_seq} com {blocks}"))
+
+        elif kind == DELAYED_ACK:
+            counts['delayed_acks'] += 1
+
+        elif kind == FIN:
+            counts['fin'] += 1
+
+        else:
+            raise ValueError(f"Registro de transmissor num trace de receptor: {kind}")
+
+    counts['bytes_delivered'] = expected_seq - header['initial_ack']
+    counts['pending_ranges'] = len(received)
+    return counts, divergences
+
+def print_divergences(divergences, t0):
+    if not divergences:
+        print("Estado reproduzido sem divergências")
+        return
+    print(f"DIVERGÊNCIAS: {len(divergences)}")
+    for t_ns, message in divergences[:MAX_REPORTED]:
+        print(f"  {(t_ns - t0) / 1e6:12.3f} ms  {message}")
+    if len(divergences) > MAX_REPORTED:
+        print(f"  ... e mais {len(divergences) - MAX_REPORTED}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz offline um trace de pacotes (packettrace.py)")
+    parser.add_argument('trace', help="arquivo gravado com packet_trace")
+    parser.add_argument('--cc', choices=sorted(CONTROLLERS),
+                        help="outro controlador para a mesma sequência de ACKs (sem comparação)")
+    parser.add_argument('--cwnd', metavar='ARQUIVO',
+                        help="grava a evolução da CWND (time, cwnd, ssthresh) em .tlm (ver telemetry.py)")
+    args = parser.parse_args()
+
+    header, records = packettrace.load(args.trace)
+    t0 = records[0][0] if records else 0
+    duration = (records[-1][0] - t0) / 1e9 if records else 0.0
+
+    started = time.perf_counter()
+    if header['role'] == 'sender':
+        cwnd_data = Recorder(('time', 'cwnd', 'ssthresh'), path=args.cwnd) if args.cwnd else None
+        cc, rtt, counts, divergences = replay_sender(header, records, args.cc, cwnd_data)
+        if cwnd_data is not None:
+            cwnd_data.close()
+    else:
+        counts, divergences = replay_receiver(header, records)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'='*70}")
+    print(f" REPLAY ({header['role']}) - {args.trace}")
+    print(f"{'='*70}")
+    print(f"Eventos: {len(records)} ({duration:.3f} s gravados, reproduzidos em {elapsed*1000:.1f} ms)")
+    for name, value in counts.items():
+        print(f"{name}: {value}")
+    if header['role'] == 'sender':
+        print(f"Controlador: {cc.name}{' (contrafactual)' if args.cc else ''}")
+        print(f"CWND final: {cc.cwnd:.1f}, SSThresh: {cc.ssthresh}")
+        if rtt.srtt is not None:
+            print(f"SRTT: {rtt.srtt*1000:.2f} ms, RTTVAR: {rtt.rttvar*1000:.2f} ms, RTO: {rtt.rto*1000:.0f} ms")
+        if args.cwnd:
+            print(f"CWND salva em '{args.cwnd}' (python telemetry.py {args.cwnd})")
+    if not args.cc:
+        print_divergences(divergences, t0)
+    print(f"{'='*70}\n")
+    return 1 if divergences and not args.cc else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from telemetry import load
+
+# ======================================================================================
+# Relatório Offline (a partir das séries gravadas)
+# ======================================================================================
+#
+# Os módulos de transporte não importam nada de gráfico: send_messages grava
+# as séries em <prefixo>.<série>.tlm (ver telemetry.py) e o resumo em
+# <prefixo>.json, e este comando desenha depois, sem janela (backend Agg).
+# matplotlib só é importado aqui, na hora de desenhar.
+#
+# Séries longas são reduzidas antes de desenhar: em cada coluna de pixels
+# ficam só o menor e o maior valor (e toda queda de ssthresh), o que
+# preserva o desenho do dente de serra com milhões de amostras.
+#
+#   python report.py congestion_data                    -> transmission_analysis.png
+#   python report.py congestion_data --pdf --dpi 200 --out relatorio
+
+SERIES = ('cwnd', 'throughput', 'retrans', 'rtt')
+FIGURE_WIDTH = 20   # polegadas
+
+# ======================================================================================
+# Carregamento e Redução
+# ======================================================================================
+
+def load_run(prefix):
+    # {série: {coluna: array}, 'summary': dict}; séries ausentes ficam vazias
+    run = {'summary': {}}
+    for series in SERIES:
+        path = f"{prefix}.{series}.tlm"
+        run[series] = load(path) if os.path.exists(path) else {}
+    if not run['cwnd']:
+        raise FileNotFoundError(f"{prefix}.cwnd.tlm não encontrado")
+    try:
+        with open(f"{prefix}.json") as f:
+            run['summary'] = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return run
+
+def congestion_indices(ssthresh):
+    # Amostras em que o ssthresh caiu (eventos de congestão)
+    ssthresh = np.asarray(ssthresh)
+    return np.nonzero(ssthresh[1:] < ssthresh[:-1])[0] + 1
+
+def downsample(times, *columns, buckets=2000, keep=()):
+    # Linhas a desenhar: em cada um dos buckets intervalos de tempo, a de
+    # menor e a de maior valor na primeira coluna, mais as de keep
+    times = np.asarray(times)
+    columns = [np.asarray(column) for column in columns]
+    n = len(times)
+    if n <= 2 * buckets:
+        return [times] + columns
+
+    values = columns[0]
+    edges = np.searchsorted(times, np.linspace(times[0], times[-1], buckets + 1)[1:-1])
+    rows = [0, n - 1]
+    for start, end in zip(np.concatenate(([0], edges)), np.concatenate((edges, [n]))):
+        if end > start:
+            bucket = values[start:end]
+            rows += [start + int(bucket.argmin()), start + int(bucket.argmax())]
+    rows = np.unique(np.concatenate((rows, np.asarray(keep, dtype=int))))
+    return [times[rows]] + [column[rows] for column in columns]
+
+# ======================================================================================
+# Gráficos
+# ======================================================================================
+
+def plot_transmission_graphs(run, output='transmission_analysis', formats=('png',), dpi=100):
+    # run: o que load_run devolve. Sem janela: o backend Agg só desenha em arquivo.
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    stats = run['summary']
+    initial_cwnd = stats.get('initial_cwnd', 1.0)
+    initial_ssthresh = stats.get('initial_ssthresh', 0)
+    loss_rate = stats.get('loss_rate', 0.0)
+    initial_rto = stats.get('initial_rto', 0.0)
+
+    plt.style.use('seaborn-v0_8-darkgrid')
+    fig = plt.figure(figsize=(FIGURE_WIDTH, 12))
+    fig.patch.set_facecolor('#f8f9fa')
+
+    fig.suptitle(
+        'Análise Completa de Transmissão TCP com Controle de Congestionamento',
+        fontsize=18, fontweight='bold', y=0.98
+    )
+
+    gs = fig.add_gridspec(3, 3, hspace=0.35, wspace=0.3)
+
+    # ==================================================================================
+    # GRÁFICO 1 — Evolução do CWND e SSThresh
+    # ==================================================================================
+    ax1 = fig.add_subplot(gs[0, :2])
+
+    cwnd = run['cwnd']
+    times, cwnds, ssthreshs = (column.tolist() for column in downsample(
+        cwnd['time'], cwnd['cwnd'], cwnd['ssthresh'], buckets=int(FIGURE_WIDTH * dpi),
+        keep=congestion_indices(cwnd['ssthresh'])))
+
+    ax1.plot(times, cwnds, label='CWND', linewidth=2.5,
+             marker='o', markersize=3, markevery=max(1, len(times)//50))
+    ax1.plot(times, ssthreshs, 'r--', linewidth=2,
+             label='SSThresh', alpha=0.8)
+
+    ax1.fill_between(times, cwnds, alpha=0.2)
+
+    # Slow Start: cwnd < ssthresh
+    slow_start_idx = [i for i, (c, s) in enumerate(zip(cwnds, ssthreshs)) if c < s]
+    if slow_start_idx:
+        ax1.scatter([times[i] for i in slow_start_idx],
+                    [cwnds[i] for i in slow_start_idx],
+                    c='green', s=30, alpha=0.5,
+                    label='Slow Start', zorder=5)
+
+    # Eventos de congestão: queda de ssthresh
+    congestion_events = [
+        (times[i], cwnds[i])
+        for i in range(1, len(ssthreshs))
+        if ssthreshs[i] < ssthreshs[i - 1]
+    ]
+
+    if congestion_events:
+        t_ce, c_ce = zip(*congestion_events)
+        ax1.scatter(t_ce, c_ce, c='red', marker='X', s=100,
+                    edgecolors='black', linewidths=1,
+                    label='Evento de Congestão', zorder=10)
+
+    # Pico de CWND
+    max_cwnd = max(cwnds)
+    max_idx = cwnds.index(max_cwnd)
+    ax1.annotate(
+        f'Pico: {max_cwnd:.1f}',
+        xy=(times[max_idx], max_cwnd),
+        xytext=(10, 10),
+        textcoords='offset points',
+        bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.7),
+        arrowprops=dict(arrowstyle='->')
+    )
+
+    ax1.set_title('Evolução do CWND e SSThresh', fontsize=13, fontweight='bold')
+    ax1.set_xlabel('Tempo (s)', fontsize=12)
+    ax1.set_ylabel('Janela (pacotes)', fontsize=12)
+    ax1.legend()
+    ax1.set_facecolor('#ffffff')
+
+    # ==================================================================================
+    # GRÁFICO 2 — CWND em Escala Logarítmica
+    # ==================================================================================
+    ax2 = fig.add_subplot(gs[0, 2])
+
+    ax2.semilogy(times, cwnds, 'b-', linewidth=2,
+                 marker='o', markersize=3, label='CWND')
+    ax2.semilogy(times, ssthreshs, 'r--', linewidth=2,
+                 label='SSThresh', alpha=0.7)
+
+    # Linha de referência exponencial (2^x)
+    if len(times) > 1:
+        t0, t1 = times[0], times[-1]
+        span = max(t1 - t0, 1e-6)
+
+        exp_ref = [
+            initial_cwnd * (2 ** ((t - t0) / (span / 6)))
+            for t in times
+        ]
+
+        ax2.semilogy(times, exp_ref, 'g:',
+                     linewidth=1.5, alpha=0.6,
+                     label='Referência exponencial (2^x)')
+
+    ax2.set_title('CWND em Escala Logarítmica', fontsize=11, fontweight='bold')
+    ax2.set_xlabel('Tempo (s)')
+    ax2.set_ylabel('Janela (log)')
+    ax2.legend(fontsize=8)
+    ax2.set_facecolor('#ffffff')
+
+    # ==================================================================================
+    # PAINEL DE ESTATÍSTICAS
+    # ==================================================================================
+    ax3 = fig.add_subplot(gs[2, 1:])
+    ax3.axis('off')
+
+    efficiency = stats.get('efficiency', 0)
+    total_sent = stats.get('total_sent', 0)
+    retransmissions = stats.get('retransmissions', 0)
+
+    retrans_rate = (100 * retransmissions / total_sent) if total_sent else 0
+
+    stats_text = f"""
+╔══════════════════════════════════════════════════════════════╗
+║           ESTATÍSTICAS DA TRANSMISSÃO TCP                    ║
+╚══════════════════════════════════════════════════════════════╝
+
+ MÉTRICAS:
+   • Total Enviado:              {total_sent:>6}
+   • Retransmissões:             {retransmissions:>6}
+   • Taxa de Retransmissão:      {retrans_rate:>6.2f} %
+   • Eficiência:                 {efficiency:>6.1f} %
+
+  CONFIGURAÇÃO:
+   • CWND Inicial:               {initial_cwnd:>6.1f}
+   • SSThresh Inicial:           {initial_ssthresh:>6.1f}
+   • CWND Máximo:                {max_cwnd:>6.1f}
+   • Taxa de Perda:              {loss_rate * 100:>6.2f} %
+   • RTO Inicial:                {initial_rto:>6.2f} s
+
+ ALGORITMO:
+   • Slow Start:                 OK (crescimento exponencial)
+   • Congestion Avoidance:       OK (crescimento linear)
+   • Fast Retransmit/Recovery:   OK
+"""
+
+    ax3.text(
+        0.05, 0.5, stats_text,
+        fontsize=10, family='monospace',
+        verticalalignment='center',
+        bbox=dict(boxstyle='round,pad=1',
+                  facecolor='#e8f5e9',
+                  edgecolor='#4CAF50',
+                  linewidth=2)
+    )
+
+    # ==================================================================================
+    # SALVAMENTO
+    # ==================================================================================
+    paths = [f"{output}.{extension}" for extension in formats]
+    for path in paths:
+        fig.savefig(path, dpi=dpi, bbox_inches='tight', facecolor='#f8f9fa')
+    plt.close(fig)
+    return paths
+
+# ======================================================================================
+# Main
+# ======================================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o relatório de uma transmissão a partir das séries gravadas")
+    parser.add_argument('prefix', nargs='?', default='congestion_data',
+                        help="prefixo dos arquivos .tlm/.json (telemetry_path do servidor)")
+    parser.add_argument('--out', default='transmission_analysis', help="nome dos arquivos gerados, sem extensão")
+    parser.add_argument('--pdf', action='store_true', help="gera também o PDF")
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args()
+
+    run = load_run(args.prefix)
+    paths = plot_transmission_graphs(run, args.out, ('png', 'pdf') if args.pdf else ('png',), args.dpi)
+    print(f"Relatório salvo em {', '.join(paths)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import hashlib
+import hmac
+import json
+import os
+import struct
+import time
+
+# ======================================================================================
+# Tokens de Retomada (0-RTT)
+# ======================================================================================
+#
+# No fim do handshake o servidor manda ao cliente (OPT_TOKEN no SYN-ACK) um
+# token que prova que aquele IP já recebeu um datagrama dele. Na próxima
+# conexão o cliente apresenta o token no SYN; se for válido, o servidor não
+# espera a 3ª via e os dados saem logo atrás do SYN-ACK, um RTT mais cedo.
+#
+# Sem o token o servidor não pode fazer isso: o endereço de origem do SYN
+# pode ser falso, e mandar uma janela de dados para ele faria do servidor um
+# amplificador. O token é só validade + HMAC(chave, ip, validade): não
+# guarda estado no servidor, e processos que compartilham a chave (os
+# trabalhadores de server_workers.py) aceitam os tokens uns dos outros.
+#
+#   +-------------------+---------------------------------------+
+#   | validade (4 B, s) |        HMAC-SHA256 truncado (16 B)    |
+#   +-------------------+---------------------------------------+
+
+TOKEN_EXPIRY = struct.Struct('!I')
+TOKEN_MAC_SIZE = 16
+TOKEN_SIZE = TOKEN_EXPIRY.size + TOKEN_MAC_SIZE
+
+def _mac(key, ip, expiry):
+    return hmac.new(key, f"{ip}|{expiry}".encode(), hashlib.sha256).digest()[:TOKEN_MAC_SIZE]
+
+def issue_token(key, ip, lifetime, now=None):
+    expiry = int((now or time.time()) + lifetime)
+    return TOKEN_EXPIRY.pack(expiry) + _mac(key, ip, expiry)
+
+def check_token(key, token, ip, now=None):
+    if len(token) != TOKEN_SIZE:
+        return False
+    expiry = TOKEN_EXPIRY.unpack_from(token)[0]
+    if expiry < (now or time.time()):
+        return False
+    return hmac.compare_digest(bytes(token[TOKEN_EXPIRY.size:]), _mac(key, ip, expiry))
+
+# ======================================================================================
+# Cache do Cliente
+# ======================================================================================
+
+# Um arquivo JSON {"ip:porta": token em hex}, para o token sobreviver entre
+# execuções do cliente. Arquivo ausente ou corrompido = sem token.
+
+def load_token(path, server):
+    try:
+        with open(path) as f:
+            return bytes.fromhex(json.load(f)[f"{server[0]}:{server[1]}"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def save_token(path, server, token):
+    try:
+        with open(path) as f:
+            tokens = json.load(f)
+    except (OSError, ValueError):
+        tokens = {}
+    if not isinstance(tokens, dict):
+        tokens = {}
+    tokens[f"{server[0]}:{server[1]}"] = bytes(token).hex()
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(tokens, f)
+    os.replace(tmp, path)
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+# ======================================================================================
+# Estimativa de RTT e RTO (RFC 6298)
+# ======================================================================================
+#
+#   1ª amostra R:   SRTT = R, RTTVAR = R/2
+#   demais:         RTTVAR = (1 - β)·RTTVAR + β·|SRTT - R|
+#                   SRTT   = (1 - α)·SRTT   + α·R
+#   RTO = SRTT + max(G, K·RTTVAR), limitado a [min_rto, max_rto]
+#
+# A cada timeout o RTO dobra (backoff exponencial) até chegar uma amostra
+# válida. Pela regra de Karn, segmentos retransmitidos não geram amostras
+# (quem garante isso é SendQueue.ack, que só devolve o instante de envio quando
+# nenhum segmento confirmado foi retransmitido).
+
+ALPHA = 1 / 8
+BETA  = 1 / 4
+K     = 4
+
+class RttEstimator:
+    def __init__(self, initial_rto=1.0, min_rto=0.05, max_rto=60.0, granularity=0.001):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.granularity = granularity
+        self.srtt = None
+        self.rttvar = None
+        self.backoff = 1
+        self._base_rto = initial_rto
+
+    @property
+    def rto(self):
+        return min(self._base_rto * self.backoff, self.max_rto)
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * rtt
+
+        rto = self.srtt + max(self.granularity, K * self.rttvar)
+        self._base_rto = min(max(rto, self.min_rto), self.max_rto)
+        self.backoff = 1
+
+    def on_timeout(self):
+        if self._base_rto * self.backoff < self.max_rto:
+            self.backoff *= 2
+
+# ======================================================================================
+# Temporizador de Prazo Único (asyncio)
+# ======================================================================================
+#
+# Cada conexão só precisa do prazo de retransmissão do segmento mais antigo.
+# Como esse prazo é empurrado para frente a cada ACK novo, recriar um
+# TimerHandle por ACK sairia caro: aqui o prazo é só um número, e o callback do
+# loop fica armado para o prazo mais cedo já pedido. Quando dispara antes da
+# hora (o prazo foi adiado), é rearmado para o restante.
+
+class DeadlineTimer:
+    def __init__(self, callback):
+        self.callback = callback
+        self.deadline = None    # time.monotonic()
+        self._handle = None
+        self._armed_for = None
+
+    def set(self, deadline):
+        self.deadline = deadline
+        if self._handle is None or deadline < self._armed_for:
+            self._arm(deadline)
+
+    def cancel(self):
+        self.deadline = None
+
+    def close(self):
+        self.deadline = None
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    def _arm(self, deadline):
+        if self._handle:
+            self._handle.cancel()
+        self._armed_for = deadline
+        delay = max(deadline - time.monotonic(), 0)
+        self._handle = asyncio.get_running_loop().call_later(delay, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        if self.deadline is None:
+            return
+        if time.monotonic() < self.deadline:
+            self._arm(self.deadline)
+            return
+        self.deadline = None
+        self.callback()
@@ -0,0 +1,149 @@
+from bisect import bisect_left
+
+# ======================================================================================
+# Fila Ordenada de Segmentos em Voo
+# ======================================================================================
+#
+# Os segmentos entram em ordem crescente de seq, então basta uma lista com um
+# índice de início (head): o ACK cumulativo só avança o head, o mais antigo não
+# confirmado é sempre o do head, e uma busca por seq é um bisect. Os campos
+# ficam em listas paralelas (seq, número da mensagem, payload, instante do
+# último envio, se já foi retransmitido, se já foi confirmado por SACK) e a
+# parte já confirmada é descartada de tempos em tempos. Listas e não array: o
+# bisect e cada leitura de uma array criam um int novo, e as listas (ints e
+# bytes, que o GC não rastreia) não provocam coletas durante a transferência.
+#
+# O scoreboard de SACK marca os segmentos confirmados seletivamente e guarda o
+# maior seq coberto por SACK: tudo abaixo dele que não foi marcado é buraco.
+# Durante uma recuperação, um cursor anda sobre a fila para que cada buraco
+# seja retransmitido uma única vez no episódio; o episódio só termina quando o
+# ACK cumulativo passa do ponto de recuperação (o maior seq enviado quando ele
+# começou), como no NewReno, e não a cada ACK parcial.
+
+COMPACT_THRESHOLD = 4096
+
+class SendQueue:
+    def __init__(self):
+        self._seqs = []
+        self._msg_nums = []
+        self._payloads = []
+        self._sent_at = []
+        self._retransmitted = []
+        self._sacked = []
+        self._head = 0
+        self.high_sacked = None     # maior borda direita recebida em SACK
+        self._hole_cursor = None    # próximo índice a examinar na recuperação
+        self._recovery_point = None
+
+    def __len__(self):
+        return len(self._seqs) - self._head
+
+    def __bool__(self):
+        return len(self._seqs) > self._head
+
+    def push(self, seq, msg_num, payload, sent_at):
+        self._seqs.append(seq)
+        self._msg_nums.append(msg_num)
+        self._payloads.append(payload)
+        self._sent_at.append(sent_at)
+        self._retransmitted.append(False)
+        self._sacked.append(False)
+
+    def ack(self, ack):
+        # ACK cumulativo: remove do início todos os segmentos com seq < ack.
+        # Retorna (quantos foram confirmados, instante de envio do mais novo
+        # deles para amostra de RTT); pela regra de Karn o instante é None se
+        # algum dos confirmados foi retransmitido.
+        seqs, retransmitted = self._seqs, self._retransmitted
+        head, end = self._head, len(seqs)
+        start, ambiguous = head, False
+        while head < end and seqs[head] < ack:
+            ambiguous |= retransmitted[head]
+            head += 1
+        self._head = head
+
+        if self._recovery_point is not None and ack >= self._recovery_point:
+            self._hole_cursor = self._recovery_point = None
+
+        sent_at = None
+        if head > start and not ambiguous:
+            sent_at = self._sent_at[head - 1]
+
+        if head >= COMPACT_THRESHOLD and head * 2 >= end:
+            self._compact()
+        return head - start, sent_at
+
+    def _compact(self):
+        head = self._head
+        del self._seqs[:head]
+        del self._msg_nums[:head]
+        del self._payloads[:head]
+        del self._sent_at[:head]
+        del self._retransmitted[:head]
+        del self._sacked[:head]
+        if self._hole_cursor is not None:
+            self._hole_cursor = max(self._hole_cursor - head, 0)
+        self._head = 0
+
+    def oldest(self):
+        # (seq, msg_num, payload, sent_at) do segmento mais antigo não confirmado
+        i = self._head
+        return self._seqs[i], self._msg_nums[i], self._payloads[i], self._sent_at[i]
+
+    def _index(self, seq):
+        i = bisect_left(self._seqs, seq, self._head)
+        if i == len(self._seqs) or self._seqs[i] != seq:
+            raise KeyError(seq)
+        return i
+
+    def get(self, seq):
+        # (msg_num, payload, sent_at) do segmento com esse seq
+        i = self._index(seq)
+        return self._msg_nums[i], self._payloads[i], self._sent_at[i]
+
+    def mark_retransmitted(self, seq, sent_at):
+        i = self._index(seq)
+        self._sent_at[i] = sent_at
+        self._retransmitted[i] = True
+
+    # ----------------------------------------------------------------------------------
+    # Scoreboard de SACK
+    # ----------------------------------------------------------------------------------
+
+    def sack(self, left, right):
+        # Marca como recebidos os segmentos com left <= seq < right
+        seqs, sacked = self._seqs, self._sacked
+        i = bisect_left(seqs, left, self._head)
+        while i < len(seqs) and seqs[i] < right:
+            sacked[i] = True
+            i += 1
+        if self.high_sacked is None or right > self.high_sacked:
+            self.high_sacked = right
+
+    def start_recovery(self, recovery_point, restart=False):
+        # Abre um episódio de recuperação e retorna os buracos a retransmitir
+        # [(seq, payload)]. Se já há um episódio aberto, só devolve os buracos
+        # novos, a menos que restart (timeout) peça para recomeçar do início.
+        if self._hole_cursor is not None and not restart:
+            return self.next_holes()
+
+        self._recovery_point = recovery_point
+        self._hole_cursor = self._head
+        return self.next_holes()
+
+    def next_holes(self):
+        # Buracos ainda não retransmitidos neste episódio: segmentos não
+        # confirmados por SACK abaixo de high_sacked, e sempre o mais antigo
+        # (sem SACK, cada ACK parcial aponta o próximo buraco, como no NewReno).
+        if self._hole_cursor is None or not self:
+            return []
+
+        seqs, sacked, head = self._seqs, self._sacked, self._head
+        high = self.high_sacked or 0
+        i, holes = max(self._hole_cursor, head), []
+        while i < len(seqs) and (seqs[i] < high or i == head):
+            if not sacked[i]:
+                holes.append((seqs[i], self._payloads[i]))
+            i += 1
+        self._hole_cursor = i
+        return holes
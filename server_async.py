@@ -0,0 +1,460 @@
+import asyncio
+import random
+import time
+
+from packet import (pack_segment, unpack_segment, pack_options, unpack_options, unpack_sack, negotiate_mss,
+                    FLAG_SYN, FLAG_FIN, FLAG_SACK, DEFAULT_RWND, OPT_TRANSFORM, OPT_MSS, OPT_WSCALE,
+                    OPT_STREAMS, OPT_TOKEN, OPT_COMPRESS, MSS_VALUE, STREAMS_VALUE, COMPRESS_VALUE, MAX_WSCALE)
+from transforms import get_transform
+from sendqueue import SendQueue
+from rto import RttEstimator, DeadlineTimer
+from streams import StreamMux
+from pacing import Pacer
+from compression import next_segment
+from resumption import issue_token, check_token
+import metrics
+from server_final import (localIP, local_port, ISN, timeout, LOSS_RATE,
+                          initial_rto, min_rto, max_rto, pacing, pacing_quantum, pacing_granularity,
+                          max_segment_size, payload_transform, peer_window, receiver_room,
+                          new_sources, stream_count, negotiate_streams, negotiate_compression, new_controller,
+                          resumption, resumption_key, token_lifetime, metrics_address)
+
+# ======================================================================================
+# Servidor Multi-Cliente (asyncio)
+# ======================================================================================
+#
+# Um único socket UDP atende vários clientes ao mesmo tempo: cada datagrama é
+# despachado pela tabela de conexões (chave = endereço do cliente) e cada
+# conexão tem seu próprio estado de handshake, de congestionamento e sua
+# própria fila de pacotes em voo. Handshake e FIN usam call_later do loop; a
+# retransmissão de dados usa o RTO adaptativo com um DeadlineTimer por conexão,
+# as sondas de janela zero um segundo DeadlineTimer e o pacing um terceiro,
+# que retoma o envio quando a próxima ficha fica pronta. Um SYN com token de
+# retomada válido (ver resumption.py) pula SYN_RCVD: a conexão nasce
+# ESTABLISHED e os dados saem logo atrás do SYN-ACK.
+
+SYN_RCVD    = 'SYN_RCVD'
+ESTABLISHED = 'ESTABLISHED'
+FIN_WAIT    = 'FIN_WAIT'
+CLOSED      = 'CLOSED'
+
+max_syn_retries = 5
+max_fin_retries = 5
+
+class Connection:
+    def __init__(self, server, address, client_isn, peer_transform, mss, peer_wscale, peer_streams, token=None,
+                 compressor=None):
+        self.server = server
+        self.address = address
+        self.state = SYN_RCVD
+        self.expected_seq = client_isn + 1    # seq esperado na 3ª via
+        self.peer_transform = peer_transform
+        self.token = token                    # emitido no SYN-ACK (None = cliente não pediu)
+        self.timer = None
+        self.retries = 0
+
+        # Congestionamento (um controlador por conexão)
+        self.cc = new_controller()
+
+        # Envio (os fluxos dividem a janela e o controle de congestionamento)
+        self.sources = new_sources()
+        self.peer_streams = peer_streams
+        self.mux = StreamMux(self.sources, payload_transform, framed=peer_streams > 0, max_open=peer_streams)
+        self.source_done = False
+        self.carry = None       # resto de um payload que não coube comprimido no mss
+        self.compressor = compressor
+        self.mss = mss
+        self.next_msg = 0
+        self.start_seq = self.base_seq = self.current_seq = 0
+        self.in_flight = SendQueue()
+        self.retransmissions = 0
+        self.dup_acks = 0
+        self.start_time = None
+        self.metrics_handle = None
+        self.rtt = RttEstimator(initial_rto, min_rto, max_rto)
+        self.retx_timer = DeadlineTimer(self.on_retransmit_timeout)
+
+        # Controle de fluxo (janela do receptor em bytes; None = sem limite)
+        self.peer_wscale = peer_wscale
+        self.peer_rwnd = None
+        self.probe_interval = initial_rto
+        self.window_probes = 0
+        self.probe_timer = DeadlineTimer(self.on_probe_timeout)
+
+        # Pacing (ver pacing.py)
+        self.pacer = Pacer(pacing_quantum, pacing_granularity) if pacing else None
+        self.pacing_timer = DeadlineTimer(self.on_pacing_timeout)
+
+    # ----------------------------------------------------------------------------------
+    # Envio e temporizador
+    # ----------------------------------------------------------------------------------
+
+    def send(self, seq=0, ack=0, flags=0, payload=b''):
+        self.server.transport.sendto(pack_segment(seq, ack, flags, DEFAULT_RWND, payload), self.address)
+
+    def send_syn_ack(self):
+        options = {OPT_TRANSFORM: bytes([payload_transform.transform_id]),
+                   OPT_MSS: MSS_VALUE.pack(max_segment_size),
+                   OPT_WSCALE: bytes([0])}
+        if self.peer_streams:
+            options[OPT_STREAMS] = STREAMS_VALUE.pack(stream_count())
+        if self.token is not None:
+            options[OPT_TOKEN] = self.token
+        if self.compressor is not None:
+            options[OPT_COMPRESS] = COMPRESS_VALUE.pack(self.compressor.dict_id, self.compressor.max_segment)
+        options = pack_options(options)
+        self.send(seq=ISN, ack=self.expected_seq, flags=FLAG_SYN, payload=options)
+
+    def send_fin(self):
+        self.send(seq=self.current_seq, flags=FLAG_FIN)
+
+    def arm_timer(self, delay):
+        if self.timer:
+            self.timer.cancel()
+        self.timer = asyncio.get_running_loop().call_later(delay, self.on_timer)
+
+    def close(self):
+        if self.timer:
+            self.timer.cancel()
+        self.retx_timer.close()
+        self.probe_timer.close()
+        self.pacing_timer.close()
+        self.unregister_metrics()
+        for source in self.sources:
+            source.close()
+        self.state = CLOSED
+        self.server.connection_closed(self)
+
+    # ----------------------------------------------------------------------------------
+    # Recebimento
+    # ----------------------------------------------------------------------------------
+
+    def segment_received(self, seq, ack, rwnd, flags, payload):
+        if self.state == SYN_RCVD:
+            if flags & FLAG_SYN:
+                # SYN repetido: o SYN-ACK se perdeu
+                self.send_syn_ack()
+            elif seq == self.expected_seq:
+                print(f"[{self.address[0]}:{self.address[1]}] CONEXÃO ESTABELECIDA (ack={ack})")
+                self.establish(ack)
+
+        elif self.state == ESTABLISHED:
+            if flags & FLAG_SYN:
+                # Retomada 0-RTT cujo SYN-ACK se perdeu: o cliente descartou o
+                # que veio antes dele, então o mais antigo vai logo atrás
+                self.send_syn_ack()
+                if self.in_flight:
+                    oldest_seq, _, oldest_payload, _ = self.in_flight.oldest()
+                    self.retransmit_holes([(oldest_seq, oldest_payload)])
+                    self.retx_timer.set(time.monotonic() + self.rtt.rto)
+            else:
+                if flags & FLAG_SACK:
+                    for left, right in unpack_sack(payload):
+                        self.in_flight.sack(left, right)
+                self.ack_received(ack, rwnd, flags)
+
+        elif self.state == FIN_WAIT:
+            if ack == self.current_seq + 1:
+                self.send(ack=seq + 1)
+                self.close()
+
+    def establish(self, start_seq):
+        self.state = ESTABLISHED
+        self.start_seq = self.base_seq = self.current_seq = start_seq
+        self.start_time = time.time()
+        self.started_at = time.monotonic()
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.metrics_handle = metrics.registry.register(
+            {'peer': f"{self.address[0]}:{self.address[1]}", 'role': 'sender'}, self.metrics_snapshot)
+        self.fill_window()
+
+    def ack_received(self, received_ack, rwnd, flags):
+        # Janela do receptor: vale a do ACK mais recente que não seja antigo
+        window_update = False
+        if received_ack >= self.base_seq:
+            new_rwnd = peer_window(rwnd, self.peer_wscale)
+            window_update = new_rwnd != self.peer_rwnd
+            self.peer_rwnd = new_rwnd
+
+        if received_ack > self.base_seq:
+            num_confirmed, sample_sent_at = self.in_flight.ack(received_ack)
+
+            now = time.monotonic()
+            if sample_sent_at is not None:
+                self.rtt.sample(now - sample_sent_at)
+                self.cc.on_rtt_sample(now - sample_sent_at, now)
+            if self.in_flight:
+                self.retx_timer.set(now + self.rtt.rto)
+            else:
+                self.retx_timer.cancel()
+
+            self.cc.on_ack(num_confirmed, now, len(self.in_flight))
+            self.base_seq = received_ack
+            self.retransmit_holes(self.in_flight.next_holes())   # ACK parcial durante a recuperação
+
+        elif received_ack == self.base_seq and self.in_flight and (flags & FLAG_SACK or not window_update):
+            # ACK duplicado (uma atualização de janela sem SACK não conta)
+            self.dup_acks += 1
+            if self.cc.on_duplicate_ack(time.monotonic()):
+                self.retransmit_holes(self.in_flight.start_recovery(self.current_seq))
+            else:
+                self.retransmit_holes(self.in_flight.next_holes())
+
+        if self.base_seq == self.current_seq and self.source_done:
+            self.finish()
+        else:
+            self.fill_window()
+
+    # ----------------------------------------------------------------------------------
+    # Transmissão
+    # ----------------------------------------------------------------------------------
+
+    def fill_window(self):
+        window_size = self.cc.cwnd
+        rwnd_blocked = paced = False
+        sent = 0
+        allowance = None
+        if self.pacer is not None:
+            now = time.monotonic()
+            self.pacer.set_rate(self.cc.pacing_rate(self.rtt.srtt) if self.rtt.srtt else None, now)
+            allowance = self.pacer.allowance(now)
+
+        while len(self.in_flight) < window_size and not self.source_done:
+            if allowance is not None and sent >= allowance:
+                paced = True
+                break
+            room = receiver_room(self.base_seq, self.current_seq, self.peer_rwnd)
+            if room is not None and room < self.mss:
+                # Só segmentos cheios: espera a janela do receptor abrir
+                rwnd_blocked = True
+                break
+            payload, wire, flags, self.carry = next_segment(self.mux, self.compressor, self.carry, self.mss, room)
+            if not payload:
+                self.source_done = True
+                break
+
+            if random.random() >= LOSS_RATE:
+                self.send(seq=self.current_seq, flags=flags, payload=wire)
+
+            self.in_flight.push(self.current_seq, self.next_msg, payload, time.monotonic())
+            self.current_seq += len(payload)
+            self.next_msg += 1
+            sent += 1
+
+        if self.pacer is not None:
+            self.pacer.consume(sent)
+            if paced:
+                self.pacing_timer.set(self.pacer.next_release(time.monotonic()))
+
+        if self.in_flight and self.retx_timer.deadline is None:
+            self.retx_timer.set(time.monotonic() + self.rtt.rto)
+
+        # Persistência: janela fechada e nenhum ACK a caminho que possa reabri-la
+        if rwnd_blocked and not self.in_flight:
+            if self.probe_timer.deadline is None:
+                self.probe_interval = self.rtt.rto
+                self.probe_timer.set(time.monotonic() + self.probe_interval)
+        else:
+            self.probe_timer.cancel()
+
+    def on_pacing_timeout(self):
+        if self.state == ESTABLISHED:
+            self.fill_window()
+
+    def on_probe_timeout(self):
+        # Sonda de janela zero: segmento vazio que o receptor responde com um ACK
+        if self.state != ESTABLISHED:
+            return
+        self.send(seq=self.current_seq)
+        self.window_probes += 1
+        self.probe_interval = min(self.probe_interval * 2, max_rto)
+        self.probe_timer.set(time.monotonic() + self.probe_interval)
+
+    def encode(self, payload):
+        # (bytes para o fio, flags) de um segmento de dados
+        if self.compressor is None:
+            return payload, 0
+        return self.compressor.encode(payload)
+
+    def retransmit_holes(self, holes):
+        now = time.monotonic()
+        for seq, payload in holes:
+            wire, flags = self.encode(payload)
+            self.send(seq=seq, flags=flags, payload=wire)
+            self.in_flight.mark_retransmitted(seq, now)
+        self.retransmissions += len(holes)
+
+    def on_retransmit_timeout(self):
+        if self.state != ESTABLISHED or not self.in_flight:
+            return
+        now = time.monotonic()
+        self.cc.on_timeout(now)
+        self.rtt.on_timeout()
+        # Recomeça a recuperação: o mais antigo e os buracos já conhecidos pelo SACK
+        self.retransmit_holes(self.in_flight.start_recovery(self.current_seq, restart=True))
+        self.retx_timer.set(now + self.rtt.rto)
+
+    def metrics_snapshot(self):
+        acked = self.base_seq - self.start_seq
+        return {
+            'cwnd_packets': self.cc.cwnd,
+            'ssthresh_packets': self.cc.ssthresh,
+            'srtt_seconds': self.rtt.srtt,
+            'rto_seconds': self.rtt.rto,
+            'bytes_in_flight': self.current_seq - self.base_seq,
+            'peer_rwnd_bytes': self.peer_rwnd,
+            'bytes_acked_total': acked,
+            'retransmissions_total': self.retransmissions,
+            'dup_acks_total': self.dup_acks,
+            'window_probes_total': self.window_probes,
+            'goodput_bytes_per_second': metrics.goodput(acked, self.started_at),
+        }
+
+    def unregister_metrics(self):
+        if self.metrics_handle is not None:
+            metrics.registry.unregister(self.metrics_handle)
+            self.metrics_handle = None
+
+    def summary(self):
+        # Estatísticas da transferência (para quem agrega várias conexões)
+        return {
+            'address': self.address,
+            'elapsed': time.time() - self.start_time,
+            'segments': self.next_msg,
+            'bytes': self.current_seq - self.start_seq,
+            'retransmissions': self.retransmissions,
+            'dup_acks': self.dup_acks,
+            'window_probes': self.window_probes,
+            'cwnd': self.cc.cwnd,
+            'srtt': self.rtt.srtt,
+        }
+
+    def finish(self):
+        elapsed = time.time() - self.start_time
+        total_sent = max(self.next_msg + self.retransmissions, 1)
+        print(f"[{self.address[0]}:{self.address[1]}] TRANSMISSÃO COMPLETA em {elapsed:.2f} s - "
+              f"{self.next_msg} segmentos ({self.current_seq - self.start_seq} bytes), "
+              f"{self.retransmissions} retransmissões "
+              f"({100*self.retransmissions/total_sent:.2f}%), CWND final: {self.cc.cwnd:.1f} ({self.cc.name}), "
+              f"SRTT: {(self.rtt.srtt or 0)*1000:.2f} ms"
+              + (f", {self.window_probes} sonda(s) de janela zero" if self.window_probes else ""))
+        self.server.transfer_finished(self)
+        self.unregister_metrics()
+        self.state = FIN_WAIT
+        self.retries = 0
+        self.retx_timer.close()
+        self.probe_timer.close()
+        self.pacing_timer.close()
+        self.send_fin()
+        self.arm_timer(timeout)
+
+    def on_timer(self):
+        self.timer = None
+
+        if self.state == SYN_RCVD:
+            self.retries += 1
+            if self.retries > max_syn_retries:
+                print(f"[{self.address[0]}:{self.address[1]}] Handshake abandonado")
+                self.close()
+                return
+            self.send_syn_ack()
+            self.arm_timer(timeout)
+
+        elif self.state == FIN_WAIT:
+            self.retries += 1
+            if self.retries > max_fin_retries:
+                self.close()
+                return
+            self.send_fin()
+            self.arm_timer(timeout)
+
+class MultiClientServer(asyncio.DatagramProtocol):
+    # on_transfer(summary) é chamado ao fim de cada transferência
+    def __init__(self, on_transfer=None):
+        self.transport = None
+        self.connections = {}    # {(ip, porta): Connection}
+        self.on_transfer = on_transfer
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        try:
+            seq, ack, rwnd, flags, payload = unpack_segment(data)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            return
+
+        conn = self.connections.get(address)
+        if conn is not None:
+            conn.segment_received(seq, ack, rwnd, flags, payload)
+            return
+
+        # Endereço novo: só um SYN abre conexão, o resto é descartado
+        if not flags & FLAG_SYN:
+            return
+
+        options = unpack_options(payload)
+        try:
+            peer_transform = get_transform(options.get(OPT_TRANSFORM, b'\x00')[0])
+        except ValueError as e:
+            print(f"Erro: {e}")
+            return
+
+        # Cliente sem OPT_WSCALE não anuncia janela real: fica sem controle de fluxo
+        peer_wscale = min(options[OPT_WSCALE][0], MAX_WSCALE) if OPT_WSCALE in options else None
+        # Token para a próxima conexão; o que o cliente trouxe (se válido) vale por esta
+        early, token = False, None
+        if resumption and OPT_TOKEN in options:
+            early = check_token(resumption_key, options[OPT_TOKEN], address[0])
+            token = issue_token(resumption_key, address[0], token_lifetime)
+        mss = negotiate_mss(options, max_segment_size)
+        conn = Connection(self, address, seq, peer_transform, mss, peer_wscale, negotiate_streams(options), token,
+                          negotiate_compression(options, mss))
+        self.connections[address] = conn
+        print(f"[{address[0]}:{address[1]}] SYN (seq={seq}){' com token válido (0-RTT)' if early else ''} - "
+              f"conexões ativas: {len(self.connections)}")
+
+        conn.send_syn_ack()
+        if early:
+            conn.establish(ISN + 1)
+        else:
+            conn.arm_timer(timeout)
+
+    def transfer_finished(self, conn):
+        if self.on_transfer is not None:
+            self.on_transfer(conn.summary())
+
+    def connection_closed(self, conn):
+        self.connections.pop(conn.address, None)
+        print(f"[{conn.address[0]}:{conn.address[1]}] CONEXÃO FINALIZADA - "
+              f"conexões ativas: {len(self.connections)}")
+
+# ======================================================================================
+# Main
+# ======================================================================================
+
+# sock: socket já criado e ligado (ex.: com SO_REUSEPORT, ver server_workers.py)
+async def serve(IP, port, sock=None, on_transfer=None):
+    loop = asyncio.get_running_loop()
+    if sock is not None:
+        transport, _ = await loop.create_datagram_endpoint(lambda: MultiClientServer(on_transfer), sock=sock)
+    else:
+        transport, _ = await loop.create_datagram_endpoint(lambda: MultiClientServer(on_transfer),
+                                                           local_addr=(IP, port))
+    print(f"Servidor UDP multi-cliente escutando em {IP}:{port}...\n")
+
+    try:
+        await asyncio.Future()
+    finally:
+        transport.close()
+
+if __name__ == "__main__":
+    if metrics_address is not None:
+        metrics.serve_metrics(metrics_address)
+    try:
+        asyncio.run(serve(localIP, local_port))
+    except KeyboardInterrupt:
+        print("Servidor encerrado.")
@@ -1,10 +1,29 @@
+import json
+import os
 import random
+import select
 import socket
-import json
 import time
-import csv
-import matplotlib.pyplot as plt
-import numpy as np
+
+from packet import (pack_segment, unpack_segment, ReceiveBuffer, pack_options, unpack_options, unpack_sack, negotiate_mss,
+                    FLAG_SYN, FLAG_FIN, FLAG_SACK, DEFAULT_RWND, DEFAULT_MSS, HEADER_SIZE,
+                    OPT_TRANSFORM, OPT_MSS, OPT_WSCALE, OPT_STREAMS, OPT_TOKEN, OPT_COMPRESS, MSS_VALUE,
+                    STREAMS_VALUE, COMPRESS_VALUE, MAX_WSCALE)
+from transforms import CaesarTransform, get_transform
+from batching import BatchSender
+from sendqueue import SendQueue
+from rto import RttEstimator
+from pacing import Pacer
+from resumption import issue_token, check_token
+from compression import SegmentCompressor, compression_dictionary, next_segment
+import metrics
+from telemetry import Recorder
+import packettrace
+from congestion import make_controller
+from sources import MessageSource, make_source
+from streams import StreamMux
+from eventlog import (make_log, DATA_SENT, DATA_LOST, RETRANS, TIMEOUT, FAST_RETRANSMIT,
+                      ACK_NEW, ACK_DUP, ACK_OLD, ROUND, BATCH, CWND, ZERO_WINDOW, WINDOW_PROBE)
 
 # ======================================================================================
 # Configuração
@@ -15,58 +34,90 @@ local_port  = 20001
 buffer_size = 1024
 ISN         = 5000
 nbr_of_pct  = 10000
+message_size = None     # bytes por mensagem (None = só o texto "Mensagem numero N")
+send_file   = None      # arquivo (ou lista de arquivos, um fluxo cada) no lugar das mensagens
+nbr_of_streams = 1      # fluxos independentes entre os quais as nbr_of_pct mensagens se dividem
+max_segment_size = buffer_size - HEADER_SIZE    # anunciado no handshake
 
 initial_cwnd = 1.0
 initial_ssthresh = 64
-max_cwnd = 100
-timeout = 2.0
+max_cwnd = 1000
+congestion_control = 'reno'     # 'reno', 'cubic' ou 'bbr' (ver congestion.py)
+timeout = 2.0       # handshake e FIN
+initial_rto = 1.0   # RTO antes da primeira amostra de RTT (RFC 6298)
+min_rto = 0.05
+max_rto = 60.0
+idle_poll = 0.5     # espera por ACK quando não há nada em voo
+# Com a janela do receptor fechada e nada em voo, sondas de janela zero saem
+# a cada RTO, dobrando até max_rto (temporizador de persistência)
 duplicate_ack_threshold = 3
 LOSS_RATE = 0.005
-
-pct_zero = {'seq': 0, 
-            'ack': 0, 
-            'rwnd': 1024, 
-            'SYN': False, 
-            'FIN': False, 
-            'payload': ""
-            }
+use_gso = True      # envia a janela em lote via UDP GSO quando o kernel suporta
+
+# Pacing (ver pacing.py): segmentos novos espaçados à taxa do controlador em
+# vez de uma rajada por ACK; rajada mínima de pacing_quantum pacotes, ou o
+# que a taxa libera em pacing_granularity segundos
+pacing = True
+pacing_quantum = 4
+pacing_granularity = 0.001
+
+# Retomada (ver resumption.py): o SYN-ACK leva um token; um SYN com token
+# válido dispensa a 3ª via e os dados saem junto com o SYN-ACK (0-RTT). A
+# chave muda a cada processo: fixe-a para os tokens valerem entre execuções.
+resumption = True
+resumption_key = os.urandom(32)
+token_lifetime = 24 * 3600  # s
+
+# Métricas ao vivo (ver metrics.py): ('127.0.0.1', 9100) para HTTP em
+# /metrics, ou o caminho de um socket Unix; None = desligado
+metrics_address = None
+
+# Séries para gráficos e análise (ver telemetry.py): colunas tipadas com no
+# máximo telemetry_capacity amostras em memória ('decimate' reduz a resolução,
+# 'ring' guarda as mais recentes), gravadas aos poucos em
+# <telemetry_path>.<série>.tlm durante a transmissão (None = só em memória).
+# O resumo vai para <telemetry_path>.json; gráficos: python report.py congestion_data
+telemetry_capacity = 100_000
+telemetry_mode = 'decimate'
+telemetry_path = 'congestion_data'
+
+# Trace binário de cada envio, ACK e temporizador (ver packettrace.py), para
+# reproduzir a transferência offline com replay.py; None = desligado
+packet_trace = None
+
+payload_transform = CaesarTransform(shift=3)
+
+# Compressão dos dados (ver compression.py), se o cliente também anunciar
+# OPT_COMPRESS: segmentos comprimidos um a um com o dicionário combinado
+compression = True
+compression_level = 6
+
+# Log de eventos (ver eventlog.py): 'off', 'events' (perdas e retransmissões)
+# ou 'packets' (o diagrama completo, pacote a pacote). Escrever cada pacote no
+# terminal domina o tempo de execução; para medir vazão use 'off' ou 'events'.
+log_level  = 'events'
+log_output = 'diagram'  # 'diagram' ou 'jsonl'
+log = make_log(log_level, log_output)
 
 # ======================================================================================
 # Funções Auxiliares
 # ======================================================================================
 
-def caesar_cipher(text, shift=3):
-    result = ""
-    for char in text:
-        if 'a' <= char <= 'z':
-            result += chr((ord(char) - ord('a') + shift) % 26 + ord('a'))
-        elif 'A' <= char <= 'Z':
-            result += chr((ord(char) - ord('A') + shift) % 26 + ord('A'))
-        else:
-            result += char
-    return result
-
-def caesar_decipher(text, shift=3):
-    return caesar_cipher(text, -shift)
-
-def my_encode_and_send(socket, msg, adress_port):
-    msg_copy = msg.copy()
-    if msg_copy.get('payload'):
-        msg_copy['payload'] = caesar_cipher(msg_copy['payload'])
-    socket.sendto(json.dumps(msg_copy).encode('utf-8'), adress_port)
+# O payload já chega aqui codificado pela transformação (ver transforms.py): é
+# transformado uma única vez ao ser gerado e reaproveitado nas retransmissões.
+def my_encode_and_send(socket, adress_port, seq=0, ack=0, flags=0, payload=b''):
+    socket.sendto(pack_segment(seq, ack, flags, DEFAULT_RWND, payload), adress_port)
 
 def my_receive_and_decode(socket, buffer_size):
+    # Retorna ((seq, ack, rwnd, flags, payload), endereço); payload ainda codificado
     pct, address = socket.recvfrom(buffer_size)
-    msg = json.loads(pct.decode('utf-8'))
-    if msg.get('payload'):
-        msg['payload'] = caesar_decipher(msg['payload'])
-    return msg, address
+    return unpack_segment(pct), address
 
 # ======================================================================================
 # Handshake
 # ======================================================================================
 
-def initConnection(IP, port, pct, buffer_size, ISN, timeout=2.0):
+def initConnection(IP, port, buffer_size, ISN, timeout=2.0):
     print("Subindo Servidor UDP e escutando...\n")
     
     UDPServerSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -76,153 +127,321 @@ def initConnection(IP, port, pct, buffer_size, ISN, timeout=2.0):
     print(f"   |{' '*46}|")
 
     # 1ª via
-    syn1_msg, address = my_receive_and_decode(UDPServerSocket, buffer_size)
-    print(f"   |───── SYN (seq={syn1_msg['seq']}){' '*13} ────▶|")
+    (syn1_seq, _, _, _, syn1_options), address = my_receive_and_decode(UDPServerSocket, buffer_size)
+    print(f"   |───── SYN (seq={syn1_seq}){' '*13} ────▶|")
+
+    # Transformação que o cliente usa no que envia (padrão: identidade)
+    options = unpack_options(syn1_options)
+    peer_transform = get_transform(options.get(OPT_TRANSFORM, b'\x00')[0])
+    # O servidor não recebe dados: anuncia escala 0 só para aceitar a do cliente
+    syn2 = {OPT_TRANSFORM: bytes([payload_transform.transform_id]),
+            OPT_MSS: MSS_VALUE.pack(max_segment_size),
+            OPT_WSCALE: bytes([0])}
+    mss = negotiate_mss(options, max_segment_size)
+    # Cliente sem OPT_WSCALE não anuncia janela real: fica sem controle de fluxo
+    peer_wscale = min(options[OPT_WSCALE][0], MAX_WSCALE) if OPT_WSCALE in options else None
+    peer_streams = negotiate_streams(options)
+    if peer_streams:
+        syn2[OPT_STREAMS] = STREAMS_VALUE.pack(stream_count())
+    compressor = negotiate_compression(options, mss)
+    if compressor is not None:
+        syn2[OPT_COMPRESS] = COMPRESS_VALUE.pack(compressor.dict_id, compressor.max_segment)
+    # Token para a próxima conexão; o que o cliente trouxe (se válido) vale por esta
+    early = False
+    if resumption and OPT_TOKEN in options:
+        early = check_token(resumption_key, options[OPT_TOKEN], address[0])
+        syn2[OPT_TOKEN] = issue_token(resumption_key, address[0], token_lifetime)
+    syn2_options = pack_options(syn2)
     
     UDPServerSocket.settimeout(timeout)
 
+    if early:
+        # 0-RTT: o endereço já foi validado pelo token; os dados seguem o
+        # SYN-ACK sem esperar a 3ª via, que chega junto com os primeiros ACKs
+        syn_ack = pack_segment(ISN, syn1_seq + 1, FLAG_SYN, DEFAULT_RWND, syn2_options)
+        print(f"   |◀────── SYN-ACK (seq={ISN}, ack={syn1_seq + 1}){' '*1} ───────|")
+        print(f"   |{' '*46}|")
+        print(f"   └────────── CONEXÃO RETOMADA (0-RTT) ──────────┘")
+        UDPServerSocket.sendto(syn_ack, address)
+        return (UDPServerSocket, address, ISN + 1, peer_transform, mss, peer_wscale, peer_streams,
+                compressor, syn_ack)
+
     while True:
         try:
             # 2ª via
-            syn2_ack_msg = pct.copy()
-            syn2_ack_msg.update({'SYN': True, 'ack': syn1_msg['seq'] + 1, 'seq': ISN})
-            seq_esperado = syn2_ack_msg['ack']
+            seq_esperado = syn1_seq + 1
             
             print(f"   |◀────── SYN-ACK (seq={ISN}, ack={seq_esperado}){' '*1} ───────|")
-            my_encode_and_send(UDPServerSocket, syn2_ack_msg, address)
+            my_encode_and_send(UDPServerSocket, address, seq=ISN, ack=seq_esperado, flags=FLAG_SYN,
+                               payload=syn2_options)
             
             # 3ª via
-            syn3_ack_msg, _ = my_receive_and_decode(UDPServerSocket, buffer_size)
-            now_ack = syn3_ack_msg['ack']
+            (syn3_seq, now_ack, _, _, _), _ = my_receive_and_decode(UDPServerSocket, buffer_size)
             
-            print(f"   |───── ACK (seq={syn3_ack_msg['seq']}, ack={now_ack}){' '*6} ────▶|")
+            print(f"   |───── ACK (seq={syn3_seq}, ack={now_ack}){' '*6} ────▶|")
             print(f"   |{' '*46}|")
             print(f"   └──────────── CONEXÃO ESTABELECIDA ─────────────┘")
             
-            if seq_esperado == syn3_ack_msg['seq']:
+            if seq_esperado == syn3_seq:
                 break
             
         except socket.timeout:
             print("[!] Timeout! Reenviando...")
     
-    return UDPServerSocket, address, now_ack
+    return UDPServerSocket, address, now_ack, peer_transform, mss, peer_wscale, peer_streams, compressor, None
 
 # ======================================================================================
-# Controle de Congestionamento - CORRIGIDO PARA DOBRAR NO SLOW START
+# Controle de Congestionamento (algoritmos em congestion.py)
 # ======================================================================================
 
-def get_window_size(cwnd, rwnd):
-    return min(cwnd, rwnd)
-
-def handle_new_ack(cwnd, ssthresh, num_packets, in_fast_recovery):
-    if in_fast_recovery:
-        # Sai do Fast Recovery para Congestion Avoidance
-        new_cwnd = ssthresh
-        print(f"   [FR→CA] CWND: {cwnd:.1f} → {new_cwnd:.1f}, SSThresh: {ssthresh}")
-        return new_cwnd, ssthresh, False, 0
-    
-    elif cwnd < ssthresh:
-        # SLOW START: incrementa cwnd em 1 para CADA pacote confirmado
-        # Isso faz a janela DOBRAR a cada RTT
-        increment = num_packets  # Cada pacote confirmado adiciona 1 ao CWND
-        new_cwnd = min(cwnd + increment, max_cwnd)
-        
-        print(f"   [SLOW START] CWND: {cwnd:.1f} + {increment} = {new_cwnd:.1f} (SSThresh: {ssthresh})")
-        
-        return new_cwnd, ssthresh, False, 0
-    
-    else:
-        # CONGESTION AVOIDANCE: aumenta ~1 MSS por RTT
-        # Incrementa 1/cwnd para cada pacote confirmado
-        increment = num_packets / cwnd
-        new_cwnd = min(cwnd + increment, max_cwnd)
-        
-        print(f"   [CONG AVOID] CWND: {cwnd:.1f} + {increment:.2f} = {new_cwnd:.1f} (SSThresh: {ssthresh})")
-        
-        return new_cwnd, ssthresh, False, 0
+def make_message(msg_num):
+    # Conteúdo da mensagem msg_num, completado até message_size se configurado
+    message = f"Mensagem numero {msg_num}".encode('utf-8')
+    if message_size is not None:
+        message = message.ljust(message_size, b'.')
+    return message
+
+def stream_count():
+    if send_file is not None:
+        return len(send_file) if isinstance(send_file, (list, tuple)) else 1
+    return nbr_of_streams
+
+def new_sources():
+    # O que o servidor transmite, uma fonte por fluxo: os arquivos configurados
+    # ou nbr_of_pct mensagens repartidas entre nbr_of_streams fluxos
+    if send_file is not None:
+        files = send_file if isinstance(send_file, (list, tuple)) else [send_file]
+        return [make_source(path) for path in files]
+    sources, first = [], 0
+    for i in range(nbr_of_streams):
+        count = nbr_of_pct // nbr_of_streams + (i < nbr_of_pct % nbr_of_streams)
+        sources.append(MessageSource(count, lambda n, first=first: make_message(first + n)))
+        first += count
+    return sources
+
+def negotiate_streams(options):
+    # Quantos fluxos o cliente aceita abertos ao mesmo tempo; 0 = sem quadros
+    # (um fluxo só, ou cliente antigo: os fluxos vão um depois do outro)
+    if stream_count() < 2 or OPT_STREAMS not in options:
+        return 0
+    return STREAMS_VALUE.unpack(options[OPT_STREAMS])[0]
+
+def negotiate_compression(options, mss):
+    # Compressor para os dados que o servidor envia, se os dois lados querem
+    # e conhecem o dicionário do cliente (None = segmentos crus)
+    if not compression or OPT_COMPRESS not in options:
+        return None
+    dict_id, max_segment = COMPRESS_VALUE.unpack(options[OPT_COMPRESS])
+    try:
+        zdict = compression_dictionary(dict_id, payload_transform)
+    except ValueError:
+        return None
+    return SegmentCompressor(dict_id, zdict, mss, max_segment, compression_level)
+
+def new_controller(name=None):
+    return make_controller(name or congestion_control,
+                           initial_cwnd=initial_cwnd,
+                           initial_ssthresh=initial_ssthresh,
+                           max_cwnd=max_cwnd,
+                           duplicate_ack_threshold=duplicate_ack_threshold)
 
-def handle_duplicate_ack(cwnd, ssthresh, duplicate_acks, in_fast_recovery):
-    duplicate_acks += 1
-    should_retransmit = False
+# ======================================================================================
+# Controle de Fluxo (janela anunciada pelo receptor)
+# ======================================================================================
 
-    if duplicate_acks == duplicate_ack_threshold and not in_fast_recovery:
-        cwnd = max(cwnd / 2, 2)
-        in_fast_recovery = True
-        should_retransmit = True
-        
-        print(f"\n{'!'*40}")
-        print(f"  FAST RETRANSMIT - CWND: {cwnd:.1f}, SSThresh: {ssthresh}")
-        print(f"{'!'*40}\n")
+# A janela de congestionamento conta pacotes; a do receptor conta bytes a
+# partir do primeiro byte não confirmado. As duas limitam o envio em separado.
 
-    elif in_fast_recovery:
-        cwnd = min(cwnd + 1, max_cwnd)
+def new_recorder(series, columns):
+    path = f"{telemetry_path}.{series}.tlm" if telemetry_path else None
+    try:
+        return Recorder(columns, telemetry_capacity, telemetry_mode, path)
+    except OSError as e:
+        print(f"Erro ao abrir {path}: {e}")
+        return Recorder(columns, telemetry_capacity, telemetry_mode)
+
+def new_trace(cc, start_seq, mss, peer_wscale):
+    if not packet_trace:
+        return None
+    params = {'controller': cc.name, 'initial_cwnd': cc.cwnd, 'initial_ssthresh': cc.ssthresh,
+              'max_cwnd': cc.max_cwnd, 'duplicate_ack_threshold': cc.duplicate_ack_threshold,
+              'initial_rto': initial_rto, 'min_rto': min_rto, 'max_rto': max_rto,
+              'start_seq': start_seq, 'mss': mss, 'peer_wscale': peer_wscale}
+    try:
+        return packettrace.TraceWriter(packet_trace, 'sender', params)
+    except OSError as e:
+        print(f"Erro ao abrir {packet_trace}: {e}")
+        return None
 
-    return cwnd, ssthresh, duplicate_acks, in_fast_recovery, should_retransmit
+def peer_window(rwnd, peer_wscale):
+    # rwnd do cabeçalho em bytes; None (sem limite) se o par não negociou a escala
+    return None if peer_wscale is None else rwnd << peer_wscale
 
-def handle_timeout(cwnd, ssthresh):
-    new_ssthresh = max(int(cwnd / 2), 2)
-    print(f"\n{'!'*60}")
-    print(f"  TIMEOUT - CWND: {cwnd:.1f} → {initial_cwnd}, SSThresh: {ssthresh} → {new_ssthresh}")
-    print(f"{'!'*60}\n")
-    
-    return initial_cwnd, new_ssthresh, False, 0
+def receiver_room(base_seq, current_seq, peer_rwnd):
+    # Bytes que ainda cabem na janela do receptor (None = sem limite)
+    return None if peer_rwnd is None else base_seq + peer_rwnd - current_seq
 
 # ======================================================================================
 # Envio de Mensagens - COM LOGS MOSTRANDO CRESCIMENTO EXPONENCIAL
 # ======================================================================================
 
-def send_messages(sock, addr, start_seq, total_msgs):
-    cwnd, ssthresh, duplicate_acks, in_fast_recovery = initial_cwnd, initial_ssthresh, 0, False
+# source: qualquer fonte de sources.py, uma lista delas (um fluxo cada) ou um
+# inteiro, para esse número de mensagens sintéticas. Cada segmento leva até
+# mss bytes e a transmissão termina quando as fontes se esgotam e tudo foi
+# confirmado.
+#
+# peer_wscale: escala da janela do receptor negociada no handshake (None =
+# receptor sem controle de fluxo). Um segmento novo só sai se couber inteiro
+# na janela anunciada; com ela fechada, o envio para até uma atualização.
+#
+# peer_streams: fluxos simultâneos aceitos pelo cliente (0 = sem quadros de
+# fluxo). Os fluxos dividem a mesma janela e o mesmo controle de
+# congestionamento (ver streams.py).
+# syn_ack: o SYN-ACK já enviado numa retomada 0-RTT, repetido se o SYN do
+# cliente chegar de novo (o SYN-ACK se perdeu)
+#
+# compressor: o SegmentCompressor negociado no handshake (None = segmentos
+# crus). O seq conta bytes descomprimidos; cada segmento pode levar mais que
+# mss bytes da fonte, desde que comprimido caiba no mss.
+def send_messages(sock, addr, start_seq, source, cc=None, mss=DEFAULT_MSS, peer_wscale=None, peer_streams=0,
+                  syn_ack=None, compressor=None):
+    if isinstance(source, int):
+        source = MessageSource(source, make_message)
+    sources = list(source) if isinstance(source, (list, tuple)) else [source]
+    mux = StreamMux(sources, payload_transform, framed=peer_streams > 0, max_open=peer_streams)
+    cc = cc or new_controller()
     next_msg, base_seq, current_seq = 0, start_seq, start_seq
-    in_flight, retransmissions, last_rwnd = {}, 0, 1024
-
-    # Dados para gráficos
-    cwnd_data = [[0.0, cwnd, ssthresh]]
-    throughput_data = []  # [(tempo, mensagens_enviadas_acumuladas)]
-    retrans_data = []  # [(tempo, total_retransmissões)]
+    source_done = False
+    carry = None            # resto de um payload que não coube comprimido no mss
+    in_flight, retransmissions = SendQueue(), 0
+    ack_buffer = ReceiveBuffer(buffer_size)     # um só buffer para todos os ACKs
+    peer_rwnd = None        # janela do receptor em bytes; conhecida no primeiro ACK
+    rtt = RttEstimator(initial_rto, min_rto, max_rto)
+    retx_deadline = None    # prazo do temporizador de retransmissão (time.monotonic)
+    probe_deadline = None   # prazo da próxima sonda de janela zero
+    probe_interval = initial_rto
+    window_probes = 0
+    pacer = Pacer(pacing_quantum, pacing_granularity) if pacing else None
+    pacing_waits = 0
+    dup_acks = 0
+    trace = new_trace(cc, start_seq, mss, peer_wscale)
+
+    # Dados para gráficos (ver new_recorder)
+    cwnd_data = new_recorder('cwnd', ('time', 'cwnd', 'ssthresh'))
+    throughput_data = new_recorder('throughput', ('time', 'messages'))     # mensagens enviadas acumuladas
+    retrans_data = new_recorder('retrans', ('time', 'retransmissions'))   # total de retransmissões
+    ack_latencies = new_recorder('rtt', ('rtt',))     # amostras de RTT válidas (s), para percentis
+    cwnd_data.append(0.0, cc.cwnd, cc.ssthresh)
     
     start_time = time.time()
     last_throughput_time = start_time
     messages_sent_total = 0
     
-    sock.settimeout(0.5)
+    sender = BatchSender(sock, use_gso)
     
     print(f"\n{'='*70}")
-    print(f"INICIANDO TRANSMISSÃO - CWND inicial: {cwnd}, SSThresh: {ssthresh}")
+    print(f"INICIANDO TRANSMISSÃO ({cc.name.upper()}) - CWND inicial: {cc.cwnd}, SSThresh: {cc.ssthresh}")
     print(f"{'='*70}")
     print(f" NO SLOW START: CWND DOBRA A CADA RTT (1→2→4→8...)")
     print(f"{'='*70}\n")
     
+    log.start()
     round_num = 0
     packets_this_round = 0
+    started_at = time.monotonic()
     
-    while base_seq < current_seq or next_msg < total_msgs:
-        window_size = get_window_size(cwnd, last_rwnd)
+    def snapshot():
+        # Lido pela thread de métricas enquanto a transferência corre
+        return {
+            'cwnd_packets': cc.cwnd,
+            'ssthresh_packets': cc.ssthresh,
+            'srtt_seconds': rtt.srtt,
+            'rto_seconds': rtt.rto,
+            'bytes_in_flight': current_seq - base_seq,
+            'peer_rwnd_bytes': peer_rwnd,
+            'bytes_acked_total': base_seq - start_seq,
+            'retransmissions_total': retransmissions,
+            'dup_acks_total': dup_acks,
+            'window_probes_total': window_probes,
+            'goodput_bytes_per_second': metrics.goodput(base_seq - start_seq, started_at),
+        }
+    metrics_handle = metrics.registry.register({'peer': f"{addr[0]}:{addr[1]}", 'role': 'sender'}, snapshot)
+    
+    def encode(payload):
+        # (bytes para o fio, flags) de um segmento de dados
+        if compressor is None:
+            return payload, 0
+        return compressor.encode(payload)
+    
+    def retransmit_holes(holes):
+        nonlocal retransmissions
+        if not holes:
+            return
+        
+        segments = []
+        for seq, payload in holes:
+            wire, flags = encode(payload)
+            segments.append(pack_segment(seq, 0, flags, DEFAULT_RWND, wire))
+        sender.send(segments, addr)
+        now_ns = time.monotonic_ns()
+        for retrans_seq, payload in holes:
+            in_flight.mark_retransmitted(retrans_seq, now_ns / 1e9)
+            if trace is not None:
+                trace.record(now_ns, packettrace.RETRANS, retrans_seq, 0, len(payload), value=cc.cwnd)
+            if log.events:
+                log.record(RETRANS, retrans_seq, 0, cc.cwnd)
+        retransmissions += len(holes)
+        
+        cwnd_data.append(time.time() - start_time, cc.cwnd, cc.ssthresh)
+        retrans_data.append(time.time() - start_time, retransmissions)
+    
+    while base_seq < current_seq or not source_done:
+        window_size = cc.cwnd
         
         # Log do início da rodada
         if packets_this_round == 0:
             round_num += 1
-            print(f"\n{'─'*70}")
-            print(f" RODADA {round_num}")
-            print(f"   CWND: {cwnd:.1f} pacotes | Window: {window_size:.1f} | Em voo: {len(in_flight)}")
-            print(f"{'─'*70}")
+            if log.packets:
+                log.record(ROUND, round_num, 0, cc.cwnd, (window_size, len(in_flight)))
         
-        # Envio inicial
+        # Envio inicial: monta o que a janela e o pacing permitem e entrega ao kernel em lote
         sent_this_iteration = 0
-        while len(in_flight) < window_size and next_msg < total_msgs:
-            payload = f"Mensagem numero {next_msg}"
-            payload_size = len(caesar_cipher(payload).encode('utf-8'))
-            
-            pct = pct_zero.copy()
-            pct['seq'], pct['payload'] = current_seq, payload
+        batch = []
+        rwnd_blocked = paced = False
+        allowance = None
+        if pacer is not None:
+            current_time = time.monotonic()
+            pacer.set_rate(cc.pacing_rate(rtt.srtt) if rtt.srtt else None, current_time)
+            allowance = pacer.allowance(current_time)
+        while len(in_flight) < window_size and not source_done:
+            if allowance is not None and sent_this_iteration >= allowance:
+                paced = True
+                break
+            room = receiver_room(base_seq, current_seq, peer_rwnd)
+            if room is not None and room < mss:
+                # Só segmentos cheios: nada de encher a janela aos pedacinhos
+                rwnd_blocked = True
+                break
+            payload, wire, segment_flags, carry = next_segment(mux, compressor, carry, mss, room)
+            if not payload:
+                source_done = True
+                break
+            payload_size = len(payload)
             
-            if random.random() < LOSS_RATE:
-                print(f"   |<--X--- [PERDIDO] seq={current_seq} ---X-->|")
+            lost = random.random() < LOSS_RATE
+            if lost:
+                if log.events:
+                    log.record(DATA_LOST, current_seq, 0, cc.cwnd)
             else:
-                my_encode_and_send(sock, pct, addr)
-                print(f"   |◀─────── DADOS (seq={current_seq}){' '*(30-len(str(current_seq))-12)} ───────| (Msg {next_msg})")
+                batch.append(pack_segment(current_seq, 0, segment_flags, DEFAULT_RWND, wire))
+                if log.packets:
+                    log.record(DATA_SENT, current_seq, 0, cc.cwnd, next_msg)
             
-            in_flight[current_seq] = (next_msg, payload, time.time())
+            now_ns = time.monotonic_ns()
+            if trace is not None:
+                trace.record(now_ns, packettrace.DROP if lost else packettrace.SEND, current_seq, 0, payload_size,
+                             value=cc.cwnd)
+            in_flight.push(current_seq, next_msg, payload, now_ns / 1e9)
             current_seq += payload_size
             next_msg += 1
             sent_this_iteration += 1
@@ -232,330 +451,283 @@ def send_messages(sock, addr, start_seq, total_msgs):
             # Registra throughput a cada segundo
             current_time = time.time()
             if current_time - last_throughput_time >= 1.0:
-                throughput_data.append([current_time - start_time, messages_sent_total])
+                throughput_data.append(current_time - start_time, messages_sent_total)
                 last_throughput_time = current_time
 
-        if sent_this_iteration > 0:
-            print(f"    Enviados {sent_this_iteration} pacote(s) nesta iteração")
+        if batch:
+            sender.send(batch, addr)
+
+        pacing_release = None
+        if pacer is not None:
+            pacer.consume(sent_this_iteration)
+            if paced:
+                pacing_release = pacer.next_release(time.monotonic())
+                pacing_waits += 1
+
+        if retx_deadline is None and in_flight:
+            retx_deadline = time.monotonic() + rtt.rto
+
+        if sent_this_iteration > 0 and log.packets:
+            log.record(BATCH, current_seq, 0, cc.cwnd, sent_this_iteration)
+
+        # Persistência: janela fechada e nenhum ACK a caminho que possa reabri-la
+        if rwnd_blocked and not in_flight:
+            if probe_deadline is None:
+                probe_interval = rtt.rto
+                probe_deadline = time.monotonic() + probe_interval
+                if log.events:
+                    log.record(ZERO_WINDOW, 0, base_seq, cc.cwnd)
+        else:
+            probe_deadline = None
+
+        # Temporizador de retransmissão: um único prazo, o do segmento mais antigo
+        # não confirmado; o recv espera no máximo até ele.
+        if retx_deadline is not None:
+            remaining = retx_deadline - time.monotonic()
+        elif probe_deadline is not None:
+            remaining = probe_deadline - time.monotonic()
+        else:
+            remaining = idle_poll
+        
+        if remaining <= 0 and retx_deadline is None:
+            # Sonda de janela zero: segmento vazio que o receptor responde com um ACK
+            my_encode_and_send(sock, addr, seq=current_seq)
+            window_probes += 1
+            probe_interval = min(probe_interval * 2, max_rto)
+            probe_deadline = time.monotonic() + probe_interval
+            if log.events:
+                log.record(WINDOW_PROBE, current_seq, base_seq, cc.cwnd, probe_interval)
+            if trace is not None:
+                trace.record(time.monotonic_ns(), packettrace.PROBE, current_seq, base_seq, value=cc.cwnd)
+            continue
+        
+        if remaining <= 0:
+            now_ns = time.monotonic_ns()
+            current_time = now_ns / 1e9
+            old_cwnd, old_ssthresh = cc.cwnd, cc.ssthresh
+            cc.on_timeout(current_time)
+            rtt.on_timeout()
+            
+            # Recomeça a recuperação: o mais antigo e os buracos já conhecidos pelo SACK
+            holes = in_flight.start_recovery(current_seq, restart=True)
+            if log.events:
+                log.record(TIMEOUT, holes[0][0], base_seq, cc.cwnd,
+                           (cc.name, old_cwnd, old_ssthresh, cc.ssthresh, rtt.rto))
+            if trace is not None:
+                trace.record(now_ns, packettrace.TIMEOUT, current_seq, base_seq, value=cc.cwnd)
+            retransmit_holes(holes)
+            
+            retx_deadline = time.monotonic() + rtt.rto
+            packets_this_round = 0
+            continue
+
+        # Espera um ACK ou a próxima ficha do pacing. O select tem resolução de
+        # microssegundos; o settimeout do socket arredonda para milissegundos.
+        if pacing_release is not None:
+            remaining = min(remaining, pacing_release - time.monotonic())
+        if not select.select([sock], [], [], max(remaining, 0))[0]:
+            continue
 
         # Recebe ACKs
         try:
-            ack_msg, _ = my_receive_and_decode(sock, buffer_size)
-            received_ack = ack_msg['ack']
-            last_rwnd = ack_msg.get('rwnd', 1024)
+            (_, received_ack, rwnd, ack_flags, ack_payload), _ = ack_buffer.receive(sock)
+            now_ns = time.monotonic_ns()
+            current_time = now_ns / 1e9
+            
+            if ack_flags & FLAG_SYN:
+                # SYN repetido numa retomada 0-RTT: o cliente não viu o SYN-ACK
+                # e descartou o que veio antes dele. O mais antigo vai logo
+                # atrás do novo SYN-ACK, sem esperar o RTO (que dobrou à toa).
+                if syn_ack is not None:
+                    sock.sendto(syn_ack, addr)
+                    if in_flight:
+                        oldest_seq, _, oldest_payload, _ = in_flight.oldest()
+                        retransmit_holes([(oldest_seq, oldest_payload)])
+                        retx_deadline = time.monotonic() + rtt.rto
+                continue
+            
+            # Scoreboard: marca o que o cliente já tem fora de ordem
+            if ack_flags & FLAG_SACK:
+                for left, right in unpack_sack(ack_payload):
+                    in_flight.sack(left, right)
+                    if trace is not None:
+                        trace.record(now_ns, packettrace.SACK, left, right, value=cc.cwnd)
+            
+            # Janela do receptor: vale a do ACK mais recente que não seja antigo
+            window_update = False
+            if received_ack >= base_seq:
+                new_rwnd = peer_window(rwnd, peer_wscale)
+                window_update = new_rwnd != peer_rwnd
+                peer_rwnd = new_rwnd
             
             if received_ack > base_seq:
                 # ACK novo
-                confirmed = [s for s in in_flight if s < received_ack]
-                num_confirmed = len(confirmed)
+                num_confirmed, sample_sent_at = in_flight.ack(received_ack)
                 
-                print(f"   |───── ACK (ack={received_ack}){' '*(30-len(str(received_ack))-10)} ────▶| ✓ {num_confirmed} pct(s) confirmado(s)")
+                # Amostra de RTT (regra de Karn já aplicada pela fila) e reinício do temporizador
+                if sample_sent_at is not None:
+                    ack_latencies.append(current_time - sample_sent_at)
+                    rtt.sample(current_time - sample_sent_at)
+                    cc.on_rtt_sample(current_time - sample_sent_at, current_time)
+                retx_deadline = current_time + rtt.rto if in_flight else None
                 
-                for seq in confirmed:
-                    del in_flight[seq]
+                old_cwnd = cc.cwnd
+                cc.on_ack(num_confirmed, current_time, len(in_flight))
+                if log.packets:
+                    log.record(ACK_NEW, 0, received_ack, cc.cwnd, num_confirmed)
+                    log.record(CWND, 0, received_ack, cc.cwnd, (old_cwnd, cc.ssthresh, cc.phase))
+                if trace is not None:
+                    trace.record(now_ns, packettrace.ACK, 0, received_ack, 0, rwnd, ack_flags, cc.cwnd)
+                retransmit_holes(in_flight.next_holes())   # ACK parcial durante a recuperação
                 
-                old_cwnd = cwnd
-                cwnd, ssthresh, in_fast_recovery, duplicate_acks = handle_new_ack(
-                    cwnd, ssthresh, num_confirmed, in_fast_recovery)
-                
-                if old_cwnd != cwnd:
-                    cwnd_data.append([time.time() - start_time, cwnd, ssthresh])
+                if old_cwnd != cc.cwnd:
+                    cwnd_data.append(time.time() - start_time, cc.cwnd, cc.ssthresh)
                 
                 base_seq = received_ack
                 packets_this_round = 0  # Nova rodada começa
                 
-            elif received_ack == base_seq and in_flight:
-                # ACK duplicado
-                print(f"   |───── ACK (ack={received_ack}){' '*(30-len(str(received_ack))-10)} ────▶| ⚠️ Duplicado #{duplicate_acks+1}")
-                
-                cwnd, ssthresh, duplicate_acks, in_fast_recovery, should_retransmit = handle_duplicate_ack(
-                    cwnd, ssthresh, duplicate_acks, in_fast_recovery)
+            elif received_ack == base_seq and in_flight and (ack_flags & FLAG_SACK or not window_update):
+                # ACK duplicado (uma atualização de janela sem SACK não conta)
+                dup_acks += 1
+                if log.packets:
+                    log.record(ACK_DUP, 0, received_ack, cc.cwnd, cc.duplicate_acks + 1)
                 
-                if should_retransmit and in_flight:
-                    retrans_seq = min(in_flight.keys())
-                    msg_num, payload, _ = in_flight[retrans_seq]
-                    
-                    pct = pct_zero.copy()
-                    pct['seq'], pct['payload'] = retrans_seq, payload
-                    
-                    my_encode_and_send(sock, pct, addr)
-                    in_flight[retrans_seq] = (msg_num, payload, time.time())
-                    retransmissions += 1
-                    
-                    print(f"   |◀───────  RETRANS (seq={retrans_seq}){' '*(30-len(str(retrans_seq))-14)} ───────|")
-                    cwnd_data.append([time.time() - start_time, cwnd, ssthresh])
-                    retrans_data.append([time.time() - start_time, retransmissions])
+                recovery = cc.on_duplicate_ack(current_time)
+                if trace is not None:
+                    trace.record(now_ns, packettrace.ACK, 0, received_ack, 0, rwnd, ack_flags, cc.cwnd)
+                if recovery:
+                    # Entra em recuperação: retransmite todos os buracos do scoreboard
+                    if log.events:
+                        log.record(FAST_RETRANSMIT, base_seq, received_ack, cc.cwnd, (cc.name, cc.ssthresh))
+                    retransmit_holes(in_flight.start_recovery(current_seq))
+                else:
+                    # Blocos SACK novos podem revelar buracos acima dos já retransmitidos
+                    retransmit_holes(in_flight.next_holes())
             
-            elif received_ack < base_seq:
-                print(f"   |───── ACK (ack={received_ack}){' '*(30-len(str(received_ack))-10)} ────▶| (Antigo)")
+            else:
+                # ACK antigo ou só atualização de janela: o replay precisa dele
+                # para acompanhar a janela do receptor
+                if trace is not None:
+                    trace.record(now_ns, packettrace.ACK, 0, received_ack, 0, rwnd, ack_flags, cc.cwnd)
+                if received_ack < base_seq and log.packets:
+                    log.record(ACK_OLD, 0, received_ack, cc.cwnd)
 
         except socket.timeout:
-            current_time = time.time()
-            
-            for seq in sorted(in_flight.keys()):
-                msg_num, payload, timestamp = in_flight[seq]
-                
-                if current_time - timestamp > timeout:
-                    cwnd, ssthresh, in_fast_recovery, duplicate_acks = handle_timeout(cwnd, ssthresh)
-                    
-                    pct = pct_zero.copy()
-                    pct['seq'], pct['payload'] = seq, payload
-                    
-                    my_encode_and_send(sock, pct, addr)
-                    in_flight[seq] = (msg_num, payload, current_time)
-                    retransmissions += 1
-                    
-                    print(f"   |◀───────  TIMEOUT RE-TX (seq={seq}){' '*(30-len(str(seq))-18)} ───────|")
-                    cwnd_data.append([time.time() - start_time, cwnd, ssthresh])
-                    retrans_data.append([time.time() - start_time, retransmissions])
-                    packets_this_round = 0
-                    break
+            pass
     
     # Adiciona último ponto de throughput
-    throughput_data.append([time.time() - start_time, messages_sent_total])
+    throughput_data.append(time.time() - start_time, messages_sent_total)
+    log.close()    # descarrega o que falta antes do resumo
+    metrics.registry.unregister(metrics_handle)
+    if trace is not None:
+        trace.close()
     
     # Estatísticas
-    total_sent = next_msg
+    total_msgs = total_sent = next_msg
     efficiency = (total_msgs / total_sent * 100) if total_sent > 0 else 0
 
     print(f"\n{'='*70}")
     print(f" TRANSMISSÃO COMPLETA!")
     print(f"{'='*70}")
-    print(f"Mensagens únicas: {total_msgs}")
+    print(f"Mensagens únicas: {total_msgs} ({current_seq - start_seq} bytes, MSS {mss})")
+    if mux.framed:
+        print(f"Fluxos: {mux.streams} (até {peer_streams} abertos ao mesmo tempo)")
     print(f"Total enviado: {total_sent}")
-    print(f"Retransmissões: {retransmissions} ({100*retransmissions/total_sent:.2f}%)")
+    print(f"Retransmissões: {retransmissions} ({100*retransmissions/max(total_sent, 1):.2f}%)")
     print(f"Eficiência: {efficiency:.1f}%")
-    print(f"CWND final: {cwnd:.1f}, SSThresh: {ssthresh}")
+    if window_probes:
+        print(f"Sondas de janela zero: {window_probes}")
+    if pacing_waits:
+        print(f"Esperas do pacing: {pacing_waits}")
+    if compressor is not None and compressor.compressed:
+        print(f"Compressão: {compressor.compressed} de {compressor.segments} segmentos, "
+              f"{compressor.raw_bytes} -> {compressor.wire_bytes} bytes "
+              f"({100*compressor.wire_bytes/compressor.raw_bytes:.1f}%)")
+    print(f"CWND final: {cc.cwnd:.1f}, SSThresh: {cc.ssthresh}")
+    if rtt.srtt is not None:
+        print(f"SRTT: {rtt.srtt*1000:.2f} ms, RTTVAR: {rtt.rttvar*1000:.2f} ms, RTO: {rtt.rto*1000:.0f} ms")
+    print(f"Syscalls de envio em lote: {sender.syscalls} para {sender.datagrams} datagramas"
+          f" ({'GSO' if sender.use_gso else 'sendto'})")
+    if trace is not None:
+        print(f"Trace: {trace.count} eventos em '{trace.path}' (python replay.py {trace.path})")
     print(f"{'='*70}\n")
     
-    # Salva CSV
-    try:
-        with open('congestion_data.csv', 'w', newline='') as f:
-            csv.writer(f).writerows([['Time', 'CWND', 'SSThresh']] + cwnd_data)
-        print(" Dados salvos em 'congestion_data.csv'")
-    except IOError as e:
-        print(f"Erro ao salvar CSV: {e}")
-
-    return current_seq, cwnd_data, throughput_data, retrans_data, {
+    stats = {
         'total_msgs': total_msgs,
+        'total_bytes': current_seq - start_seq,
         'total_sent': total_sent,
         'retransmissions': retransmissions,
-        'efficiency': efficiency
+        'efficiency': efficiency,
+        'window_probes': window_probes,
+        'pacing_waits': pacing_waits,
+        'dup_acks': dup_acks,
+        'compressed_segments': compressor.compressed if compressor is not None else 0,
     }
 
+    # Fecha as séries (o que falta vai para os arquivos) e grava o resumo
+    # que o report.py usa no painel de estatísticas
+    for recorder in (cwnd_data, throughput_data, retrans_data, ack_latencies):
+        recorder.close()
+    if telemetry_path:
+        try:
+            with open(f"{telemetry_path}.json", 'w') as f:
+                json.dump(dict(stats, congestion_control=cc.name, initial_cwnd=initial_cwnd,
+                               initial_ssthresh=initial_ssthresh, loss_rate=LOSS_RATE,
+                               initial_rto=initial_rto), f, indent=2)
+            print(f" Séries salvas em '{telemetry_path}.*.tlm' (gráficos: python report.py {telemetry_path})")
+        except OSError as e:
+            print(f"Erro ao salvar resumo: {e}")
+
+    stats['ack_latencies'] = ack_latencies
+    return current_seq, cwnd_data, throughput_data, retrans_data, stats
+
 # ======================================================================================
 # Finalização
 # ======================================================================================
 
-def finishConnection(socket, address, now_ack):
-    fin_pct = pct_zero.copy()
-    fin_pct.update({'seq': now_ack, 'FIN': True, 'payload': ''})
-    
-    socket.settimeout(2.0)
+def finishConnection(sock, address, now_ack):
+    sock.settimeout(2.0)
     print(f"   |{' '*46}|")
     
-    my_encode_and_send(socket, fin_pct, address)
+    my_encode_and_send(sock, address, seq=now_ack, flags=FLAG_FIN)
     print(f"   |◀─────── FIN (seq={now_ack}){' '*(30-len(str(now_ack))-10)} ───────|")
     
     for _ in range(5):
         try:
-            fin_ack_msg, _ = my_receive_and_decode(socket, buffer_size)
+            (fin_ack_seq, fin_ack, _, _, _), _ = my_receive_and_decode(sock, buffer_size)
             
-            if fin_ack_msg['ack'] == now_ack + 1:
-                print(f"   |───── FIN-ACK (ack={fin_ack_msg['ack']}){' '*(30-len(str(fin_ack_msg['ack']))-15)} ────▶|")
+            if fin_ack == now_ack + 1:
+                print(f"   |───── FIN-ACK (ack={fin_ack}){' '*(30-len(str(fin_ack))-15)} ────▶|")
                 
-                last_ack_pct = pct_zero.copy()
-                last_ack_pct['ack'] = fin_ack_msg['seq'] + 1
-                my_encode_and_send(socket, last_ack_pct, address)
+                my_encode_and_send(sock, address, ack=fin_ack_seq + 1)
                 
                 print(f"   └──────────── CONEXÃO FINALIZADA ──────────────┘")
                 break
             
         except socket.timeout:
             print("[!] Timeout! Reenviando FIN...")
-            my_encode_and_send(socket, fin_pct, address)
+            my_encode_and_send(sock, address, seq=now_ack, flags=FLAG_FIN)
         except Exception as e:
             print(f"Erro: {e}")
             break
             
-    socket.close()
+    sock.close()
     print("Conexão finalizada.")
 
-# ======================================================================================
-# Função de Plotagem de Gráficos - VERSÃO MELHORADA E PROFISSIONAL
-# ======================================================================================
-
-def plot_transmission_graphs(cwnd_data, throughput_data, retrans_data, stats,
-                             initial_cwnd=1,
-                             initial_ssthresh=16,
-                             loss_rate=0.0,
-                             timeout=1.0):
-    import matplotlib.pyplot as plt
-    import numpy as np
-
-    plt.style.use('seaborn-v0_8-darkgrid')
-    fig = plt.figure(figsize=(20, 12))
-    fig.patch.set_facecolor('#f8f9fa')
-
-    fig.suptitle(
-        'Análise Completa de Transmissão TCP com Controle de Congestionamento',
-        fontsize=18, fontweight='bold', y=0.98
-    )
-
-    gs = fig.add_gridspec(3, 3, hspace=0.35, wspace=0.3)
-
-    # ==================================================================================
-    # GRÁFICO 1 — Evolução do CWND e SSThresh
-    # ==================================================================================
-    ax1 = fig.add_subplot(gs[0, :2])
-
-    times = [t for t, _, _ in cwnd_data]
-    cwnds = [c for _, c, _ in cwnd_data]
-    ssthreshs = [s for _, _, s in cwnd_data]
-
-    ax1.plot(times, cwnds, label='CWND', linewidth=2.5,
-             marker='o', markersize=3, markevery=max(1, len(times)//50))
-    ax1.plot(times, ssthreshs, 'r--', linewidth=2,
-             label='SSThresh', alpha=0.8)
-
-    ax1.fill_between(times, cwnds, alpha=0.2)
-
-    # Slow Start: cwnd < ssthresh
-    slow_start_idx = [i for i, (c, s) in enumerate(zip(cwnds, ssthreshs)) if c < s]
-    if slow_start_idx:
-        ax1.scatter([times[i] for i in slow_start_idx],
-                    [cwnds[i] for i in slow_start_idx],
-                    c='green', s=30, alpha=0.5,
-                    label='Slow Start', zorder=5)
-
-    # Eventos de congestão: queda de ssthresh
-    congestion_events = [
-        (times[i], cwnds[i])
-        for i in range(1, len(ssthreshs))
-        if ssthreshs[i] < ssthreshs[i - 1]
-    ]
-
-    if congestion_events:
-        t_ce, c_ce = zip(*congestion_events)
-        ax1.scatter(t_ce, c_ce, c='red', marker='X', s=100,
-                    edgecolors='black', linewidths=1,
-                    label='Evento de Congestão', zorder=10)
-
-    # Pico de CWND
-    max_cwnd = max(cwnds)
-    max_idx = cwnds.index(max_cwnd)
-    ax1.annotate(
-        f'Pico: {max_cwnd:.1f}',
-        xy=(times[max_idx], max_cwnd),
-        xytext=(10, 10),
-        textcoords='offset points',
-        bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.7),
-        arrowprops=dict(arrowstyle='->')
-    )
-
-    ax1.set_title('Evolução do CWND e SSThresh', fontsize=13, fontweight='bold')
-    ax1.set_xlabel('Tempo (s)', fontsize=12)
-    ax1.set_ylabel('Janela (pacotes)', fontsize=12)
-    ax1.legend()
-    ax1.set_facecolor('#ffffff')
-
-    # ==================================================================================
-    # GRÁFICO 2 — CWND em Escala Logarítmica
-    # ==================================================================================
-    ax2 = fig.add_subplot(gs[0, 2])
-
-    ax2.semilogy(times, cwnds, 'b-', linewidth=2,
-                 marker='o', markersize=3, label='CWND')
-    ax2.semilogy(times, ssthreshs, 'r--', linewidth=2,
-                 label='SSThresh', alpha=0.7)
-
-    # Linha de referência exponencial (2^x)
-    if len(times) > 1:
-        t0, t1 = times[0], times[-1]
-        span = max(t1 - t0, 1e-6)
-
-        exp_ref = [
-            initial_cwnd * (2 ** ((t - t0) / (span / 6)))
-            for t in times
-        ]
-
-        ax2.semilogy(times, exp_ref, 'g:',
-                     linewidth=1.5, alpha=0.6,
-                     label='Referência exponencial (2^x)')
-
-    ax2.set_title('CWND em Escala Logarítmica', fontsize=11, fontweight='bold')
-    ax2.set_xlabel('Tempo (s)')
-    ax2.set_ylabel('Janela (log)')
-    ax2.legend(fontsize=8)
-    ax2.set_facecolor('#ffffff')
-
-    # ==================================================================================
-    # PAINEL DE ESTATÍSTICAS
-    # ==================================================================================
-    ax3 = fig.add_subplot(gs[2, 1:])
-    ax3.axis('off')
-
-    efficiency = stats.get('efficiency', 0)
-    total_sent = stats.get('total_sent', 0)
-    retransmissions = stats.get('retransmissions', 0)
-
-    retrans_rate = (100 * retransmissions / total_sent) if total_sent else 0
-
-    stats_text = f"""
-╔══════════════════════════════════════════════════════════════╗
-║           ESTATÍSTICAS DA TRANSMISSÃO TCP                    ║
-╚══════════════════════════════════════════════════════════════╝
-
- MÉTRICAS:
-   • Total Enviado:              {total_sent:>6}
-   • Retransmissões:             {retransmissions:>6}
-   • Taxa de Retransmissão:      {retrans_rate:>6.2f} %
-   • Eficiência:                 {efficiency:>6.1f} %
-
-  CONFIGURAÇÃO:
-   • CWND Inicial:               {initial_cwnd:>6.1f}
-   • SSThresh Inicial:           {initial_ssthresh:>6.1f}
-   • CWND Máximo:                {max_cwnd:>6.1f}
-   • Taxa de Perda:              {loss_rate * 100:>6.2f} %
-   • Timeout:                    {timeout:>6.2f} s
-
- ALGORITMO:
-   • Slow Start:                 OK (crescimento exponencial)
-   • Congestion Avoidance:       OK (crescimento linear)
-   • Fast Retransmit/Recovery:   OK
-"""
-
-    ax3.text(
-        0.05, 0.5, stats_text,
-        fontsize=10, family='monospace',
-        verticalalignment='center',
-        bbox=dict(boxstyle='round,pad=1',
-                  facecolor='#e8f5e9',
-                  edgecolor='#4CAF50',
-                  linewidth=2)
-    )
-
-    # ==================================================================================
-    # SALVAMENTO
-    # ==================================================================================
-    plt.savefig('transmission_analysis.png', dpi=200,
-                bbox_inches='tight', facecolor='#f8f9fa')
-    plt.savefig('transmission_analysis.pdf',
-                bbox_inches='tight', facecolor='#f8f9fa')
-
-    plt.show()
-
-
 # ======================================================================================
 # Main
 # ======================================================================================
 
 if __name__ == "__main__":
-    sock, addr, seq = initConnection(localIP, local_port, pct_zero, buffer_size, ISN)
-    final_seq, cwnd_data, throughput_data, retrans_data, stats = send_messages(sock, addr, seq, nbr_of_pct)
+    if metrics_address is not None:
+        metrics.serve_metrics(metrics_address)
+    sock, addr, seq, _, mss, peer_wscale, peer_streams, compressor, syn_ack = initConnection(
+        localIP, local_port, buffer_size, ISN)
+    sources = new_sources()
+    final_seq, cwnd_data, throughput_data, retrans_data, stats = send_messages(
+        sock, addr, seq, sources, mss=mss, peer_wscale=peer_wscale, peer_streams=peer_streams,
+        syn_ack=syn_ack, compressor=compressor)
+    for source in sources:
+        source.close()
     finishConnection(sock, addr, final_seq)
-    
-    # Plota os gráficos
-    print("\n Gerando gráficos de análise...")
-    plot_transmission_graphs(cwnd_data, throughput_data, retrans_data, stats)
 
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import random
+import signal
+import socket
+import time
+
+import metrics
+import server_async
+from server_final import localIP, local_port, metrics_address
+
+# ======================================================================================
+# Servidor Multi-Processo (SO_REUSEPORT)
+# ======================================================================================
+#
+# N processos trabalhadores rodam cada um o servidor de server_async.py num
+# socket próprio ligado à mesma porta com SO_REUSEPORT. O kernel distribui os
+# datagramas por hash do par (endereço, porta) de origem, então todos os
+# segmentos de um cliente caem sempre no mesmo trabalhador, que guarda a sua
+# tabela de conexões e o estado de congestionamento sem nada compartilhado.
+# Cada trabalhador tem o seu GIL: cifra, log e empacotamento escalam com os
+# núcleos.
+#
+# O supervisor só recebe o resumo de cada transferência por uma fila,
+# imprime os totais por trabalhador a cada report_interval segundos e sobe
+# de novo quem morrer. Um trabalhador novo muda o hash: as conexões em curso
+# de quem morreu se perdem (e as de outros podem mudar de processo).
+#
+# Com métricas (ver metrics.py), cada trabalhador serve as suas num endereço
+# próprio: porta + id do trabalhador, ou caminho.id para socket Unix.
+#
+#   python server_workers.py --workers 8 --metrics 127.0.0.1:9100
+
+workers = os.cpu_count() or 1
+report_interval = 5.0
+
+# ======================================================================================
+# Trabalhador
+# ======================================================================================
+
+def reuseport_socket(IP, port):
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise RuntimeError("SO_REUSEPORT não disponível nesta plataforma")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((IP, port))
+    return sock
+
+def worker_metrics_address(address, worker_id):
+    if isinstance(address, (str, os.PathLike)):
+        return f"{os.fspath(address)}.{worker_id}"
+    ip, port = address
+    return ip, port + worker_id
+
+def run_worker(worker_id, IP, port, stats, metrics_address=None):
+    # Ctrl+C vai para o grupo todo: quem encerra os trabalhadores é o supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    random.seed()   # com fork, todos herdariam o mesmo estado da perda simulada
+
+    def on_transfer(summary):
+        stats.put((worker_id, summary))
+
+    sock = reuseport_socket(IP, port)
+    print(f"[worker {worker_id}] pid {os.getpid()}")
+    if metrics_address is not None:
+        metrics.serve_metrics(worker_metrics_address(metrics_address, worker_id))
+    asyncio.run(server_async.serve(IP, port, sock=sock, on_transfer=on_transfer))
+
+# ======================================================================================
+# Supervisor
+# ======================================================================================
+
+class WorkerStats:
+    def __init__(self):
+        self.transfers = 0
+        self.bytes = 0
+        self.segments = 0
+        self.retransmissions = 0
+        self.elapsed = 0.0
+        self.restarts = 0
+
+    def add(self, summary):
+        self.transfers += 1
+        self.bytes += summary['bytes']
+        self.segments += summary['segments']
+        self.retransmissions += summary['retransmissions']
+        self.elapsed += summary['elapsed']
+
+def print_report(stats):
+    print(f"\n{'='*78}")
+    print(f" {'Worker':<8}{'Transf.':>9}{'Segmentos':>12}{'Bytes':>14}{'Retx':>9}{'Retx %':>9}{'Reinícios':>12}")
+    print(f"{'─'*78}")
+    total = WorkerStats()
+    for worker_id, worker in sorted(stats.items()):
+        retx = 100 * worker.retransmissions / max(worker.segments, 1)
+        print(f" {worker_id:<8}{worker.transfers:>9}{worker.segments:>12}{worker.bytes:>14}"
+              f"{worker.retransmissions:>9}{retx:>8.2f}%{worker.restarts:>12}")
+        for name in ('transfers', 'segments', 'bytes', 'retransmissions', 'restarts'):
+            setattr(total, name, getattr(total, name) + getattr(worker, name))
+    retx = 100 * total.retransmissions / max(total.segments, 1)
+    print(f"{'─'*78}")
+    print(f" {'Total':<8}{total.transfers:>9}{total.segments:>12}{total.bytes:>14}"
+          f"{total.retransmissions:>9}{retx:>8.2f}%{total.restarts:>12}")
+    print(f"{'='*78}\n")
+
+def supervise(n, IP, port, metrics_address=None):
+    # fork: os trabalhadores herdam a configuração já carregada (e alterada) no pai
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    stats = {worker_id: WorkerStats() for worker_id in range(n)}
+
+    def spawn(worker_id):
+        process = ctx.Process(target=run_worker, args=(worker_id, IP, port, results, metrics_address),
+                              name=f"worker-{worker_id}", daemon=True)
+        process.start()
+        return process
+
+    print(f"Supervisor: {n} trabalhador(es) em {IP}:{port} (SO_REUSEPORT)")
+    processes = {worker_id: spawn(worker_id) for worker_id in range(n)}
+    changed = False
+    next_report = time.monotonic() + report_interval
+
+    try:
+        while True:
+            try:
+                worker_id, summary = results.get(timeout=max(next_report - time.monotonic(), 0.01))
+                stats[worker_id].add(summary)
+                changed = True
+            except queue.Empty:
+                pass
+
+            for worker_id, process in processes.items():
+                if not process.is_alive():
+                    print(f"[!] worker {worker_id} saiu (código {process.exitcode}); reiniciando")
+                    stats[worker_id].restarts += 1
+                    processes[worker_id] = spawn(worker_id)
+
+            if time.monotonic() >= next_report:
+                if changed:
+                    print_report(stats)
+                    changed = False
+                next_report = time.monotonic() + report_interval
+
+    except KeyboardInterrupt:
+        print("\nEncerrando trabalhadores...")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+        while True:
+            try:
+                worker_id, summary = results.get_nowait()
+            except queue.Empty:
+                break
+            stats[worker_id].add(summary)
+        print_report(stats)
+
+# ======================================================================================
+# Main
+# ======================================================================================
+
+def parse_metrics_address(text):
+    ip, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return ip, int(port)
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor UDP com vários processos na mesma porta")
+    parser.add_argument('--workers', type=int, default=workers)
+    parser.add_argument('--ip', default=localIP)
+    parser.add_argument('--port', type=int, default=local_port)
+    parser.add_argument('--metrics', type=parse_metrics_address, default=metrics_address,
+                        help="ip:porta (HTTP) ou caminho de socket Unix; cada trabalhador soma o seu id")
+    args = parser.parse_args()
+    supervise(args.workers, args.ip, args.port, args.metrics)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+
+# ======================================================================================
+# Destinos dos Dados Recebidos
+# ======================================================================================
+#
+# O receptor entrega cada pedaço com write(offset, data), onde offset é a
+# posição do primeiro byte no fluxo (0 = primeiro byte de dados). Destinos
+# com random_access = True aceitam escrita fora de ordem: o receptor grava o
+# segmento na sua posição assim que ele chega e só guarda as faixas
+# recebidas. Nos demais, write é chamado estritamente em ordem e o receptor
+# segura os segmentos fora de ordem até o buraco ser preenchido.
+#
+# data pode ser uma fatia do buffer de recepção, reaproveitado no próximo
+# datagrama: um destino que guarda o pedaço depois do write copia.
+#
+# close(length) é chamado no fim com o total entregue em ordem.
+#
+# backlog() diz quantos bytes já entregues o consumidor ainda não tirou do
+# destino; o receptor desconta isso da janela que anuncia. Destinos que
+# gravam ou repassam na hora retornam 0.
+#
+#   NullSink        só conta (o comportamento original do cliente)
+#   FileSink        os.pwrite direto no offset, arquivo pré-alocado em blocos
+#   StreamSink      objeto com write(), ex.: sys.stdout.buffer
+#   CallbackSink    chama callback(data) para cada pedaço em ordem
+#   AsyncQueueSink  entrega os pedaços numa asyncio.Queue de outro loop/thread
+
+class NullSink:
+    random_access = True
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, offset, data):
+        self.bytes += len(data)
+
+    def backlog(self):
+        return 0
+
+    def close(self, length):
+        pass
+
+class FileSink:
+    random_access = True
+
+    PREALLOCATE_CHUNK = 4 * 1024 * 1024
+
+    def __init__(self, path, size_hint=None):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._allocated = 0
+        if size_hint:
+            self._preallocate(size_hint)
+
+    def _preallocate(self, size):
+        # Reserva espaço à frente para o arquivo não crescer a cada segmento
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self._fd, self._allocated, size - self._allocated)
+            except OSError:
+                pass    # sistema de arquivos sem suporte: o pwrite cresce o arquivo
+        self._allocated = size
+
+    def write(self, offset, data):
+        end = offset + len(data)
+        if end > self._allocated:
+            self._preallocate(end + self.PREALLOCATE_CHUNK)
+        os.pwrite(self._fd, data, offset)
+
+    def backlog(self):
+        return 0
+
+    def close(self, length):
+        os.ftruncate(self._fd, length)   # descarta a pré-alocação e dados além do entregue
+        os.close(self._fd)
+
+class StreamSink:
+    random_access = False
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, offset, data):
+        self.stream.write(data)
+
+    def backlog(self):
+        return 0
+
+    def close(self, length):
+        self.stream.flush()
+
+class CallbackSink:
+    random_access = False
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, offset, data):
+        self.callback(bytes(data))
+
+    def backlog(self):
+        return 0
+
+    def close(self, length):
+        pass
+
+class AsyncQueueSink:
+    # O receptor roda fora do loop (laço bloqueante): cada pedaço é entregue
+    # com call_soon_threadsafe, e None marca o fim do fluxo. O consumidor lê
+    # com await sink.read() para que o backlog (e a janela) acompanhe o
+    # quanto ele já consumiu; cada contador só é escrito por uma thread.
+    random_access = False
+
+    def __init__(self, loop, queue=None):
+        self.loop = loop
+        self.queue = queue if queue is not None else asyncio.Queue()
+        self._written = 0       # thread do receptor
+        self._consumed = 0      # thread do loop
+
+    def write(self, offset, data):
+        self._written += len(data)
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, bytes(data))
+
+    async def read(self):
+        data = await self.queue.get()
+        if data is not None:
+            self._consumed += len(data)
+        return data
+
+    def backlog(self):
+        return self._written - self._consumed
+
+    def close(self, length):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+def make_sink(target):
+    # None, caminho, objeto com write() ou função
+    if target is None:
+        return NullSink()
+    if isinstance(target, (str, os.PathLike)):
+        return FileSink(target)
+    if hasattr(target, 'write') and hasattr(target, 'close'):
+        if getattr(target, 'random_access', None) is not None:
+            return target
+        return StreamSink(target)
+    if callable(target):
+        return CallbackSink(target)
+    raise ValueError(f"Destino de dados desconhecido: {target!r}")
@@ -0,0 +1,118 @@
+import mmap
+import os
+import socket
+
+# ======================================================================================
+# Fontes de Dados do Transmissor
+# ======================================================================================
+#
+# O laço de envio só pede "até n bytes" com read(n) e para quando recebe um
+# vazio; cada fonte corta o seu fluxo em segmentos do tamanho do MSS
+# negociado. Assim o total não precisa ser conhecido de antemão e cada
+# datagrama vai cheio.
+#
+#   FileSource      arquivo mapeado em memória; devolve fatias memoryview do
+#                   mmap, sem cópia (a cópia única é a do pack_segment)
+#   BytesSource     um buffer já em memória, também fatiado com memoryview
+#   IterSource      iterável/gerador de pedaços de qualquer tamanho
+#   SocketSource    lê de um socket (ex.: TCP local) até o EOF
+#   MessageSource   as mensagens sintéticas "Mensagem numero N", emendadas
+#                   como um IterSource: cada segmento vai cheio e uma mensagem
+#                   maior que o MSS continua no seguinte
+#
+# As fatias de FileSource/BytesSource continuam válidas enquanto estiverem na
+# fila de retransmissão; close() só deve ser chamado depois do envio.
+
+class BytesSource:
+    def __init__(self, data):
+        self._view = memoryview(data).cast('B')
+        self._offset = 0
+
+    def read(self, n):
+        offset = self._offset
+        chunk = self._view[offset:offset + n]
+        self._offset = offset + len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+class FileSource(BytesSource):
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mmap = None
+        size = os.fstat(self._file.fileno()).st_size
+        if size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+            super().__init__(self._mmap)
+        else:
+            super().__init__(b'')   # mmap não aceita arquivo vazio
+
+    def close(self):
+        self._view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass    # ainda há fatias vivas; o mmap fecha quando forem coletadas
+        self._file.close()
+
+class IterSource:
+    def __init__(self, iterable):
+        self._chunks = iter(iterable)
+        self._pending = bytearray()
+
+    def read(self, n):
+        pending = self._pending
+        while len(pending) < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            pending += chunk
+        data = bytes(pending[:n])
+        del pending[:n]
+        return data
+
+    def close(self):
+        close = getattr(self._chunks, 'close', None)
+        if close:
+            close()
+
+class SocketSource:
+    def __init__(self, sock):
+        self._sock = sock
+
+    def read(self, n):
+        # Junta recvs até completar n bytes ou o outro lado fechar
+        buffer = bytearray(n)
+        view, filled = memoryview(buffer), 0
+        while filled < n:
+            received = self._sock.recv_into(view[filled:])
+            if not received:
+                break
+            filled += received
+        del view
+        del buffer[filled:]
+        return buffer
+
+    def close(self):
+        self._sock.close()
+
+class MessageSource(IterSource):
+    def __init__(self, count, make_message):
+        super().__init__(make_message(n) for n in range(count))
+        self.count = count
+
+def make_source(data):
+    # Escolhe a fonte pelo tipo: caminho, buffer, socket ou iterável
+    if isinstance(data, (str, os.PathLike)):
+        return FileSource(data)
+    if isinstance(data, (bytes, bytearray, memoryview, mmap.mmap)):
+        return BytesSource(data)
+    if isinstance(data, socket.socket):
+        return SocketSource(data)
+    if hasattr(data, 'read'):
+        return data
+    return IterSource(data)
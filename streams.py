@@ -0,0 +1,143 @@
+import time
+from collections import deque
+
+from packet import pack_frame, unpack_frame, STREAM_FRAME
+from intervals import IntervalSet
+
+# ======================================================================================
+# Vários Fluxos numa Conexão
+# ======================================================================================
+#
+# Confiabilidade, SACK e controle de congestionamento continuam no nível da
+# conexão (um único espaço de seq); os fluxos só mudam o que vai dentro de
+# cada segmento e como o receptor entrega. Cada segmento leva um quadro de um
+# fluxo (ver pack_frame) e o receptor remonta cada fluxo pelo seu offset: um
+# segmento perdido atrasa só o fluxo a que pertence, não os que vieram
+# depois dele na conexão.
+#
+#   StreamMux     lado do transmissor: reparte os segmentos entre os fluxos
+#                 em rodízio, no máximo max_open abertos ao mesmo tempo
+#   StreamDemux   lado do receptor: um remontador e um destino por fluxo
+
+class StreamMux:
+    # sources: uma fonte (sources.py) por fluxo, na ordem dos ids. Com
+    # framed=False (par sem OPT_STREAMS) os fluxos saem um depois do outro,
+    # como um único fluxo de bytes, sem quadro.
+    def __init__(self, sources, transform, framed=True, max_open=None):
+        self.transform = transform
+        self.framed = framed
+        self._pending = deque(enumerate(sources))
+        self._active = deque()      # [id, fonte, offset]
+        self._max_open = (max_open or len(sources)) if framed else 1
+        self.streams = len(sources)
+
+    def _open(self):
+        while self._pending and len(self._active) < self._max_open:
+            stream_id, source = self._pending.popleft()
+            self._active.append([stream_id, source, 0])
+
+    def read(self, n):
+        # Próximo payload (já transformado) de até n bytes; vazio quando todos
+        # os fluxos terminaram
+        self._open()
+        if not self.framed:
+            while self._active:
+                data = self._active[0][1].read(n)
+                if data:
+                    return self.transform.encode(data)
+                self._active.popleft()
+                self._open()
+            return b''
+
+        if not self._active:
+            return b''
+        stream = self._active[0]
+        stream_id, source, offset = stream
+        data = source.read(n - STREAM_FRAME.size)
+        if not data:
+            # Fim do fluxo: quadro vazio com FIN abre a vaga para o próximo
+            self._active.popleft()
+            return pack_frame(stream_id, offset, b'', fin=True)
+        stream[2] = offset + len(data)
+        self._active.rotate(-1)
+        return pack_frame(stream_id, offset, self.transform.encode(data))
+
+    def split(self, payload, size):
+        # Divide um payload devolvido por read em (primeiro, resto), o primeiro
+        # com até size bytes; com quadros, o resto ganha um quadro próprio
+        if not self.framed:
+            return payload[:size], payload[size:]
+        stream_id, offset, fin, data = unpack_frame(payload)
+        cut = size - STREAM_FRAME.size
+        return (pack_frame(stream_id, offset, data[:cut]),
+                pack_frame(stream_id, offset + cut, data[cut:], fin=fin))
+
+class InboundStream:
+    def __init__(self, sink):
+        self.sink = sink
+        self.expected = 0           # próximo offset a entregar
+        self.end = None             # tamanho final, conhecido pelo FIN
+        self.received = IntervalSet()
+        self.held = {}              # {offset: dados} - só destinos sem escrita por offset
+        self.held_bytes = 0
+        self.completed_at = None
+
+    def receive(self, offset, data, fin):
+        if fin:
+            self.end = offset + len(data)
+        if data and offset == self.expected:
+            self.sink.write(offset, data)
+            self.expected += len(data)
+            end = self.received.pop_from(self.expected)
+            if end is not None:
+                if not self.sink.random_access:
+                    while self.expected < end:
+                        chunk = self.held.pop(self.expected)
+                        self.held_bytes -= len(chunk)
+                        self.sink.write(self.expected, chunk)
+                        self.expected += len(chunk)
+                self.expected = end
+        elif data and offset > self.expected and not self.received.contains(offset, offset + len(data)):
+            if self.sink.random_access:
+                self.sink.write(offset, data)
+            else:
+                self.held[offset] = bytes(data)
+                self.held_bytes += len(data)
+            self.received.add(offset, offset + len(data))
+
+        if self.expected == self.end and self.completed_at is None:
+            self.completed_at = time.monotonic()
+            self.sink.close(self.end)
+
+class StreamDemux:
+    # open_sink(stream_id) cria o destino de cada fluxo quando o primeiro
+    # quadro dele chega
+    def __init__(self, open_sink, transform):
+        self.open_sink = open_sink
+        self.transform = transform
+        self.streams = {}
+        self.started_at = time.monotonic()
+
+    def receive(self, payload):
+        stream_id, offset, fin, data = unpack_frame(payload)
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            stream = self.streams[stream_id] = InboundStream(self.open_sink(stream_id))
+        if stream.completed_at is None:
+            stream.receive(offset, self.transform.decode(data), fin)
+
+    def backlog(self):
+        # Bytes presos no receptor: não consumidos pelos destinos e segurados
+        # à espera de um buraco do próprio fluxo
+        return sum(stream.sink.backlog() + stream.held_bytes for stream in self.streams.values())
+
+    def completion_times(self):
+        # Segundos desde o início até cada fluxo completo, em ordem de id
+        return [stream.completed_at - self.started_at
+                for _, stream in sorted(self.streams.items()) if stream.completed_at is not None]
+
+    def close(self):
+        # Fecha os fluxos incompletos com o que foi entregue em ordem
+        for stream in self.streams.values():
+            if stream.completed_at is None:
+                stream.sink.close(stream.expected)
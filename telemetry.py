@@ -0,0 +1,133 @@
+import struct
+import sys
+from array import array
+
+# ======================================================================================
+# Telemetria em Colunas Tipadas (memória limitada, gravação contínua)
+# ======================================================================================
+#
+# Cada série (CWND, vazão, retransmissões...) é um Recorder: uma array por
+# coluna, 8 bytes por valor em vez de uma lista de listas de floats. Em
+# memória ficam no máximo capacity amostras:
+#
+#   'decimate'  ao encher, descarta uma amostra sim, uma não, e passa a
+#               guardar só uma a cada stride (que dobra): a transferência
+#               inteira continua lá, com resolução menor
+#   'ring'      guarda só as capacity mais recentes
+#
+# Com path, todas as amostras (sem decimação) vão também para um arquivo
+# binário, em blocos de flush_every registros durante a transmissão: um
+# crash perde no máximo o último bloco.
+#
+#   "TLM1" | typecode (1 B) | ncols (1 B) | ncols x (tamanho 1 B + nome)
+#   registros little-endian de ncols valores typecode, até o fim do arquivo
+#
+# load() lê o arquivo de volta (sem NumPy; com ele, np.fromfile com o offset
+# do cabeçalho também serve), e `python telemetry.py arquivo.tlm` imprime CSV.
+
+MAGIC = b'TLM1'
+
+class Recorder:
+    def __init__(self, columns, capacity=None, mode='decimate', path=None, flush_every=1024, typecode='d'):
+        if mode not in ('decimate', 'ring'):
+            raise ValueError(f"Modo de telemetria desconhecido: {mode}")
+        self.columns = tuple(columns)
+        self.capacity = capacity
+        self.mode = mode
+        self.stride = 1         # decimate: uma amostra guardada a cada stride
+        self.count = 0          # amostras recebidas, inclusive as que saíram da memória
+        self._data = [array(typecode) for _ in self.columns]
+        self._start = 0         # ring: posição da mais antiga
+
+        self.path = path
+        self._file = None
+        if path is not None:
+            self._record = struct.Struct('<' + typecode * len(self.columns))
+            self._pending = bytearray()
+            self._flush_bytes = flush_every * self._record.size
+            self._file = open(path, 'wb')
+            self._file.write(_header(self.columns, typecode))
+
+    def append(self, *values):
+        self.count += 1
+        if self._file is not None:
+            self._pending += self._record.pack(*values)
+            if len(self._pending) >= self._flush_bytes:
+                self.flush()
+
+        data, capacity = self._data, self.capacity
+        if self.mode == 'ring' and capacity and len(data[0]) >= capacity:
+            start = self._start
+            for column, value in zip(data, values):
+                column[start] = value
+            self._start = (start + 1) % capacity
+            return
+        if (self.count - 1) % self.stride:
+            return
+        for column, value in zip(data, values):
+            column.append(value)
+        if self.mode == 'decimate' and capacity and len(data[0]) >= capacity:
+            for column in data:
+                del column[1::2]
+            self.stride *= 2
+
+    def flush(self):
+        if self._file is not None and self._pending:
+            self._file.write(self._pending)
+            self._file.flush()
+            self._pending.clear()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def column(self, name):
+        # Valores da coluna em ordem cronológica
+        column = self._data[self.columns.index(name)]
+        if self._start:
+            return column[self._start:] + column[:self._start]
+        return column
+
+    def __len__(self):
+        return len(self._data[0])
+
+    def __iter__(self):
+        # Linhas (tuplas) em ordem cronológica
+        return zip(*(self.column(name) for name in self.columns))
+
+def _header(columns, typecode):
+    out = bytearray(MAGIC + typecode.encode() + bytes([len(columns)]))
+    for name in columns:
+        encoded = name.encode()
+        out += bytes([len(encoded)]) + encoded
+    return bytes(out)
+
+def load(path):
+    # {coluna: array} com todas as amostras gravadas; um registro incompleto
+    # no fim (processo interrompido no meio da escrita) é ignorado
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path}: não é um arquivo de telemetria")
+    typecode, ncols = chr(data[4]), data[5]
+    offset, columns = 6, []
+    for _ in range(ncols):
+        size = data[offset]
+        columns.append(data[offset + 1:offset + 1 + size].decode())
+        offset += 1 + size
+
+    values = array(typecode)
+    body = data[offset:]
+    record_size = values.itemsize * ncols
+    values.frombytes(body[:len(body) - len(body) % record_size])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return {name: values[i::ncols] for i, name in enumerate(columns)}
+
+if __name__ == "__main__":
+    series = load(sys.argv[1])
+    print(','.join(series))
+    for row in zip(*series.values()):
+        print(','.join(repr(value) for value in row))
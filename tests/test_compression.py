@@ -0,0 +1,66 @@
+import os
+import random
+import unittest
+
+from compression import SegmentCompressor, SegmentDecompressor, next_segment
+from packet import unpack_frame
+from sources import BytesSource
+from streams import StreamMux
+from transforms import IdentityTransform
+
+MSS = 1012
+ZDICT = b'Mensagem numero '
+
+def send_all(mux, compressor, room):
+    # Payloads na ordem em que sairiam, com a janela do receptor fixa em room
+    payloads, carry = [], None
+    while True:
+        payload, wire, flags, carry = next_segment(mux, compressor, carry, MSS, room)
+        if not payload:
+            return payloads
+        assert len(wire) <= MSS
+        if flags:
+            assert SegmentDecompressor(ZDICT, compressor.max_segment).decode(wire) == payload
+        payloads.append(bytes(payload))
+
+class NextSegmentTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(1)
+        # Texto comprimível seguido de dados aleatórios: o compressor prevê
+        # uma razão boa, lê bem mais que um MSS e o pedaço aleatório não cabe
+        self.data = b''.join(b'Mensagem numero %d' % n for n in range(2000)) + os.urandom(20000)
+
+    def compressor(self):
+        return SegmentCompressor(1, ZDICT, MSS, 4 * MSS)
+
+    def test_carry_split_by_window_and_mss(self):
+        # resto de 3000 bytes aleatórios, janela de 2000: nada pode se perder
+        mux = StreamMux([BytesSource(b'')], IdentityTransform(), framed=False)
+        carry = os.urandom(3000)
+        payload, wire, flags, rest = next_segment(mux, self.compressor(), carry, MSS, room=2000)
+        self.assertEqual((flags, len(payload)), (0, MSS))
+        self.assertEqual(bytes(payload) + bytes(rest), carry)
+
+    def test_unframed_stream_is_complete(self):
+        for room in (None, 2000, MSS):
+            mux = StreamMux([BytesSource(self.data)], IdentityTransform(), framed=False)
+            self.assertEqual(b''.join(send_all(mux, self.compressor(), room)), self.data)
+
+    def test_framed_stream_is_contiguous(self):
+        mux = StreamMux([BytesSource(self.data)], IdentityTransform(), framed=True)
+        expected, received = 0, []
+        for payload in send_all(mux, self.compressor(), 2000):
+            stream_id, offset, fin, data = unpack_frame(payload)
+            self.assertEqual(offset, expected)
+            expected += len(data)
+            received.append(bytes(data))
+        self.assertEqual(b''.join(received), self.data)
+
+    def test_without_compression(self):
+        mux = StreamMux([BytesSource(self.data)], IdentityTransform(), framed=False)
+        payloads = send_all(mux, None, 2000)
+        self.assertTrue(all(len(payload) <= MSS for payload in payloads))
+        self.assertEqual(b''.join(payloads), self.data)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# ======================================================================================
+# Transformações de Payload (camada plugável)
+# ======================================================================================
+#
+# Cada transformação trabalha em bytes/bytearray em bloco e preserva o tamanho,
+# então o número de bytes no fio (usado na contagem de seq/ack) é conhecido
+# sem precisar transformar duas vezes. Cada lado anuncia no handshake qual
+# transformação usa para CODIFICAR o que envia; o outro lado decodifica com ela.
+
+class IdentityTransform:
+    transform_id = 0
+    name = 'identity'
+
+    def encode(self, data):
+        # Sem cópia: fatias memoryview (ex.: de um mmap) vão direto ao pack_segment
+        return data
+
+    def decode(self, data):
+        # Idem: a fatia do datagrama vai direto ao destino (ver sinks.py)
+        return data
+
+    def encoded_size(self, size):
+        return size
+
+class CaesarTransform:
+    transform_id = 1
+    name = 'caesar'
+
+    def __init__(self, shift=3):
+        self.shift = shift
+        self._encode_table = self._build_table(shift)
+        self._decode_table = self._build_table(-shift)
+
+    @staticmethod
+    def _build_table(shift):
+        # Tabela de 256 entradas: só A-Z e a-z são deslocadas, o resto passa direto
+        # (bytes UTF-8 multibyte ficam intactos, como na cifra por caractere).
+        table = bytearray(range(256))
+        for base in (ord('a'), ord('A')):
+            for i in range(26):
+                table[base + i] = base + (i + shift) % 26
+        return bytes(table)
+
+    def encode(self, data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return data.translate(self._encode_table)
+
+    def decode(self, data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return data.translate(self._decode_table)
+
+    def encoded_size(self, size):
+        return size
+
+TRANSFORMS = {
+    IdentityTransform.transform_id: IdentityTransform,
+    CaesarTransform.transform_id: CaesarTransform,
+}
+
+def get_transform(transform_id):
+    try:
+        return TRANSFORMS[transform_id]()
+    except KeyError:
+        raise ValueError(f"Transformação de payload desconhecida: {transform_id}")